@@ -1,4 +1,102 @@
+"""Start the AI service on 127.0.0.1:8001.
+
+Single worker by default. With AI_SERVICE_WORKERS=N (or --workers N) on a
+platform with fork(), the parent binds the socket, loads the SBERT model weights
+and the template index once (without running an encode), then forks N uvicorn
+workers that share the model weights copy-on-write and the index matrices as
+read-only memory maps. Dead workers are restarted. Windows has no fork(), so it always runs one worker.
+
+Run: python _start.py [--workers N] [--host 127.0.0.1] [--port 8001]
+"""
+
+import argparse
 import os
+import signal
+import socket
+import sys
+
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.getcwd())
+
 import uvicorn
-uvicorn.run("app:app", host="127.0.0.1", port=8001)
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve_forked(host: str, port: int, workers: int) -> None:
+    sock = _bind(host, port)
+    import app as ai_app
+
+    ai_app.preload_for_workers()
+    config = uvicorn.Config(ai_app.app, host=host, port=port)
+    children = {}
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                ai_app.on_worker_start(workers)
+                uvicorn.Server(config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children[pid] = slot
+        print(f"[WORKERS] worker {slot} started (pid {pid})")
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for slot in range(workers):
+        spawn(slot)
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"[WORKERS] worker {slot} (pid {pid}) exited; restarting")
+            spawn(slot)
+    sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Start the ADCES AI service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("AI_SERVICE_WORKERS", "1") or 1))
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    if workers > 1 and not hasattr(os, "fork"):
+        print("[WORKERS] fork() is not available on this platform; running a single worker")
+        workers = 1
+    os.environ["AI_SERVICE_WORKERS"] = str(workers)
+
+    if workers == 1:
+        uvicorn.run("app:app", host=args.host, port=args.port)
+    else:
+        _serve_forked(args.host, args.port, workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,19 @@
+import asyncio
 import hashlib
 import json
 import os
 import pathlib
 import random
 import re
+import sys
+import time
 import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager, nullcontext
 from datetime import datetime
-from functools import lru_cache
-from threading import Lock
-from typing import Any, Dict, List, Optional, Tuple, Union
+from threading import BoundedSemaphore, Event, Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 # Use locally cached HuggingFace models — avoid network calls that fail on some machines
 os.environ.setdefault("HF_HUB_OFFLINE", "1")
@@ -16,17 +21,56 @@ os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
 
 import numpy as np
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, PrivateAttr
 
 try:
-    from .feedback_retrieval_system import FeedbackRetrievalSystem, build_mysql_seed_system
+    from .embedding_cache import MappedEmbeddingCache, content_hash
+    from .encoders import default_backend, default_model_name, encode_batcher, encode_texts, get_encoder, query_embedding_cache
+    from .feedback_retrieval_system import SUPPORTED_FIELDS, FeedbackRetrievalSystem, build_mysql_seed_system
+    from .keyword_matcher import KeywordMatcher
+    from .metrics import (
+        Counter,
+        TraceHistory,
+        render_histograms,
+        render_samples,
+        request_trace,
+        stage_seconds,
+        stage_timer,
+        trace_record,
+        unrecorded,
+    )
 except ImportError:
-    from feedback_retrieval_system import FeedbackRetrievalSystem, build_mysql_seed_system
+    from embedding_cache import MappedEmbeddingCache, content_hash
+    from encoders import default_backend, default_model_name, encode_batcher, encode_texts, get_encoder, query_embedding_cache
+    from feedback_retrieval_system import SUPPORTED_FIELDS, FeedbackRetrievalSystem, build_mysql_seed_system
+    from keyword_matcher import KeywordMatcher
+    from metrics import (
+        Counter,
+        TraceHistory,
+        render_histograms,
+        render_samples,
+        request_trace,
+        stage_seconds,
+        stage_timer,
+        trace_record,
+        unrecorded,
+    )
 
 
-app = FastAPI(title="ADCES AI Service", version="2.0.0")
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    if (os.getenv("AI_WARMUP", "1") or "0").strip() not in ("0", "false", "no"):
+        Thread(target=_run_warmup, name="warmup", daemon=True).start()
+    else:
+        # Nothing is preloaded; the first /generate loads lazily, so there is nothing to wait for.
+        warmup_status.skip_pending()
+    yield
+
+
+app = FastAPI(title="ADCES AI Service", version="2.0.0", lifespan=_lifespan)
 
 
 @app.get("/health")
@@ -34,6 +78,16 @@ async def health():
     return {"ok": True}
 
 
+@app.get("/ready")
+async def ready():
+    """Warm-up progress: 200 once every phase has finished or was skipped, 503 until then.
+
+    A failed phase keeps it at 503 until the warm-up retry gets it through.
+    """
+    snapshot = warmup_status.snapshot()
+    return JSONResponse(status_code=200 if snapshot["ready"] else 503, content=snapshot)
+
+
 @app.post("/backfill_embeddings")
 async def backfill_embeddings():
     """Generate SBERT embeddings for all seed rows with empty embedding_vector."""
@@ -47,7 +101,7 @@ async def backfill_embeddings():
     )
     with conn.cursor() as cur:
         cur.execute(
-            "SELECT id, evaluation_comment, LENGTH(embedding_vector) as ev_len "
+            "SELECT id, field_name, evaluation_comment, LENGTH(embedding_vector) as ev_len "
             "FROM ai_feedback_templates WHERE is_active = 1"
         )
         rows = cur.fetchall()
@@ -63,6 +117,7 @@ async def backfill_embeddings():
     retrieval = _load_feedback_retrieval_system()
     updated = 0
     errors = 0
+    updated_fields = set()
     with conn.cursor() as cur:
         for row in needs_update:
             try:
@@ -76,6 +131,7 @@ async def backfill_embeddings():
                     (serialized, row["id"]),
                 )
                 updated += 1
+                updated_fields.add(str(row.get("field_name") or ""))
             except Exception as e:
                 errors += 1
                 print(f"Error on row {row['id']}: {e}")
@@ -83,8 +139,15 @@ async def backfill_embeddings():
     conn.close()
 
     # Clear cache so service reloads fresh embeddings
-    if EMBEDDINGS_CACHE_PATH.exists():
-        EMBEDDINGS_CACHE_PATH.unlink()
+    _embedding_cache_store().clear()
+    if updated_fields:
+        # The resident index and dataset snapshots still hold the old rows; drop them now
+        # instead of waiting for the change-feed refresher (which may be disabled).
+        _dataset_snapshots.clear()
+        index = getattr(retrieval, "index", None)
+        if index is not None:
+            for field_name in sorted(updated_fields):
+                index.invalidate(field_name)
 
     return {"ok": True, "updated": updated, "errors": errors, "total": len(rows)}
 
@@ -129,14 +192,120 @@ async def debug_echo(request: Request):
     return {"ok": True, "received": body}
 
 
+@app.get("/debug/encoder")
+async def debug_encoder():
+    """Encode batching histograms and query-embedding cache counters."""
+    return {"batcher": encode_batcher.stats(), "query_cache": query_embedding_cache.stats()}
+
+
+@app.get("/debug/trace/{request_id}")
+async def debug_trace(request_id: str):
+    """Trace of a recent /generate request, looked up by its X-Request-ID.
+
+    Traces are kept per process: with AI_SERVICE_WORKERS > 1 only the worker
+    that served the request has it, so a lookup landing on another worker is a 404.
+    """
+    trace = trace_history.get(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="No trace kept for this request id")
+    return trace
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of pipeline, cache, encoder and index metrics.
+
+    Counters are per process: with AI_SERVICE_WORKERS > 1 each scrape reports
+    only the worker that answered it, not the sum over workers.
+    """
+    return PlainTextResponse("\n".join(_metrics_lines()) + "\n", media_type="text/plain; version=0.0.4")
+
+
+def _metrics_lines() -> List[str]:
+    lines = render_histograms(
+        "adces_generate_stage_seconds",
+        "Wall time of each /generate pipeline stage.",
+        [({"stage": stage}, histogram) for stage, histogram in sorted(stage_seconds.items())],
+    )
+    lines += render_samples(
+        "adces_generate_requests_total",
+        "Finished /generate requests by outcome (busy = rejected with 503).",
+        "counter",
+        [({"outcome": outcome}, counter.value) for outcome, counter in generate_outcomes.items()],
+    )
+    lines += render_samples("adces_generate_in_flight", "Running plus queued /generate requests.", "gauge", [({}, _generate_in_flight)])
+    lines += render_samples("adces_generate_max_in_flight", "In-flight limit before 503.", "gauge", [({}, GENERATE_MAX_IN_FLIGHT)])
+
+    cache = query_embedding_cache.stats()
+    for key, kind, help_text in (
+        ("hits", "counter", "Query embedding cache hits."),
+        ("misses", "counter", "Query embedding cache misses."),
+        ("evictions", "counter", "Query embedding cache evictions."),
+        ("size", "gauge", "Entries in the query embedding cache."),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        lines += render_samples(f"adces_query_embedding_cache_{key}{suffix}", help_text, kind, [({}, cache[key])])
+
+    lines += render_histograms("adces_encode_batch_size", "Texts per shared encode call.", [({}, encode_batcher.batch_sizes)])
+    lines += render_histograms(
+        "adces_encode_wait_seconds", "Time a query encode waited for its batch.", [({}, encode_batcher.wait_ms)], scale=0.001
+    )
+
+    # Read the already-built system only: a scrape must never trigger the MySQL/index load.
+    system = _retrieval_system
+    index = getattr(system, "index", None)
+    if index is not None:
+        samples = []
+        for key, size in sorted(index.sizes().items()):
+            field_name, _, form_type = key.partition(":")
+            samples.append(({"field": field_name, "form_type": form_type}, size))
+        lines += render_samples("adces_template_index_rows", "Templates resident in the index per partition.", "gauge", samples)
+    pool = getattr(getattr(system, "backend", None), "pool", None)
+    if pool is not None:
+        pool_stats = pool.stats()
+        lines += render_samples(
+            "adces_mysql_pool_connections",
+            "Pooled MySQL connections by state.",
+            "gauge",
+            [({"state": "open"}, pool_stats["open"]), ({"state": "idle"}, pool_stats["idle"])],
+        )
+    lines += render_samples(
+        "adces_dataset_entries",
+        "Dataset entries with resident embeddings per form type.",
+        "gauge",
+        [({"form_type": form_type or "all"}, len(snapshot[1])) for form_type, snapshot in sorted(_dataset_snapshots.items())],
+    )
+    return lines
+
+
 BASE_PATH = pathlib.Path(__file__).parent
 ROOT_PATH = BASE_PATH.resolve().parent
 PHP_DB_CONFIG_PATH = ROOT_PATH / "config" / "database.php"
 FEEDBACK_PATH = BASE_PATH / "ai_feedback.jsonl"
-EMBEDDINGS_CACHE_PATH = BASE_PATH / "comment_embeddings_cache.npz"
+# Stem for the per-form-type `.npy` + `.json` embedding cache files (see embedding_cache.py).
+EMBEDDINGS_CACHE_PATH = BASE_PATH / "comment_embeddings_cache"
 _feedback_lock = Lock()
 _embedding_lock = Lock()
 
+# /generate runs on its own bounded executor instead of Starlette's shared threadpool.
+# GENERATE_MAX_IN_FLIGHT caps running + queued requests; beyond it the route answers
+# 503 with Retry-After straight away rather than queueing toward the PHP timeout.
+GENERATE_WORKERS = max(1, int(os.getenv("GENERATE_WORKERS", "2") or 2))
+GENERATE_MAX_IN_FLIGHT = max(GENERATE_WORKERS, int(os.getenv("GENERATE_MAX_IN_FLIGHT", "8") or 8))
+GENERATE_RETRY_AFTER_SECONDS = max(1, int(os.getenv("GENERATE_RETRY_AFTER_SECONDS", "5") or 5))
+_generate_executor = ThreadPoolExecutor(max_workers=GENERATE_WORKERS, thread_name_prefix="generate")
+_generate_slots = BoundedSemaphore(GENERATE_MAX_IN_FLIGHT)
+_generate_in_flight = 0
+_generate_in_flight_lock = Lock()
+generate_outcomes: Dict[str, Counter] = {"ok": Counter(), "error": Counter(), "busy": Counter()}
+# Finished request traces kept for /debug/trace/{request_id}; GENERATE_TRACE_HISTORY=0 keeps none.
+trace_history = TraceHistory(int(os.getenv("GENERATE_TRACE_HISTORY", "256") or 0))
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+GENERATE_BATCH_MAX_ITEMS = max(1, int(os.getenv("GENERATE_BATCH_MAX_ITEMS", "200") or 200))
+# Set by _start.py; more than one worker maps the template index from shared files.
+SERVICE_WORKERS = max(1, int(os.getenv("AI_SERVICE_WORKERS", "1") or 1))
+TEMPLATE_INDEX_SHARED_DIR = BASE_PATH / "template_index_shared"
+
 TOP_K_RETRIEVAL = 5
 OUTPUT_RECOMMENDATIONS = 3
 DEFAULT_SIMILARITY_THRESHOLD = 0.15
@@ -282,14 +451,12 @@ _DOMAIN_FILTER_KEYWORDS: Dict[str, List[str]] = {
 }
 
 
+_DOMAIN_KEYWORD_MATCHER = KeywordMatcher(_DOMAIN_FILTER_KEYWORDS)
+
+
 def _count_domain_keyword_matches(text: str, domain: str) -> int:
     """Count how many keywords from a domain match in the text."""
-    lower = text.lower()
-    count = 0
-    for kw in _DOMAIN_FILTER_KEYWORDS.get(domain, []):
-        if kw.lower() in lower:
-            count += 1
-    return count
+    return _DOMAIN_KEYWORD_MATCHER.count(text, domain)
 
 
 def _indicator_rating_map(comments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -505,13 +672,18 @@ def _filter_retrieved_by_focus(items: List[Dict[str, Any]], focus: List[str]) ->
     filtered = []
     for item in items:
         text = item.get('feedback_text', '') or item.get('text', '')
-        included_hits = sum(_count_domain_keyword_matches(text, d) for d in focus)
-        excluded_hits = sum(_count_domain_keyword_matches(text, d) for d in excluded)
+        hits = _DOMAIN_KEYWORD_MATCHER.counts(text)
+        included_hits = sum(hits.get(d, 0) for d in focus)
+        excluded_hits = sum(hits.get(d, 0) for d in excluded)
         if included_hits > 0 and included_hits >= excluded_hits:
             filtered.append(item)
     return filtered
 
 
+_NON_ASCII_RUN_RE = re.compile(r'[^\x00-\x7F]+')
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
+
+
 def _normalize_whitespace(text: str) -> str:
     # Replace smart quotes, em-dashes, and other problematic Unicode chars with ASCII equivalents
     cleaned = (text or "")
@@ -520,8 +692,8 @@ def _normalize_whitespace(text: str) -> str:
     cleaned = cleaned.replace("\u2014", " - ").replace("\u2013", " - ")  # em-dash, en-dash
     cleaned = cleaned.replace("\u2026", "...")  # ellipsis
     cleaned = cleaned.replace("\ufffd", "")     # replacement character
-    cleaned = re.sub(r'[^\x00-\x7F]+', lambda m: m.group(0) if all(0xA0 <= ord(c) <= 0xFF for c in m.group(0)) else '', cleaned)
-    return re.sub(r"\s+", " ", cleaned.strip())
+    cleaned = _NON_ASCII_RUN_RE.sub(lambda m: m.group(0) if all(0xA0 <= ord(c) <= 0xFF for c in m.group(0)) else '', cleaned)
+    return _WHITESPACE_RUN_RE.sub(" ", cleaned.strip())
 
 
 def _safe_lower_label(text: str) -> str:
@@ -607,6 +779,10 @@ class GenerateRequest(BaseModel):
     previously_shown: Dict[str, List[str]] = Field(default_factory=dict)
     evaluation_focus: Optional[str] = ""
     evaluation_form_type: Optional[str] = ""
+    # Debug payload level: "none", "summary" or "full" (see DEBUG_SECTIONS).
+    detail: Optional[str] = "full"
+    # Per-request GenerationContext, attached by generate(); never part of the payload.
+    _context: Optional[Any] = PrivateAttr(default=None)
 
 
 class FeedbackItem(BaseModel):
@@ -631,9 +807,182 @@ class GenerateResponse(BaseModel):
     debug: Optional[Dict[str, Any]] = None
 
 
-@lru_cache(maxsize=1)
+_retrieval_system: Optional[FeedbackRetrievalSystem] = None
+_retrieval_system_lock = Lock()
+
+
 def _load_feedback_retrieval_system() -> FeedbackRetrievalSystem:
-    return build_mysql_seed_system(_parse_php_db_config())
+    """The process-wide retrieval system; concurrent first callers wait for a single build."""
+    global _retrieval_system
+    system = _retrieval_system
+    if system is not None:
+        return system
+    with _retrieval_system_lock:
+        if _retrieval_system is None:
+            _retrieval_system = _build_feedback_retrieval_system()
+        return _retrieval_system
+
+
+def _build_feedback_retrieval_system() -> FeedbackRetrievalSystem:
+    shared_dir = TEMPLATE_INDEX_SHARED_DIR if SERVICE_WORKERS > 1 else None
+    system = build_mysql_seed_system(_parse_php_db_config(), shared_index_dir=shared_dir)
+    refresh_seconds = _template_refresh_seconds()
+    if refresh_seconds > 0:
+        system.index.add_listener(_on_template_index_change)
+        system.start_refresher(interval_seconds=refresh_seconds)
+    return system
+
+
+def _template_refresh_seconds() -> float:
+    return float(os.getenv("TEMPLATE_REFRESH_SECONDS", "30") or 0)
+
+
+def preload_for_workers() -> None:
+    """Load the model weights, template index and cached dataset embeddings in the parent before forking.
+
+    Model weights are then shared copy-on-write and the index matrices are
+    shared memory maps. The parent never runs a forward pass: torch is held to
+    one thread so no intra-op pool exists at fork time, and a dataset whose
+    embedding cache is missing or stale is left for the workers to encode.
+    Background threads do not survive fork, so the refresher is stopped here
+    and restarted by `on_worker_start` in each child.
+    """
+    started = time.perf_counter()
+    if default_backend() == "torch":
+        import torch
+
+        torch.set_num_threads(1)
+    get_encoder()
+    system = _load_feedback_retrieval_system()
+    if system.index.matrix_store is not None:
+        # Workers never delete shared matrices; drop the ones left by earlier runs before forking.
+        system.index.matrix_store.clear()
+    deferred = []
+    for form_type in ("iso", "peac"):
+        for field_name in SUPPORTED_FIELDS:
+            system.index.partition(field_name, form_type)
+        if not _preload_cached_dataset_embeddings(form_type):
+            deferred.append(form_type)
+    if system.refresher is not None:
+        system.refresher.stop()
+    note = f"; dataset embeddings for {', '.join(deferred)} left to the workers" if deferred else ""
+    print(f"[WORKERS] preloaded model and template index in {time.perf_counter() - started:.1f}s{note}")
+
+
+class WarmupStatus:
+    """Status and duration of each startup warm-up phase, reported by /ready."""
+
+    def __init__(self, phases: Tuple[str, ...]) -> None:
+        self._phases: Dict[str, Dict[str, Any]] = {name: {"status": "pending", "duration_ms": None} for name in phases}
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        with self._lock:
+            self._phases[name] = {"status": "running", "duration_ms": None}
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            self._finish(name, "failed", started, error=str(exc))
+            raise
+        self._finish(name, "ok", started)
+
+    def _finish(self, name: str, status: str, started: float, error: Optional[str] = None) -> None:
+        entry: Dict[str, Any] = {"status": status, "duration_ms": round((time.perf_counter() - started) * 1000.0, 1)}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self._phases[name] = entry
+
+    def done(self, name: str) -> bool:
+        with self._lock:
+            return self._phases[name]["status"] == "ok"
+
+    def skip_pending(self) -> None:
+        with self._lock:
+            for entry in self._phases.values():
+                if entry["status"] == "pending":
+                    entry["status"] = "skipped"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = {name: dict(entry) for name, entry in self._phases.items()}
+        return {
+            "ready": all(entry["status"] in ("ok", "skipped") for entry in phases.values()),
+            "total_ms": round(sum(entry["duration_ms"] or 0.0 for entry in phases.values()), 1),
+            "phases": phases,
+        }
+
+
+warmup_status = WarmupStatus(("encoder", "template_index", "dataset_embeddings", "dummy_query"))
+WARMUP_RETRY_SECONDS = max(0.0, float(os.getenv("WARMUP_RETRY_SECONDS", "30") or 0))
+
+
+def _warmup_phases() -> None:
+    """Run every warm-up phase that has not succeeded yet."""
+    if not warmup_status.done("encoder"):
+        with warmup_status.phase("encoder"):
+            get_encoder()
+    if not warmup_status.done("template_index"):
+        with warmup_status.phase("template_index"):
+            system = _load_feedback_retrieval_system()
+            index = getattr(system, "index", None)
+            if index is not None:
+                for form_type in ("iso", "peac"):
+                    for field_name in SUPPORTED_FIELDS:
+                        index.partition(field_name, form_type)
+    if not warmup_status.done("dataset_embeddings"):
+        with warmup_status.phase("dataset_embeddings"):
+            for form_type in ("iso", "peac"):
+                _ensure_dataset_embeddings(form_type=form_type)
+    if not warmup_status.done("dummy_query"):
+        # Not a real request: keep it out of the stage histograms and the trace history.
+        with warmup_status.phase("dummy_query"), unrecorded():
+            _generate_response_stages(
+                GenerateRequest(
+                    averages=Averages(communications=4.0, management=4.0, assessment=3.0, overall=3.7),
+                    evaluation_form_type="iso",
+                )
+            )
+
+
+def _run_warmup() -> None:
+    """Load everything the first /generate would, in request order, so it does not pay for it.
+
+    A failed phase is retried every WARMUP_RETRY_SECONDS (0 gives up after the first failure).
+    """
+    attempt = 1
+    while True:
+        try:
+            _warmup_phases()
+            print(f"[WARMUP] ready in {warmup_status.snapshot()['total_ms']:.0f} ms")
+            return
+        except Exception as exc:
+            if not WARMUP_RETRY_SECONDS:
+                warmup_status.skip_pending()
+                print(f"[WARMUP] failed: {exc}")
+                return
+            print(f"[WARMUP] attempt {attempt} failed: {exc}; retrying in {WARMUP_RETRY_SECONDS:g}s")
+            attempt += 1
+            time.sleep(WARMUP_RETRY_SECONDS)
+
+
+def on_worker_start(workers: int = 1) -> None:
+    """Per-child setup after fork: split CPU threads between workers and restart the refresher."""
+    torch = sys.modules.get("torch")
+    if torch is not None and workers > 1:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    system = _load_feedback_retrieval_system()
+    refresh_seconds = _template_refresh_seconds()
+    if refresh_seconds > 0:
+        system.start_refresher(interval_seconds=refresh_seconds)
+
+
+def _on_template_index_change(keys: List[Tuple[str, str]]) -> None:
+    """Re-embed only the dataset entries touched by a template index refresh."""
+    for form_type in sorted({form_type for _, form_type in keys}):
+        _ensure_dataset_embeddings(form_type=form_type)
 
 
 @app.post("/feedback")
@@ -721,7 +1070,7 @@ def _parse_php_db_config() -> Dict[str, str]:
     }
 
 
-def _parse_evaluation_focus(req: GenerateRequest) -> List[str]:
+def _compute_parse_evaluation_focus(req: GenerateRequest) -> List[str]:
     """Return the list of active focus categories, or empty list if all are active."""
     raw = req.evaluation_focus or ""
     if not raw:
@@ -735,7 +1084,7 @@ def _parse_evaluation_focus(req: GenerateRequest) -> List[str]:
     return []
 
 
-def _is_peac_request(req: GenerateRequest) -> bool:
+def _compute_is_peac_request(req: GenerateRequest) -> bool:
     explicit = (req.evaluation_form_type or "").strip().lower()
     if explicit == "peac":
         return True
@@ -743,6 +1092,41 @@ def _is_peac_request(req: GenerateRequest) -> bool:
     return "teacher_actions" in ratings_keys or "student_learning_actions" in ratings_keys
 
 
+# Debug sections returned per detail level; only the listed ones are computed.
+DEBUG_SECTIONS: Dict[str, Tuple[str, ...]] = {
+    "none": (),
+    "summary": (
+        "field_mysql_sources",
+        "dataset_size",
+        "model",
+        "generator",
+        "overall_band",
+        "domain_bands",
+        "context_computations",
+    ),
+    "full": (
+        "top_comments",
+        "prioritized_indicator_comments",
+        "mysql_sources",
+        "field_mysql_sources",
+        "embedding_cache_path",
+        "dataset_size",
+        "model",
+        "generator",
+        "overall_band",
+        "domain_bands",
+        "feedback_queries",
+        "context_computations",
+    ),
+}
+
+
+def _response_detail(req: GenerateRequest) -> str:
+    """Requested debug level; anything unrecognised gets the full payload, as before."""
+    detail = (req.detail or "").strip().lower()
+    return detail if detail in DEBUG_SECTIONS else "full"
+
+
 def _effective_form_type(req: GenerateRequest) -> str:
     """Return 'iso' or 'peac' based on explicit field or inferred from ratings."""
     explicit = (req.evaluation_form_type or "").strip().lower()
@@ -772,7 +1156,7 @@ def _domain_scores(req: GenerateRequest) -> Dict[str, float]:
     return scores
 
 
-def _evaluation_signature(req: GenerateRequest) -> Dict[str, Any]:
+def _compute_evaluation_signature(req: GenerateRequest) -> Dict[str, Any]:
     domains = _domain_scores(req)
     weakest: str = min(domains.keys(), key=lambda k: domains[k]) if domains else "Instructional practice"
     strongest: str = max(domains.keys(), key=lambda k: domains[k]) if domains else "Professional practice"
@@ -819,10 +1203,13 @@ def _dedupe_preserve_order(items: List[str]) -> List[str]:
     return out
 
 
+_FINGERPRINT_STRIP_RE = re.compile(r"[^a-z0-9\s]")
+
+
 def _comment_fingerprint(text: str) -> str:
 
-    normalized = re.sub(r"[^a-z0-9\s]", "", _safe_lower_label(text))
-    return re.sub(r"\s+", " ", normalized).strip()
+    normalized = _FINGERPRINT_STRIP_RE.sub("", _safe_lower_label(text))
+    return _WHITESPACE_RUN_RE.sub(" ", normalized).strip()
 
 
 def _extract_action_focus(text: str) -> str:
@@ -851,7 +1238,7 @@ def _normalize_domain_name(key: str) -> str:
     return DOMAIN_ALIASES.get(_safe_lower_label(key), _normalize_whitespace(key) or "General")
 
 
-def _flatten_comments(req: GenerateRequest) -> List[Dict[str, Any]]:
+def _compute_flatten_comments(req: GenerateRequest) -> List[Dict[str, Any]]:
     comment_rows: List[Dict[str, Any]] = []
     seen_explicit = set()
     focus = _parse_evaluation_focus(req)
@@ -945,6 +1332,80 @@ def _subject_department_context(req: GenerateRequest) -> Dict[str, str]:
     }
 
 
+# Specific ISO/PEAC criterion texts that need special phrasing, matched by prefix.
+_CRITERION_PHRASE_MAP = {
+    "the topic or lesson is introduced in an interesting and engaging way": "introducing the topic or lesson in an engaging and interesting way",
+    "the topic/lesson is introduced in an interesting & engaging way": "introducing the topic or lesson in an engaging and interesting way",
+    "the topic/lesson is introduced in an interesting and engaging way": "introducing the topic or lesson in an engaging and interesting way",
+    "the tilo (topic intended learning outcomes) are clearly presented": "clear presentation of the TILO (Topic Intended Learning Outcomes)",
+    "recall and connects previous lessons to the new lessons": "connecting previous lessons to the current topic",
+    "recall and connect previous lessons to the new lessons": "connecting previous lessons to the current topic",
+    "conduct the lesson using the principle of smart": "applying the SMART principle in lesson delivery",
+    "integrate the institutional core values to the lessons": "integrating institutional core values into the lesson",
+    "design test/quarter/assignments and other assessment tasks that are corrector-based": "designing corrector-based assessment tasks and assignments",
+    # PEAC Teacher Actions
+    "applied knowledge of content within and across curriculum teaching areas": "applying knowledge of content within and across curriculum teaching areas",
+    "used a range of teaching strategies that enhance learner achievement in literacy and numeracy skills": "using a range of teaching strategies that enhance learner achievement in literacy and numeracy skills",
+    "applied a range of teaching strategies to develop critical and creative thinking, as well as other higher-order thinking skills": "applying a range of teaching strategies to develop critical and creative thinking and higher-order thinking skills",
+    "managed classroom structure to engage learners, individually or in groups, in meaningful exploration, discovery and hands-on activities": "managing classroom structure to engage learners in meaningful exploration, discovery and hands-on activities",
+    "managed learner behavior constructively by applying positive and non-violent discipline to ensure learning focused environments": "managing learner behavior constructively through positive and non-violent discipline",
+    "used differentiated, developmentally appropriate learning experiences to address learners gender, needs, strengths, interests": "using differentiated, developmentally appropriate learning experiences to address learner needs, strengths and interests",
+    # PEAC Student Learning Actions
+    "worked together with other students towards achieving the tilo(s)": "working collaboratively with other students towards achieving the TILOs",
+    "shared ideas and responded to questions enthusiastically": "sharing ideas and responding to questions enthusiastically",
+    "performed the given learning tasks with enthusiasm and interest": "performing the given learning tasks with enthusiasm and interest",
+    "demonstrated awareness and practice of appropriate behavior inside the classroom": "demonstrating awareness and practice of appropriate classroom behavior",
+    "applied learning in real life situations through authentic performance tasks": "applying learning in real-life situations through authentic performance tasks",
+    "prepared instructional materials and assessment tools with clear directions": "preparing instructional materials and assessment tools with clear directions",
+    "designed, selected, organized, and used diagnostic, formative and summative assessment": "designing, selecting, organizing and using diagnostic, formative and summative assessment",
+    "monitored and provided interventions to learners achieving the tilos": "monitoring and providing interventions to learners to help achieve the TILOs",
+}
+
+# Leading verbs rewritten to gerund form, first match wins. None of the outputs
+# starts with another entry's verb, so one anchored alternation is equivalent to
+# applying the rewrites one after another.
+_CRITERION_GERUND_REWRITES = [
+    (r"[Uu]ses\s+", "using "),
+    (r"[Uu]tilizes\s+", "utilizing "),
+    (r"[Dd]emonstrates\s+", "demonstrating "),
+    (r"[Ee]xplains\s+", "explaining "),
+    (r"[Aa]dapts\s+", "adapting "),
+    (r"[Ee]ncourages\s+", "encouraging "),
+    (r"[Dd]esigns?\s+", "designing "),
+    (r"[Ii]ntegrates?\s+", "integrating "),
+    (r"[Ff]ocuses\s+", "focusing on "),
+    (r"[Ff]acilitates?\s+", "facilitating "),
+    (r"[Rr]ecalls? and connects?\s+", "recalling and connecting "),
+    (r"[Cc]ommunicates\s+", "communicating "),
+    (r"[Mm]onitors\s+", "monitoring "),
+    (r"[Pp]rovides\s+", "providing "),
+    (r"[Mm]anages\s+", "managing "),
+    (r"[Pp]rocesses\s+", "processing "),
+    (r"[Cc]onducts?\s+", "conducting "),
+    (r"[Ii]ntroduces\s+", "introducing "),
+    (r"[Aa]ids\s+", "aiding "),
+    (r"[Ss]peaks\s+", "speaking "),
+    (r"[Aa]pplied\s+", "applying "),
+    (r"[Aa]pplies\s+", "applying "),
+    (r"[Ww]orked\s+", "working "),
+    (r"[Ss]hared\s+", "sharing "),
+    (r"[Pp]erformed\s+", "performing "),
+    (r"[Dd]emonstrated\s+", "demonstrating "),
+    (r"[Pp]repared\s+", "preparing "),
+    (r"[Uu]sed\s+", "using "),
+    (r"[Mm]anaged\s+", "managing "),
+    (r"[Dd]esigned,?\s+", "designing "),
+]
+_CRITERION_GERUND_RE = re.compile("^(?:" + "|".join(f"({pattern})" for pattern, _ in _CRITERION_GERUND_REWRITES) + ")")
+_CRITERION_GERUND_REPLACEMENTS = [replacement for _, replacement in _CRITERION_GERUND_REWRITES]
+_CRITERION_TEACHER_PREFIX_RE = re.compile(r"^[Tt]he teacher\s+")
+_CRITERION_STUDENTS_PREFIX_RE = re.compile(r"^[Tt]he students?\s+")
+_CRITERION_PASSIVE_RE = re.compile(r"^(.+?)\s+(?:is|are)\s+(clearly\s+)?(?:presented|introduced|demonstrated|integrated)\b")
+_CRITERION_AND_FIND_RE = re.compile(r"\band find\b")
+_CRITERION_AND_ASK_RE = re.compile(r"\band ask\b")
+_CRITERION_LEADING_THE_RE = re.compile(r"^[Tt]he\s+")
+
+
 def _natural_criterion_reference(text: str) -> str:
     cleaned = _normalize_whitespace(text)
     if not cleaned:
@@ -953,88 +1414,32 @@ def _natural_criterion_reference(text: str) -> str:
     # Normalize ampersand and slash to readable text
     cleaned = cleaned.replace(" & ", " and ")
     cleaned = cleaned.replace("/", " or ")
-    cleaned = re.sub(r"\s+", " ", cleaned)
+    cleaned = _WHITESPACE_RUN_RE.sub(" ", cleaned)
 
     # Handle specific ISO criterion texts that need special phrasing
-    _CRITERION_PHRASE_MAP = {
-        "the topic or lesson is introduced in an interesting and engaging way": "introducing the topic or lesson in an engaging and interesting way",
-        "the topic/lesson is introduced in an interesting & engaging way": "introducing the topic or lesson in an engaging and interesting way",
-        "the topic/lesson is introduced in an interesting and engaging way": "introducing the topic or lesson in an engaging and interesting way",
-        "the tilo (topic intended learning outcomes) are clearly presented": "clear presentation of the TILO (Topic Intended Learning Outcomes)",
-        "recall and connects previous lessons to the new lessons": "connecting previous lessons to the current topic",
-        "recall and connect previous lessons to the new lessons": "connecting previous lessons to the current topic",
-        "conduct the lesson using the principle of smart": "applying the SMART principle in lesson delivery",
-        "integrate the institutional core values to the lessons": "integrating institutional core values into the lesson",
-        "design test/quarter/assignments and other assessment tasks that are corrector-based": "designing corrector-based assessment tasks and assignments",
-        # PEAC Teacher Actions
-        "applied knowledge of content within and across curriculum teaching areas": "applying knowledge of content within and across curriculum teaching areas",
-        "used a range of teaching strategies that enhance learner achievement in literacy and numeracy skills": "using a range of teaching strategies that enhance learner achievement in literacy and numeracy skills",
-        "applied a range of teaching strategies to develop critical and creative thinking, as well as other higher-order thinking skills": "applying a range of teaching strategies to develop critical and creative thinking and higher-order thinking skills",
-        "managed classroom structure to engage learners, individually or in groups, in meaningful exploration, discovery and hands-on activities": "managing classroom structure to engage learners in meaningful exploration, discovery and hands-on activities",
-        "managed learner behavior constructively by applying positive and non-violent discipline to ensure learning focused environments": "managing learner behavior constructively through positive and non-violent discipline",
-        "used differentiated, developmentally appropriate learning experiences to address learners gender, needs, strengths, interests": "using differentiated, developmentally appropriate learning experiences to address learner needs, strengths and interests",
-        # PEAC Student Learning Actions
-        "worked together with other students towards achieving the tilo(s)": "working collaboratively with other students towards achieving the TILOs",
-        "shared ideas and responded to questions enthusiastically": "sharing ideas and responding to questions enthusiastically",
-        "performed the given learning tasks with enthusiasm and interest": "performing the given learning tasks with enthusiasm and interest",
-        "demonstrated awareness and practice of appropriate behavior inside the classroom": "demonstrating awareness and practice of appropriate classroom behavior",
-        "applied learning in real life situations through authentic performance tasks": "applying learning in real-life situations through authentic performance tasks",
-        "prepared instructional materials and assessment tools with clear directions": "preparing instructional materials and assessment tools with clear directions",
-        "designed, selected, organized, and used diagnostic, formative and summative assessment": "designing, selecting, organizing and using diagnostic, formative and summative assessment",
-        "monitored and provided interventions to learners achieving the tilos": "monitoring and providing interventions to learners to help achieve the TILOs",
-    }
     lower_cleaned = cleaned.lower().strip(" .;,:-")
     for pattern_key, replacement in _CRITERION_PHRASE_MAP.items():
-        if lower_cleaned == pattern_key or lower_cleaned.startswith(pattern_key):
+        if lower_cleaned.startswith(pattern_key):
             return replacement
 
     # Strip subject prefixes (ISO: "The teacher", PEAC: "The teacher"/"The students")
-    cleaned = re.sub(r"^[Tt]he teacher\s+", "", cleaned)
-    cleaned = re.sub(r"^[Tt]he students?\s+", "students ", cleaned)
+    cleaned = _CRITERION_TEACHER_PREFIX_RE.sub("", cleaned)
+    cleaned = _CRITERION_STUDENTS_PREFIX_RE.sub("students ", cleaned)
 
     # Handle "is/are [verb]ed" patterns (e.g., "TILO are clearly presented")
-    cleaned = re.sub(r"^(.+?)\s+(?:is|are)\s+(clearly\s+)?(?:presented|introduced|demonstrated|integrated)\b",
-                     lambda m: f"the {m.group(2) or ''}{m.group(0).split()[-1].rstrip('.')} of {m.group(1).lower()}".replace("  ", " "),
-                     cleaned)
+    cleaned = _CRITERION_PASSIVE_RE.sub(
+        lambda m: f"the {m.group(2) or ''}{m.group(0).split()[-1].rstrip('.')} of {m.group(1).lower()}".replace("  ", " "),
+        cleaned,
+    )
 
     # Convert leading verbs to gerund form
-    cleaned = re.sub(r"^[Uu]ses\s+", "using ", cleaned)
-    cleaned = re.sub(r"^[Uu]tilizes\s+", "utilizing ", cleaned)
-    cleaned = re.sub(r"^[Dd]emonstrates\s+", "demonstrating ", cleaned)
-    cleaned = re.sub(r"^[Ee]xplains\s+", "explaining ", cleaned)
-    cleaned = re.sub(r"^[Aa]dapts\s+", "adapting ", cleaned)
-    cleaned = re.sub(r"^[Ee]ncourages\s+", "encouraging ", cleaned)
-    cleaned = re.sub(r"^[Dd]esigns?\s+", "designing ", cleaned)
-    cleaned = re.sub(r"^[Ii]ntegrates?\s+", "integrating ", cleaned)
-    cleaned = re.sub(r"^[Ff]ocuses\s+", "focusing on ", cleaned)
-    cleaned = re.sub(r"^[Ff]acilitates?\s+", "facilitating ", cleaned)
-    cleaned = re.sub(r"^[Rr]ecalls? and connects?\s+", "recalling and connecting ", cleaned)
-    cleaned = re.sub(r"^[Rr]ecall and connects\s+", "connecting ", cleaned)
-    cleaned = re.sub(r"^[Cc]ommunicates\s+", "communicating ", cleaned)
-    cleaned = re.sub(r"^[Mm]onitors\s+", "monitoring ", cleaned)
-    cleaned = re.sub(r"^[Pp]rovides\s+", "providing ", cleaned)
-    cleaned = re.sub(r"^[Mm]anages\s+", "managing ", cleaned)
-    cleaned = re.sub(r"^[Pp]rocesses\s+", "processing ", cleaned)
-    cleaned = re.sub(r"^[Cc]onducts?\s+", "conducting ", cleaned)
-    cleaned = re.sub(r"^[Ii]ntroduces\s+", "introducing ", cleaned)
-    cleaned = re.sub(r"^[Aa]ids\s+", "aiding ", cleaned)
-    cleaned = re.sub(r"^[Ss]peaks\s+", "speaking ", cleaned)
-    cleaned = re.sub(r"^[Aa]pplied\s+", "applying ", cleaned)
-    cleaned = re.sub(r"^[Aa]pplies\s+", "applying ", cleaned)
-    cleaned = re.sub(r"^[Ww]orked\s+", "working ", cleaned)
-    cleaned = re.sub(r"^[Ss]hared\s+", "sharing ", cleaned)
-    cleaned = re.sub(r"^[Pp]erformed\s+", "performing ", cleaned)
-    cleaned = re.sub(r"^[Dd]emonstrated\s+", "demonstrating ", cleaned)
-    cleaned = re.sub(r"^[Pp]repared\s+", "preparing ", cleaned)
-    cleaned = re.sub(r"^[Uu]sed\s+", "using ", cleaned)
-    cleaned = re.sub(r"^[Mm]anaged\s+", "managing ", cleaned)
-    cleaned = re.sub(r"^[Dd]esigned,?\s+", "designing ", cleaned)
+    cleaned = _CRITERION_GERUND_RE.sub(lambda m: _CRITERION_GERUND_REPLACEMENTS[m.lastindex - 1], cleaned)
 
     # Fix dangling "and find/ask" after gerund conversion (e.g., "monitoring ... and find ways")
-    cleaned = re.sub(r"\band find\b", "and finding", cleaned)
-    cleaned = re.sub(r"\band ask\b", "and asking", cleaned)
+    cleaned = _CRITERION_AND_FIND_RE.sub("and finding", cleaned)
+    cleaned = _CRITERION_AND_ASK_RE.sub("and asking", cleaned)
 
-    cleaned = re.sub(r"^[Tt]he\s+", "", cleaned)
+    cleaned = _CRITERION_LEADING_THE_RE.sub("", cleaned)
     cleaned = cleaned.strip(" .;,:-")
     return _normalize_clause_fragment(cleaned)
 
@@ -1193,7 +1598,7 @@ def _comment_priority_value(item: Dict[str, Any], subject: str, department: str)
     return score
 
 
-def _prioritize_comments(req: GenerateRequest, comments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _compute_prioritize_comments(req: GenerateRequest, comments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     if not comments:
         return []
     context = _subject_department_context(req)
@@ -1208,6 +1613,84 @@ def _prioritize_comments(req: GenerateRequest, comments: List[Dict[str, Any]]) -
     return ranked
 
 
+class GenerationContext:
+    """Derived request state for one /generate call.
+
+    Built once at the top of generate() and attached to the request, so every
+    helper that asks for the flattened comments, signature, prioritized
+    comments, focus list or form type gets the same object instead of
+    recomputing it. `compute_counts` records how often each was derived.
+    """
+
+    def __init__(self, req: GenerateRequest) -> None:
+        self.req = req
+        self.compute_counts: Dict[str, int] = {}
+        self._values: Dict[str, Any] = {}
+
+    @classmethod
+    def attach(cls, req: GenerateRequest) -> "GenerationContext":
+        context = cls(req)
+        req._context = context
+        return context
+
+    def _memo(self, name: str, compute: Any) -> Any:
+        if name not in self._values:
+            self.compute_counts[name] = self.compute_counts.get(name, 0) + 1
+            self._values[name] = compute(self.req)
+        return self._values[name]
+
+    @property
+    def focus(self) -> List[str]:
+        return self._memo("evaluation_focus", _compute_parse_evaluation_focus)
+
+    @property
+    def is_peac(self) -> bool:
+        return self._memo("is_peac_request", _compute_is_peac_request)
+
+    @property
+    def signature(self) -> Dict[str, Any]:
+        return self._memo("evaluation_signature", _compute_evaluation_signature)
+
+    @property
+    def comments(self) -> List[Dict[str, Any]]:
+        return self._memo("flatten_comments", _compute_flatten_comments)
+
+    @property
+    def prioritized(self) -> List[Dict[str, Any]]:
+        return self._memo("prioritize_comments", lambda req: _compute_prioritize_comments(req, self.comments))
+
+
+def _context_for(req: GenerateRequest) -> Optional[GenerationContext]:
+    return getattr(req, "_context", None)
+
+
+def _parse_evaluation_focus(req: GenerateRequest) -> List[str]:
+    context = _context_for(req)
+    return context.focus if context else _compute_parse_evaluation_focus(req)
+
+
+def _is_peac_request(req: GenerateRequest) -> bool:
+    context = _context_for(req)
+    return context.is_peac if context else _compute_is_peac_request(req)
+
+
+def _evaluation_signature(req: GenerateRequest) -> Dict[str, Any]:
+    context = _context_for(req)
+    return context.signature if context else _compute_evaluation_signature(req)
+
+
+def _flatten_comments(req: GenerateRequest) -> List[Dict[str, Any]]:
+    context = _context_for(req)
+    return context.comments if context else _compute_flatten_comments(req)
+
+
+def _prioritize_comments(req: GenerateRequest, comments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    context = _context_for(req)
+    if context is not None and comments is context.comments:
+        return context.prioritized
+    return _compute_prioritize_comments(req, comments)
+
+
 def _most_problematic_comment(req: GenerateRequest, comments: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     prioritized = _prioritize_comments(req, comments)
     if not prioritized:
@@ -1282,12 +1765,8 @@ def _compose_query_text(req: GenerateRequest, comments: List[Dict[str, Any]]) ->
     return _normalize_whitespace(". ".join(fragments))
 
 
-@lru_cache(maxsize=1)
 def _load_sbert():
-    from sentence_transformers import SentenceTransformer
-
-    model_name = os.getenv("SBERT_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-    return SentenceTransformer(model_name)
+    return get_encoder()
 
 
 def _build_dataset_entries(form_type: str = "") -> List[Dict[str, Any]]:
@@ -1353,61 +1832,128 @@ def _dataset_signature(entries: List[Dict[str, Any]]) -> str:
     return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
-def _write_embedding_cache(entries: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
-    payload = {
-        "signature": np.array([_dataset_signature(entries)], dtype=object),
-        "texts": np.array([item["text"] for item in entries], dtype=object),
-        "categories": np.array([item["category"] for item in entries], dtype=object),
-        "sources": np.array([item.get("source", "") for item in entries], dtype=object),
-        "embeddings": embeddings.astype(np.float32),
-    }
-    np.savez_compressed(EMBEDDINGS_CACHE_PATH, **payload)
+_embedding_cache_stores: Dict[str, MappedEmbeddingCache] = {}
 
 
-def _load_embedding_cache(entries: List[Dict[str, Any]]) -> Optional[Tuple[List[Dict[str, Any]], np.ndarray]]:
-    if not EMBEDDINGS_CACHE_PATH.exists():
+def _embedding_cache_store() -> MappedEmbeddingCache:
+    key = str(EMBEDDINGS_CACHE_PATH)
+    store = _embedding_cache_stores.get(key)
+    if store is None:
+        store = _embedding_cache_stores.setdefault(key, MappedEmbeddingCache(EMBEDDINGS_CACHE_PATH))
+    return store
+
+
+def _write_embedding_cache(
+    entries: List[Dict[str, Any]],
+    embeddings: np.ndarray,
+    form_type: str = "",
+    hashes: Optional[List[str]] = None,
+) -> np.ndarray:
+    cached = _embedding_cache_store().write(
+        form_type,
+        _dataset_signature(entries),
+        [item["text"] for item in entries],
+        [item["category"] for item in entries],
+        [item.get("source", "") for item in entries],
+        embeddings,
+        hashes=hashes,
+    )
+    return cached.embeddings if cached is not None else embeddings
+
+
+def _load_embedding_cache(entries: List[Dict[str, Any]], form_type: str = "") -> Optional[Tuple[List[Dict[str, Any]], np.ndarray]]:
+    cached = _embedding_cache_store().load(form_type)
+    if cached is None or cached.signature != _dataset_signature(entries):
         return None
-    try:
-        cached = np.load(EMBEDDINGS_CACHE_PATH, allow_pickle=True)
-        signature = str(cached["signature"][0])
-        if signature != _dataset_signature(entries):
-            return None
-        embeddings = np.array(cached["embeddings"], dtype=np.float32)
-        if len(embeddings) != len(entries):
-            return None
-        return entries, embeddings
-    except Exception:
+    if len(cached.embeddings) != len(entries):
         return None
+    return entries, cached.embeddings
+
+
+# form_type -> (template store version, dataset entries, embedding matrix)
+_dataset_snapshots: Dict[str, Tuple[Any, List[Dict[str, Any]], np.ndarray]] = {}
+_dataset_rebuild_locks: Dict[str, Lock] = {}
+
+
+def _template_store_version() -> Optional[int]:
+    """Version of the resident template index, or None if the store does not expose one."""
+    index = getattr(_load_feedback_retrieval_system(), "index", None)
+    return getattr(index, "version", None)
+
+
+def _resident_dataset_size(form_type: str = "") -> Optional[int]:
+    """Entries in the resident dataset snapshot, or None if none is loaded (never builds one)."""
+    snapshot = _dataset_snapshots.get(form_type)
+    return len(snapshot[1]) if snapshot is not None else None
+
+
+def _preload_cached_dataset_embeddings(form_type: str) -> bool:
+    """Install the dataset snapshot from the on-disk embedding cache; False (and no encode) on a miss."""
+    version = _template_store_version()
+    entries = _build_dataset_entries(form_type=form_type)
+    cached = _load_embedding_cache(entries, form_type=form_type) if entries else None
+    if cached is None:
+        return False
+    _dataset_snapshots[form_type] = (version, cached[0], cached[1])
+    return True
 
 
 def _ensure_dataset_embeddings(form_type: str = "") -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """Dataset entries and their embeddings, held in process memory per form type.
+
+    Rebuilt only when the template store version moves, so the per-request cost
+    is a dictionary lookup. While one thread rebuilds, other requests keep
+    serving the previous snapshot; the new one is swapped in with a single
+    assignment.
+    """
+    version = _template_store_version()
+    snapshot = _dataset_snapshots.get(form_type)
+    if snapshot is not None and version is not None and snapshot[0] == version:
+        return snapshot[1], snapshot[2]
+
+    rebuild_lock = _dataset_rebuild_locks.setdefault(form_type, Lock())
+    if not rebuild_lock.acquire(blocking=snapshot is None):
+        return snapshot[1], snapshot[2]
+    try:
+        snapshot = _dataset_snapshots.get(form_type)
+        if snapshot is not None and version is not None and snapshot[0] == version:
+            return snapshot[1], snapshot[2]
+        entries, embeddings = _load_dataset_embeddings(form_type=form_type)
+        _dataset_snapshots[form_type] = (version, entries, embeddings)
+        return entries, embeddings
+    finally:
+        rebuild_lock.release()
+
+
+def _load_dataset_embeddings(form_type: str = "") -> Tuple[List[Dict[str, Any]], np.ndarray]:
     entries = _build_dataset_entries(form_type=form_type)
     if not entries:
         return [], np.zeros((0, 384), dtype=np.float32)
 
-    cached = _load_embedding_cache(entries)
+    cached = _load_embedding_cache(entries, form_type=form_type)
     if cached is not None:
         return cached
 
-    try:
-        _embedding_lock.acquire()
-        cached = _load_embedding_cache(entries)
+    # Carry vectors forward by content hash; only new or edited entries are encoded,
+    # and the encode runs outside _embedding_lock.
+    hashes = [content_hash(item["text"]) for item in entries]
+    known = _embedding_cache_store().known_vectors()
+    missing: Dict[str, str] = {}
+    for item, row_hash in zip(entries, hashes):
+        if row_hash not in known:
+            missing.setdefault(row_hash, item["text"])
+    if missing:
+        print(f"[EMBED_CACHE] {form_type or 'all'}: encoding {len(missing)} of {len(entries)} entries")
+        model = _load_sbert()
+        encoded = model.encode(list(missing.values()), convert_to_numpy=True, normalize_embeddings=True)
+        known.update(zip(missing.keys(), np.array(encoded, dtype=np.float32)))
+    embeddings = np.array([known[row_hash] for row_hash in hashes], dtype=np.float32)
+
+    with _embedding_lock:
+        cached = _load_embedding_cache(entries, form_type=form_type)
         if cached is not None:
             return cached
-        model = _load_sbert()
-        embeddings = model.encode(
-            [item["text"] for item in entries],
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-        )
-        embeddings = np.array(embeddings, dtype=np.float32)
-        _write_embedding_cache(entries, embeddings)
-        return entries, embeddings
-    finally:
-        try:
-            _embedding_lock.release()
-        except Exception:
-            pass
+        return entries, _write_embedding_cache(entries, embeddings, form_type=form_type, hashes=hashes)
 
 
 def _mysql_source_summary(items: List[Dict[str, Any]]) -> Dict[str, int]:
@@ -1428,14 +1974,35 @@ def _cosine_search(query_embedding: np.ndarray, embeddings: np.ndarray) -> np.nd
     return np.matmul(embeddings, query_vec)
 
 
-def _retrieve_top_comments(req: GenerateRequest, comments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _encode_queries(texts: List[str]) -> Dict[str, np.ndarray]:
+    """Encode every distinct query text of a request in one forward pass.
+
+    Goes through the shared query-embedding cache, so a regenerate click with
+    unchanged queries never reaches the transformer.
+    """
+    unique = list(dict.fromkeys(text for text in texts if text))
+    if not unique:
+        return {}
+    vectors = encode_texts(unique)
+    return {text: vectors[i] for i, text in enumerate(unique)}
+
+
+def _retrieve_top_comments(
+    req: GenerateRequest,
+    comments: List[Dict[str, Any]],
+    query_text: Optional[str] = None,
+    query_vectors: Optional[Dict[str, np.ndarray]] = None,
+) -> List[Dict[str, Any]]:
     form_type = _effective_form_type(req)
     dataset, embeddings = _ensure_dataset_embeddings(form_type=form_type)
     if not dataset:
         return []
-    query_text = _compose_query_text(req, comments)
-    model = _load_sbert()
-    query_embedding = model.encode([query_text], convert_to_numpy=True, normalize_embeddings=True)
+    if query_text is None:
+        query_text = _compose_query_text(req, comments)
+    if query_vectors and query_text in query_vectors:
+        query_embedding = query_vectors[query_text]
+    else:
+        query_embedding = _encode_queries([query_text])[query_text]
     scores = _cosine_search(query_embedding, embeddings)
 
     ranked_indices = np.argsort(scores)[::-1]
@@ -1604,8 +2171,11 @@ def _pick_dataset_candidates(req: GenerateRequest, field_name: str, retrieved: L
     return fallback_output
 
 
+_CLAUSE_SPLIT_RE = re.compile(r'(?<=[.;:!?])\s+|\s+(?:and|but|while|because|so|which|that)\s+', re.IGNORECASE)
+
+
 def _split_clauses(text: str) -> List[str]:
-    raw = re.split(r'(?<=[.;:!?])\s+|\s+(?:and|but|while|because|so|which|that)\s+', _normalize_whitespace(text), flags=re.IGNORECASE)
+    raw = _CLAUSE_SPLIT_RE.split(_normalize_whitespace(text))
     cleaned: List[str] = []
     seen = set()
     for part in raw:
@@ -1618,21 +2188,24 @@ def _split_clauses(text: str) -> List[str]:
     return cleaned
 
 
+_CANDIDATE_REJECT_RE = re.compile(
+    r"\bprofile(s)?\b"
+    r"|\brating pattern\b"
+    r"|\btarget practice\b"
+    r"|\bvisible in future observations\b"
+    r"|\bappropriate when\b"
+    r"|\bmore noticeable during the lesson\b"
+    r"|\btargeted refinements needed\b",
+    re.IGNORECASE,
+)
+
+
 def _is_clean_candidate_text(text: str, field_name: str) -> bool:
     normalized = _normalize_whitespace(text)
     if not normalized or len(normalized.split()) < 6:
         return False
 
-    reject_patterns = [
-        r"\bprofile(s)?\b",
-        r"\brating pattern\b",
-        r"\btarget practice\b",
-        r"\bvisible in future observations\b",
-        r"\bappropriate when\b",
-        r"\bmore noticeable during the lesson\b",
-        r"\btargeted refinements needed\b",
-    ]
-    if any(re.search(pattern, normalized, re.IGNORECASE) for pattern in reject_patterns):
+    if _CANDIDATE_REJECT_RE.search(normalized):
         return False
 
     clauses = _split_clauses(normalized)
@@ -1642,44 +2215,109 @@ def _is_clean_candidate_text(text: str, field_name: str) -> bool:
     return any(_normalize_clause_shape(clause, field_name) for clause in clauses)
 
 
+_RECONSTRUCTION_REJECT_RE = re.compile(
+    r"\bthis\s+(?:is|was|can|should)\b"
+    r"|\bperformance should\b"
+    r"|\buse this\b"
+    r"|\bstill needs more consistent classroom evidence\b",
+    re.IGNORECASE,
+)
+
+
 def _is_clean_reconstruction_clause(text: str, field_name: str) -> bool:
     normalized = _normalize_clause_shape(text, field_name)
     if not normalized or len(normalized.split()) < 4 or _looks_meta_clause(normalized):
         return False
 
-    reject_patterns = [
-        r"\bthis\s+(?:is|was|can|should)\b",
-        r"\bperformance should\b",
-        r"\buse this\b",
-        r"\bstill needs more consistent classroom evidence\b",
-    ]
-    return not any(re.search(pattern, normalized, re.IGNORECASE) for pattern in reject_patterns)
+    return not _RECONSTRUCTION_REJECT_RE.search(normalized)
+
+
+_META_CLAUSE_RE = re.compile(
+    r"\bwhat stood out during the class was\b"
+    r"|\bfrom the evaluator'?s notes\b"
+    r"|\bfrom a classroom perspective\b"
+    r"|\bthe teacher'?s practice indicates\b"
+    r"|\bthis area'?s practice indicates\b"
+    r"|\bthis pattern\b"
+    r"|\brating pattern\b"
+    r"|\bevaluation profile\b"
+    r"|\btarget practice\b"
+    r"|\bclassroom practice\b"
+    r"|\bperformance in the observed area\b"
+    r"|\bvisible in future observations\b"
+    r"|\bappropriate when\b"
+    r"|\bprofile(s)?\b"
+    r"|\brating\b"
+    r"|\bperformance is\b"
+    r"|\bobservation period\b",
+    re.IGNORECASE,
+)
 
 
 def _looks_meta_clause(text: str) -> bool:
     normalized = _normalize_clause_fragment(text)
     if not normalized:
         return True
-    meta_patterns = [
-        r"\bwhat stood out during the class was\b",
-        r"\bfrom the evaluator'?s notes\b",
-        r"\bfrom a classroom perspective\b",
-        r"\bthe teacher'?s practice indicates\b",
-        r"\bthis area'?s practice indicates\b",
-        r"\bthis pattern\b",
-        r"\brating pattern\b",
-        r"\bevaluation profile\b",
-        r"\btarget practice\b",
-        r"\bclassroom practice\b",
-        r"\bperformance in the observed area\b",
-        r"\bvisible in future observations\b",
-        r"\bappropriate when\b",
-        r"\bprofile(s)?\b",
-        r"\brating\b",
-        r"\bperformance is\b",
-        r"\bobservation period\b",
-    ]
-    return any(re.search(pattern, normalized, re.IGNORECASE) for pattern in meta_patterns)
+    return _META_CLAUSE_RE.search(normalized) is not None
+
+
+_EVIDENCE_VERBS = "adjusts|uses|maintains|monitors|organizes|supports|checks|explains"
+_ACTION_LEAD_RE = re.compile(r"^(use|provide|plan|apply|build|prioritize|strengthen|restate|pause|review|monitor|establish)\b", re.IGNORECASE)
+_EVIDENCE_LEAD_RE = re.compile(rf"^({_EVIDENCE_VERBS})\b", re.IGNORECASE)
+_STRENGTH_VERB_INFLECTIONS = {
+    "adjust": "adjusts",
+    "use": "uses",
+    "maintain": "maintains",
+    "monitor": "monitors",
+    "organize": "organizes",
+    "support": "supports",
+    "check": "checks",
+    "explain": "explains",
+}
+_STRENGTH_BASE_VERB_RE = re.compile(rf"^({'|'.join(_STRENGTH_VERB_INFLECTIONS)})\b", re.IGNORECASE)
+_NEEDS_LANGUAGE_RE = re.compile(r"\bneeds|should|improve|could be improved|benefit from\b", re.IGNORECASE)
+_NEED_CLAUSE_RE = re.compile(r"\b(needs|need to|should|improve|improved|limited|lacks|inconsistent|could be improved|benefit from)\b", re.IGNORECASE)
+_EVIDENCE_CLAUSE_RE = re.compile(r"\b(demonstrates|shows|maintains|uses|explains|adjusts|monitors|organizes|supports|checks)\b", re.IGNORECASE)
+_REPEATED_SPACES_RE = re.compile(r"\s{2,}")
+
+# Filler phrases dropped before a clause is reshaped, applied in order. The
+# literal phrases never overlap each other, so each run of them is one
+# alternation; the "needs to strengthen ... helped" sweep has to see the text
+# after the "this helped show ..." phrase is gone, so those stay separate.
+_CLAUSE_SHAPE_REMOVALS = [
+    re.compile(
+        r"\bthis made the teaching practice more noticeable during the lesson\b"
+        r"|\bmore noticeable during the lesson\b"
+        r"|\bthe practice is consistently visible\b"
+        r"|\btargeted refinements needed to reach an excellent level\b"
+        r"|\bthis added stronger evidence of intentional\b"
+        r"|\bshould now be sustained\b"
+        r"|\bwhat matters most here is not adding more activities\b",
+        re.IGNORECASE,
+    ),
+    re.compile(r"\bthis helped show a clearer link between instruction, participation\b", re.IGNORECASE),
+    re.compile(r"\bneeds to strengthen [^.]*\b(contributed|helped)\b[^.]*", re.IGNORECASE),
+    re.compile(
+        r"\bwhat stood out during the class was\b"
+        r"|\bfrom the evaluator'?s notes\b"
+        r"|\bfrom a classroom perspective\b"
+        r"|\bthe teacher'?s practice indicates\b"
+        r"|\bthis area'?s practice indicates\b",
+        re.IGNORECASE,
+    ),
+]
+
+_CLAUSE_SHAPE_FIXUPS = [
+    (re.compile(r"\bthe teacher demonstrates\s+(adjust|use|maintain|monitor|organize|support|check|explain)\b", re.IGNORECASE), r"the teacher \1s"),
+    (re.compile(r"\bthe teacher reflects\s+(use|adjust|maintain|monitor|organize|support|check|explain)\b", re.IGNORECASE), r"the teacher \1s"),
+    (re.compile(rf"\bthe teacher (demonstrates|shows|reflects|highlights)\s+({_EVIDENCE_VERBS})\b", re.IGNORECASE), r"the teacher \2"),
+    (re.compile(r"\b(use|apply|plan|provide|build|prioritize|strengthen)\s+use\b", re.IGNORECASE), r"\1"),
+    (re.compile(r"\bneeds to needs to\b", re.IGNORECASE), "needs to"),
+    (re.compile(r"\bneeds to strengthen this\b", re.IGNORECASE), "needs to strengthen classroom feedback"),
+    (re.compile(r"\bneeds to strengthen the teacher\b", re.IGNORECASE), "needs clearer teacher support in this area"),
+    (re.compile(r"\bneeds to strengthen [^.]*\b(contributed|helped)\b[^.]*", re.IGNORECASE), "needs to strengthen classroom feedback routines"),
+    (re.compile(r"\bthe teacher\s+(shows|reflects|highlights)\s+should\b", re.IGNORECASE), "the teacher should"),
+]
 
 
 def _normalize_clause_shape(text: str, field_name: str) -> str:
@@ -1687,21 +2325,9 @@ def _normalize_clause_shape(text: str, field_name: str) -> str:
     if not normalized or _looks_meta_clause(normalized):
         return ""
 
-    normalized = re.sub(r"\bthis made the teaching practice more noticeable during the lesson\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bmore noticeable during the lesson\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bthe practice is consistently visible\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\btargeted refinements needed to reach an excellent level\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bthis added stronger evidence of intentional\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bshould now be sustained\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bwhat matters most here is not adding more activities\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bthis helped show a clearer link between instruction, participation\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bneeds to strengthen [^.]*\b(contributed|helped)\b[^.]*", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bwhat stood out during the class was\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bfrom the evaluator'?s notes\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bfrom a classroom perspective\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bthe teacher'?s practice indicates\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bthis area'?s practice indicates\b", "", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\s{2,}", " ", normalized).strip(" ,.;:-")
+    for pattern in _CLAUSE_SHAPE_REMOVALS:
+        normalized = pattern.sub("", normalized)
+    normalized = _REPEATED_SPACES_RE.sub(" ", normalized).strip(" ,.;:-")
 
     if not normalized or _looks_meta_clause(normalized):
         return ""
@@ -1709,52 +2335,34 @@ def _normalize_clause_shape(text: str, field_name: str) -> str:
     clause_type = _classify_clause(normalized, field_name)
 
     if field_name == "strengths":
-        verb_map = {
-            "adjust": "adjusts",
-            "use": "uses",
-            "maintain": "maintains",
-            "monitor": "monitors",
-            "organize": "organizes",
-            "support": "supports",
-            "check": "checks",
-            "explain": "explains",
-        }
-        for base, inflected in verb_map.items():
-            normalized = re.sub(rf"^{base}\b", inflected, normalized, flags=re.IGNORECASE)
-        if re.match(r"^(adjusts|uses|maintains|monitors|organizes|supports|checks|explains)\b", normalized, re.IGNORECASE):
+        normalized = _STRENGTH_BASE_VERB_RE.sub(lambda m: _STRENGTH_VERB_INFLECTIONS[m.group(1).lower()], normalized)
+        if _EVIDENCE_LEAD_RE.match(normalized):
             normalized = f"the teacher {normalized}"
     elif field_name == "areas_for_improvement":
-        if clause_type == "evidence" and re.match(r"^(adjusts|uses|maintains|monitors|organizes|supports|checks|explains)\b", normalized, re.IGNORECASE):
-            normalized = re.sub(r"^(adjusts|uses|maintains|monitors|organizes|supports|checks|explains)\b", r"needs to \1", normalized, count=1, flags=re.IGNORECASE)
-        elif clause_type == "detail" and not re.search(r"\bneeds|should|improve|could be improved|benefit from\b", normalized, re.IGNORECASE):
+        if clause_type == "evidence" and _EVIDENCE_LEAD_RE.match(normalized):
+            normalized = _EVIDENCE_LEAD_RE.sub(r"needs to \1", normalized, count=1)
+        elif clause_type == "detail" and not _NEEDS_LANGUAGE_RE.search(normalized):
             normalized = f"needs to strengthen {normalized}"
     elif field_name == "recommendations":
-        if re.match(r"^(adjusts|uses|maintains|monitors|organizes|supports|checks|explains)\b", normalized, re.IGNORECASE):
-            normalized = re.sub(r"^(adjusts|uses|maintains|monitors|organizes|supports|checks|explains)\b", r"\1 more consistently", normalized, count=1, flags=re.IGNORECASE)
-        elif clause_type != "action" and not re.match(r"^(use|provide|plan|apply|build|prioritize|strengthen|restate|pause|review|monitor|establish)\b", normalized, re.IGNORECASE):
+        if _EVIDENCE_LEAD_RE.match(normalized):
+            normalized = _EVIDENCE_LEAD_RE.sub(r"\1 more consistently", normalized, count=1)
+        elif clause_type != "action" and not _ACTION_LEAD_RE.match(normalized):
             normalized = f"use {normalized}"
 
-    normalized = re.sub(r"\bthe teacher demonstrates\s+(adjust|use|maintain|monitor|organize|support|check|explain)\b", r"the teacher \1s", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bthe teacher reflects\s+(use|adjust|maintain|monitor|organize|support|check|explain)\b", r"the teacher \1s", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bthe teacher (demonstrates|shows|reflects|highlights)\s+(uses|adjusts|maintains|monitors|organizes|supports|checks|explains)\b", r"the teacher \2", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\b(use|apply|plan|provide|build|prioritize|strengthen)\s+use\b", r"\1", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bneeds to needs to\b", "needs to", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bneeds to strengthen this\b", "needs to strengthen classroom feedback", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bneeds to strengthen the teacher\b", "needs clearer teacher support in this area", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bneeds to strengthen [^.]*\b(contributed|helped)\b[^.]*", "needs to strengthen classroom feedback routines", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\bthe teacher\s+(shows|reflects|highlights)\s+should\b", "the teacher should", normalized, flags=re.IGNORECASE)
-    normalized = re.sub(r"\s{2,}", " ", normalized).strip(" ,.;:-")
+    for pattern, replacement in _CLAUSE_SHAPE_FIXUPS:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = _REPEATED_SPACES_RE.sub(" ", normalized).strip(" ,.;:-")
 
     return "" if _looks_meta_clause(normalized) else _normalize_clause_fragment(normalized)
 
 
 def _classify_clause(text: str, field_name: str) -> str:
     normalized = _normalize_clause_fragment(text)
-    if re.match(r"^(use|provide|plan|apply|build|prioritize|strengthen|restate|pause|review|monitor|establish)\b", normalized, re.IGNORECASE):
+    if _ACTION_LEAD_RE.match(normalized):
         return "action"
-    if re.search(r"\b(needs|need to|should|improve|improved|limited|lacks|inconsistent|could be improved|benefit from)\b", normalized, re.IGNORECASE):
+    if _NEED_CLAUSE_RE.search(normalized):
         return "need"
-    if re.search(r"\b(demonstrates|shows|maintains|uses|explains|adjusts|monitors|organizes|supports|checks)\b", normalized, re.IGNORECASE):
+    if _EVIDENCE_CLAUSE_RE.search(normalized):
         return "evidence"
     if _looks_meta_clause(normalized):
         return "meta"
@@ -2188,18 +2796,15 @@ def _summarize_comments_for_field(req: GenerateRequest, comments: List[Dict[str,
             domain_criterion_items.sort(key=lambda c: (-float(c.get("rating") or 0), c.get("index", 0)))
         else:
             domain_criterion_items.sort(key=lambda c: (float(c.get("rating") or 0), c.get("index", 0)))
-        for item in domain_criterion_items[:2]:
-            item["comment"] = item["criterion_text"]
-        domain_items = domain_criterion_items[:2]
+        # Copies: prioritized items are shared across the request.
+        domain_items = [dict(item, comment=item["criterion_text"]) for item in domain_criterion_items[:2]]
         if not domain_items:
             all_criterion_items = [item for item in prioritized if item.get("criterion_text")]
             if field_name == "strengths":
                 all_criterion_items.sort(key=lambda c: (-float(c.get("rating") or 0), c.get("index", 0)))
             else:
                 all_criterion_items.sort(key=lambda c: (float(c.get("rating") or 0), c.get("index", 0)))
-            for item in all_criterion_items[:2]:
-                item["comment"] = item["criterion_text"]
-            general_items = all_criterion_items[:2]
+            general_items = [dict(item, comment=item["criterion_text"]) for item in all_criterion_items[:2]]
 
     if field_name == "strengths":
         chosen_source = domain_items or general_items
@@ -2250,9 +2855,8 @@ def _summarize_comments_for_field(req: GenerateRequest, comments: List[Dict[str,
     raise ValueError(f"Unsupported AI-assisted field: {field_name}")
 
 
-def _retrieve_form_feedback(req: GenerateRequest, comments: List[Dict[str, Any]]) -> Tuple[Dict[str, str], Dict[str, List[Dict[str, Any]]]]:
-    retrieval_system = _load_feedback_retrieval_system()
-    form_type = _effective_form_type(req)
+def _compose_form_queries(req: GenerateRequest, comments: List[Dict[str, Any]]) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """Per-field retrieval queries, plus extra queries for tied domains."""
     sig = _evaluation_signature(req)
 
     # When domains are tied, query additional domains for variety
@@ -2278,16 +2882,43 @@ def _retrieve_form_feedback(req: GenerateRequest, comments: List[Dict[str, Any]]
                 q = _compose_field_query(req, comments, fn, target_domain_override=domain)
                 if q:
                     extra_queries[fn].append(q)
+    return queries, extra_queries
 
+
+def _retrieve_form_feedback(
+    req: GenerateRequest,
+    comments: List[Dict[str, Any]],
+    form_queries: Optional[Tuple[Dict[str, str], Dict[str, List[str]]]] = None,
+    query_vectors: Optional[Dict[str, np.ndarray]] = None,
+) -> Tuple[Dict[str, str], Dict[str, List[Dict[str, Any]]]]:
+    retrieval_system = _load_feedback_retrieval_system()
+    form_type = _effective_form_type(req)
+    queries, extra_queries = form_queries or _compose_form_queries(req, comments)
+
+    # One batched lookup: the field queries (top 10) and any tied-domain extras (top 5).
+    lookups = [(field_name, query, 10) for field_name, query in queries.items() if query.strip()]
+    primary_count = len(lookups)
+    lookups += [(field_name, eq, 5) for field_name, extra_qs in extra_queries.items() for eq in extra_qs]
     try:
-        matched_top = retrieval_system.retrieve_top_feedback_for_form(queries, top_k=10, form_type=form_type)
+        query_embeddings = None
+        if query_vectors and all(query in query_vectors for _, query, _ in lookups):
+            query_embeddings = np.vstack([query_vectors[query] for _, query, _ in lookups]) if lookups else None
+        batch_results = retrieval_system.retrieve_top_feedback_batch(lookups, form_type=form_type, query_embeddings=query_embeddings)
     except Exception:
-        matched_top = {}
-        for field_name, query in queries.items():
+        batch_results = []
+        for field_name, query, top_k in lookups:
             try:
-                matched_top[field_name] = retrieval_system.retrieve_top_feedback(field_name, query, top_k=10, form_type=form_type)
+                batch_results.append(retrieval_system.retrieve_top_feedback(field_name, query, top_k=top_k, form_type=form_type))
             except Exception:
-                matched_top[field_name] = []
+                batch_results.append([])
+
+    matched_top: Dict[str, List[Any]] = {field_name: [] for field_name in queries}
+    extra_results: Dict[str, List[List[Any]]] = {field_name: [] for field_name in extra_queries}
+    for position, ((field_name, _, _), matches) in enumerate(zip(lookups, batch_results)):
+        if position < primary_count:
+            matched_top[field_name] = matches
+        else:
+            extra_results[field_name].append(matches)
 
     def _field_matches(field_name: str) -> List[Dict[str, Any]]:
         matches = matched_top.get(field_name) or []
@@ -2308,36 +2939,33 @@ def _retrieve_form_feedback(req: GenerateRequest, comments: List[Dict[str, Any]]
         for field_name in queries
     }
 
-    # When domains are tied, retrieve from additional domains and merge results
-    if domains_tied:
-        for field_name, extra_qs in extra_queries.items():
-            for eq in extra_qs:
-                try:
-                    extra_matches = retrieval_system.retrieve_top_feedback(field_name, eq, top_k=5, form_type=form_type)
-                except Exception:
-                    extra_matches = []
-                existing_fps = {_comment_fingerprint(m.get("feedback_text", "")) for m in field_specific_matches[field_name]}
-                for match in extra_matches:
-                    ft = getattr(match, "feedback_text", None)
-                    if ft and _comment_fingerprint(ft) not in existing_fps:
-                        field_specific_matches[field_name].append({
-                            "feedback_text": ft,
-                            "evaluation_comment": match.evaluation_comment,
-                            "category": _field_target_category(req, field_name),
-                            "source": f"mysql:{field_name}:tied_domain",
-                            "similarity": match.similarity,
-                        })
-                        existing_fps.add(_comment_fingerprint(ft))
+    # When domains are tied, merge results from the additional domains
+    for field_name, extra_match_lists in extra_results.items():
+        for extra_matches in extra_match_lists:
+            existing_fps = {_comment_fingerprint(m.get("feedback_text", "")) for m in field_specific_matches[field_name]}
+            for match in extra_matches:
+                ft = getattr(match, "feedback_text", None)
+                if ft and _comment_fingerprint(ft) not in existing_fps:
+                    field_specific_matches[field_name].append({
+                        "feedback_text": ft,
+                        "evaluation_comment": match.evaluation_comment,
+                        "category": _field_target_category(req, field_name),
+                        "source": f"mysql:{field_name}:tied_domain",
+                        "similarity": match.similarity,
+                    })
+                    existing_fps.add(_comment_fingerprint(ft))
 
     # Filter retrieved seed items to exclude domains not in the evaluation focus
     focus = _parse_evaluation_focus(req)
-    print(f"[RETRIEVE_FORM] focus={focus} fields={list(queries.keys())} pre_filter_counts={{fn: len(items) for fn, items in field_specific_matches.items()}}")
+    pre_focus_counts = {fn: len(items) for fn, items in field_specific_matches.items()}
+    print(f"[RETRIEVE_FORM] focus={focus} fields={list(queries.keys())} pre_filter_counts={pre_focus_counts}")
     if focus:
         field_specific_matches = {
             field_name: _filter_retrieved_by_focus(items, focus)
             for field_name, items in field_specific_matches.items()
         }
-    print(f"[RETRIEVE_FORM] post_filter_counts={{fn: len(items) for fn, items in field_specific_matches.items()}}")
+    post_focus_counts = {fn: len(items) for fn, items in field_specific_matches.items()}
+    print(f"[RETRIEVE_FORM] post_filter_counts={post_focus_counts}")
 
     # Filter out templates that contradict actual indicator ratings
     all_comments = _flatten_comments(req)
@@ -2349,6 +2977,11 @@ def _retrieve_form_feedback(req: GenerateRequest, comments: List[Dict[str, Any]]
     }
     post_contradiction_counts = {fn: len(items) for fn, items in field_specific_matches.items()}
     print(f"[RETRIEVE_FORM] rating_contradiction_filter: before={pre_contradiction_counts} after={post_contradiction_counts}")
+    trace_record("candidates", {
+        "stage": "retrieve_form_feedback",
+        "focus_filter": {"before": pre_focus_counts, "after": post_focus_counts},
+        "rating_filter": {"before": pre_contradiction_counts, "after": post_contradiction_counts},
+    })
 
     feedback = {
         field_name: _paraphrase_dataset_feedback(
@@ -2897,13 +3530,7 @@ def _match_indicator_for_text(
 
 def _detect_text_domain(text: str) -> str:
     """Detect which domain a feedback text best belongs to using keyword matching."""
-    best_domain = ""
-    best_hits = 0
-    for dname in _DOMAIN_FILTER_KEYWORDS:
-        hits = _count_domain_keyword_matches(text, dname)
-        if hits > best_hits:
-            best_hits = hits
-            best_domain = dname
+    best_domain = _DOMAIN_KEYWORD_MATCHER.best_group(text)
     return _normalize_domain_name(best_domain) if best_domain else ""
 
 
@@ -3193,13 +3820,21 @@ def _make_three_options(base_text: str, req: GenerateRequest, field_name: str, r
     Sentence starters are varied to avoid repetitive patterns."""
     # Filter retrieved items by evaluation focus before building options
     focus = _parse_evaluation_focus(req)
+    candidate_counts = [len(retrieved)]
     if focus:
         retrieved = _filter_retrieved_by_focus(retrieved, focus)
+    candidate_counts.append(len(retrieved))
 
     # Filter out templates that contradict actual indicator ratings
     all_comments = _flatten_comments(req)
     max_scale = 4.0 if _is_peac_request(req) else 5.0
     retrieved = _filter_by_rating_relevance(retrieved, all_comments, field_name, max_scale)
+    trace_record("candidates", {
+        "stage": "make_three_options",
+        "field": field_name,
+        "focus_filter": {"before": candidate_counts[0], "after": candidate_counts[1]},
+        "rating_filter": {"before": candidate_counts[1], "after": len(retrieved)},
+    })
 
     rng = random.Random(
         _stable_seed(
@@ -3239,14 +3874,7 @@ def _make_three_options(base_text: str, req: GenerateRequest, field_name: str, r
         if core_fp:
             seen_core_fp.add(core_fp)
         # Detect which domain this candidate belongs to (for distribution across tied domains)
-        best_domain = ""
-        best_domain_hits = 0
-        for dname in _DOMAIN_FILTER_KEYWORDS:
-            hits = _count_domain_keyword_matches(text, dname)
-            if hits > best_domain_hits:
-                best_domain_hits = hits
-                best_domain = dname
-        candidates.append({"text": text, "domain": best_domain})
+        candidates.append({"text": text, "domain": _DOMAIN_KEYWORD_MATCHER.best_group(text)})
 
     rng.shuffle(candidates)
 
@@ -3403,38 +4031,261 @@ def _make_three_options(base_text: str, req: GenerateRequest, field_name: str, r
     return out[:3]
 
 
+def _service_busy_response(request_id: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={
+            "message": "AI service is busy",
+            "max_in_flight": GENERATE_MAX_IN_FLIGHT,
+            "retry_after": GENERATE_RETRY_AFTER_SECONDS,
+        },
+        headers={"Retry-After": str(GENERATE_RETRY_AFTER_SECONDS), "X-Request-ID": request_id},
+    )
+
+
+def _request_id(request: Request) -> str:
+    """The caller's X-Request-ID when it is a sane token, otherwise a fresh one."""
+    supplied = (request.headers.get("x-request-id") or "").strip()
+    return supplied if _REQUEST_ID_RE.match(supplied) else uuid.uuid4().hex
+
+
 @app.post("/generate", response_model=GenerateResponse)
-def generate(req: GenerateRequest):
-    """Generate 3 unique feedback suggestions per category from seed data."""
-    comments = _flatten_comments(req)
-    prioritized_comments = _prioritize_comments(req, comments)
-    retrieved = _retrieve_top_comments(req, comments)
-    field_feedback, field_retrieved = _retrieve_form_feedback(req, comments)
-    strengths_fallback = _summarize_comments_for_field(req, comments, "strengths")
-    improvement_fallback = _summarize_comments_for_field(req, comments, "areas_for_improvement")
-    recommendations_fallback = _summarize_comments_for_field(req, comments, "recommendations")
+async def generate(req: GenerateRequest, request: Request, response: Response):
+    """Generate 3 unique feedback suggestions per category from seed data.
+
+    Send `X-Trace: 1` to get the request's stage/DB/encode breakdown in
+    `debug.trace`; it is also kept for /debug/trace/{request_id} either way.
+    """
+    request_id = _request_id(request)
+    include_trace = (request.headers.get("x-trace") or "").strip().lower() in ("1", "true", "yes")
+    if not _generate_slots.acquire(blocking=False):
+        generate_outcomes["busy"].inc()
+        return _service_busy_response(request_id)
+    response.headers["X-Request-ID"] = request_id
+    _track_in_flight(1)
+    try:
+        future = _generate_executor.submit(_generate_response, req, request_id, include_trace)
+    except Exception:
+        _release_generate_slot(None)
+        raise
+    # The slot is freed when the work finishes, even if the client has gone away.
+    future.add_done_callback(_release_generate_slot)
+    return await asyncio.wrap_future(future)
+
+
+@app.post("/generate/batch")
+async def generate_batch(reqs: List[GenerateRequest], request: Request):
+    """Generate suggestions for many evaluations, streamed back as NDJSON.
+
+    The queries of all items are encoded together and every item sees the same
+    template index snapshot. Each line is `{"index": i, "response": {...}}`, or
+    `{"index": i, "error": "..."}` for an item that failed, in request order and
+    written as soon as that item is done. The batch holds one in-flight slot.
+    """
+    if len(reqs) > GENERATE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {GENERATE_BATCH_MAX_ITEMS} items per batch")
+    request_id = _request_id(request)
+    if not _generate_slots.acquire(blocking=False):
+        generate_outcomes["busy"].inc()
+        return _service_busy_response(request_id)
+    _track_in_flight(1)
+
+    loop = asyncio.get_running_loop()
+    lines: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    stopped = Event()
+
+    def emit(line: Optional[str]) -> None:
+        try:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+        except RuntimeError:
+            # Event loop already closed (server shutting down); nobody is reading.
+            stopped.set()
+
+    try:
+        future = _generate_executor.submit(_generate_batch, reqs, request_id, emit, stopped)
+    except Exception:
+        _release_generate_slot(None)
+        raise
+    future.add_done_callback(_release_generate_slot)
+
+    async def stream():
+        try:
+            while True:
+                line = await lines.get()
+                if line is None:
+                    break
+                yield line
+        finally:
+            # Client gone or stream finished: stop before the next item.
+            stopped.set()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers={"X-Request-ID": request_id})
+
+
+def _track_in_flight(delta: int) -> None:
+    global _generate_in_flight
+    with _generate_in_flight_lock:
+        _generate_in_flight += delta
+
+
+def _release_generate_slot(future: Optional[Any]) -> None:
+    failed = future is None or future.cancelled() or future.exception() is not None
+    generate_outcomes["error" if failed else "ok"].inc()
+    _track_in_flight(-1)
+    _generate_slots.release()
+
+
+def _generate_response(req: GenerateRequest, request_id: Optional[str] = None, include_trace: bool = False) -> GenerateResponse:
+    with request_trace(request_id or uuid.uuid4().hex) as trace:
+        with stage_timer("total"):
+            result = _generate_response_stages(req)
+    summary = trace.as_dict()
+    trace_history.put(summary)
+    total = summary["stages"].get("total", {})
+    print(
+        f"[TRACE] request_id={trace.request_id} total_ms={total.get('wall_ms')} cpu_ms={total.get('cpu_ms')} "
+        f"db_round_trips={trace.counters.get('db.round_trips', 0)}"
+    )
+    if include_trace:
+        result.debug = {**(result.debug or {}), "trace": summary}
+    return result
+
+
+def _generate_batch(
+    reqs: List[GenerateRequest],
+    request_id: str,
+    emit: Callable[[Optional[str]], None],
+    stopped: Event,
+) -> None:
+    """Run a /generate/batch request on one executor thread, handing each NDJSON line to `emit`."""
+    started = time.perf_counter()
+    done = 0
+    try:
+        with request_trace(request_id) as trace:
+            for position, result in generate_items(reqs, stopped=stopped):
+                if isinstance(result, GenerateResponse):
+                    line: Dict[str, Any] = {"index": position, "response": jsonable_encoder(result)}
+                else:
+                    line = {"index": position, "error": str(result)}
+                emit(json.dumps(line) + "\n")
+                done += 1
+        trace_history.put(trace.as_dict())
+    finally:
+        emit(None)
+        elapsed = time.perf_counter() - started
+        print(f"[BATCH] request_id={request_id} items={done}/{len(reqs)} in {elapsed:.2f}s ({done / max(elapsed, 1e-9):.1f} items/s)")
+
+
+def generate_items(
+    reqs: List[GenerateRequest],
+    stopped: Optional[Event] = None,
+) -> Iterator[Tuple[int, Union[GenerateResponse, Exception]]]:
+    """Generate several requests with one shared encode call and one template index snapshot.
+
+    Yields `(position, response)` in request order, or `(position, exception)`
+    for an item that failed; stops early once `stopped` is set. Used by
+    /generate/batch and the offline back-generation job.
+    """
+    index = getattr(_load_feedback_retrieval_system(), "index", None)
+    with index.snapshot() if index is not None else nullcontext():
+        prepared: List[Union[PreparedGeneration, Exception]] = []
+        for req in reqs:
+            try:
+                prepared.append(PreparedGeneration(req))
+            except Exception as exc:
+                prepared.append(exc)
+        with stage_timer("encode"):
+            query_vectors = _encode_queries(
+                [text for item in prepared if isinstance(item, PreparedGeneration) for text in item.query_texts]
+            )
+        for position, item in enumerate(prepared):
+            if stopped is not None and stopped.is_set():
+                return
+            if isinstance(item, PreparedGeneration):
+                try:
+                    item = _finish_generation(item, query_vectors)
+                except Exception as exc:
+                    traceback.print_exc()
+                    item = exc
+            yield position, item
+
+
+class PreparedGeneration:
+    """A request with its context built and retrieval queries composed, waiting for query vectors.
+
+    /generate encodes one of these at a time; /generate/batch encodes the
+    queries of all its items in one call before finishing each.
+    """
+
+    def __init__(self, req: GenerateRequest) -> None:
+        self.req = req
+        self.context = GenerationContext.attach(req)
+        self.sections = DEBUG_SECTIONS[_response_detail(req)]
+        # The whole-dataset top-comment search only feeds the debug payload.
+        self.wants_top_comments = "top_comments" in self.sections or "mysql_sources" in self.sections
+        with stage_timer("flatten_prioritize"):
+            self.comments = self.context.comments
+            self.prioritized_comments = self.context.prioritized
+        with stage_timer("compose_queries"):
+            self.query_text = _compose_query_text(req, self.comments) if self.wants_top_comments else None
+            self.form_queries = _compose_form_queries(req, self.comments)
+
+    @property
+    def query_texts(self) -> List[str]:
+        return [
+            *([self.query_text] if self.query_text is not None else []),
+            *self.form_queries[0].values(),
+            *(q for extra in self.form_queries[1].values() for q in extra),
+        ]
+
+
+def _generate_response_stages(req: GenerateRequest) -> GenerateResponse:
+    prepared = PreparedGeneration(req)
+    # Every query of the request goes through the encoder in a single batch.
+    with stage_timer("encode"):
+        query_vectors = _encode_queries(prepared.query_texts)
+    return _finish_generation(prepared, query_vectors)
+
+
+def _finish_generation(prepared: PreparedGeneration, query_vectors: Dict[str, np.ndarray]) -> GenerateResponse:
+    req, context, sections = prepared.req, prepared.context, prepared.sections
+    comments, prioritized_comments = prepared.comments, prepared.prioritized_comments
+    query_text, form_queries, wants_top_comments = prepared.query_text, prepared.form_queries, prepared.wants_top_comments
+    retrieved: List[Dict[str, Any]] = []
+    if wants_top_comments:
+        with stage_timer("retrieve_top_comments"):
+            retrieved = _retrieve_top_comments(req, comments, query_text=query_text, query_vectors=query_vectors)
+    with stage_timer("retrieve_form_feedback"):
+        field_feedback, field_retrieved = _retrieve_form_feedback(req, comments, form_queries=form_queries, query_vectors=query_vectors)
+    with stage_timer("summarize_fallbacks"):
+        strengths_fallback = _summarize_comments_for_field(req, comments, "strengths")
+        improvement_fallback = _summarize_comments_for_field(req, comments, "areas_for_improvement")
+        recommendations_fallback = _summarize_comments_for_field(req, comments, "recommendations")
 
     # Get the primary feedback text for each field (raw, no subject injection yet)
     strengths_primary = field_feedback.get("strengths") or strengths_fallback
     improvement_primary = field_feedback.get("areas_for_improvement") or improvement_fallback
     recommendations_primary = field_feedback.get("recommendations") or recommendations_fallback
-    sig = _evaluation_signature(req)
+    sig = context.signature
 
     # Build 3 options per field — the primary text becomes the first option
-    max_scale = 4.0 if _is_peac_request(req) else 5.0
-    strengths_options = _make_three_options(strengths_primary, req, "strengths", field_retrieved.get("strengths", []))
-    improvement_options = _make_three_options(improvement_primary, req, "areas_for_improvement", field_retrieved.get("areas_for_improvement", []))
-    recommendation_options = _make_three_options(recommendations_primary, req, "recommendations", field_retrieved.get("recommendations", []))
+    max_scale = 4.0 if context.is_peac else 5.0
+    with stage_timer("make_three_options"):
+        strengths_options = _make_three_options(strengths_primary, req, "strengths", field_retrieved.get("strengths", []))
+        improvement_options = _make_three_options(improvement_primary, req, "areas_for_improvement", field_retrieved.get("areas_for_improvement", []))
+        recommendation_options = _make_three_options(recommendations_primary, req, "recommendations", field_retrieved.get("recommendations", []))
 
     # Ensure at least one option in each category targets the most critical indicator
-    strengths_options = _ensure_critical_indicator_mentioned(strengths_options, comments, "strengths", max_scale)
-    improvement_options = _ensure_critical_indicator_mentioned(improvement_options, comments, "areas_for_improvement", max_scale)
-    recommendation_options = _ensure_critical_indicator_mentioned(recommendation_options, comments, "recommendations", max_scale)
+    with stage_timer("critical_indicator"):
+        strengths_options = _ensure_critical_indicator_mentioned(strengths_options, comments, "strengths", max_scale)
+        improvement_options = _ensure_critical_indicator_mentioned(improvement_options, comments, "areas_for_improvement", max_scale)
+        recommendation_options = _ensure_critical_indicator_mentioned(recommendation_options, comments, "recommendations", max_scale)
 
     # Enrich each option with evaluator's rating context (adds rating summary sentence)
-    strengths_options = [_enrich_with_rating_context(opt, comments, "strengths", req, i) for i, opt in enumerate(strengths_options)]
-    improvement_options = [_enrich_with_rating_context(opt, comments, "areas_for_improvement", req, i) for i, opt in enumerate(improvement_options)]
-    recommendation_options = [_enrich_with_rating_context(opt, comments, "recommendations", req, i) for i, opt in enumerate(recommendation_options)]
+    with stage_timer("enrich_with_rating_context"):
+        strengths_options = [_enrich_with_rating_context(opt, comments, "strengths", req, i) for i, opt in enumerate(strengths_options)]
+        improvement_options = [_enrich_with_rating_context(opt, comments, "areas_for_improvement", req, i) for i, opt in enumerate(improvement_options)]
+        recommendation_options = [_enrich_with_rating_context(opt, comments, "recommendations", req, i) for i, opt in enumerate(recommendation_options)]
 
     # Final dedup safety net: remove any exact duplicate options
     def _final_dedup(options: List[str]) -> List[str]:
@@ -3447,22 +4298,23 @@ def generate(req: GenerateRequest):
                 result.append(opt)
         return result
 
-    strengths_options = _final_dedup(strengths_options)
-    improvement_options = _final_dedup(improvement_options)
-    recommendation_options = _final_dedup(recommendation_options)
+    with stage_timer("sanitize"):
+        strengths_options = _final_dedup(strengths_options)
+        improvement_options = _final_dedup(improvement_options)
+        recommendation_options = _final_dedup(recommendation_options)
 
-    # Use first option as the primary output
-    strengths = strengths_options[0] if strengths_options else strengths_primary
-    improvement_areas = improvement_options[0] if improvement_options else improvement_primary
-    recommendations = recommendation_options[0] if recommendation_options else recommendations_primary
+        # Use first option as the primary output
+        strengths = strengths_options[0] if strengths_options else strengths_primary
+        improvement_areas = improvement_options[0] if improvement_options else improvement_primary
+        recommendations = recommendation_options[0] if recommendation_options else recommendations_primary
 
-    # Final sanitization: strip any lingering banned words/phrases
-    strengths = _sanitize_banned_words(strengths)
-    improvement_areas = _sanitize_banned_words(improvement_areas)
-    recommendations = _sanitize_banned_words(recommendations)
-    strengths_options = [_sanitize_banned_words(opt) for opt in strengths_options]
-    improvement_options = [_sanitize_banned_words(opt) for opt in improvement_options]
-    recommendation_options = [_sanitize_banned_words(opt) for opt in recommendation_options]
+        # Final sanitization: strip any lingering banned words/phrases
+        strengths = _sanitize_banned_words(strengths)
+        improvement_areas = _sanitize_banned_words(improvement_areas)
+        recommendations = _sanitize_banned_words(recommendations)
+        strengths_options = [_sanitize_banned_words(opt) for opt in strengths_options]
+        improvement_options = [_sanitize_banned_words(opt) for opt in improvement_options]
+        recommendation_options = [_sanitize_banned_words(opt) for opt in recommendation_options]
 
     return GenerateResponse(
         strengths=strengths,
@@ -3471,24 +4323,36 @@ def generate(req: GenerateRequest):
         strengths_options=strengths_options,
         improvement_areas_options=improvement_options,
         recommendations_options=recommendation_options,
-        debug={
-            "top_comments": retrieved,
-            "prioritized_indicator_comments": prioritized_comments[:5],
-            "mysql_sources": _mysql_source_summary(retrieved),
-            "field_mysql_sources": {
-                field_name: _mysql_source_summary(items)
-                for field_name, items in field_retrieved.items()
-            },
-            "embedding_cache_path": str(EMBEDDINGS_CACHE_PATH),
-            "dataset_size": len(_build_dataset_entries(form_type=_effective_form_type(req))),
-            "model": os.getenv("SBERT_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
-            "generator": "mysql-only-retrieval",
-            "overall_band": sig["overall_level"],
-            "domain_bands": {domain: _score_band(score, sig.get("max_scale", 5.0)).lower() for domain, score in sig["domains"].items()},
-            "feedback_queries": {
-                "strengths": _normalize_whitespace(req.strengths or "") or _summarize_comments_for_field(req, comments, "strengths"),
-                "areas_for_improvement": _normalize_whitespace(req.improvement_areas or "") or _summarize_comments_for_field(req, comments, "areas_for_improvement"),
-                "recommendations": _normalize_whitespace(req.recommendations or "") or _summarize_comments_for_field(req, comments, "recommendations"),
+        debug=_debug_payload(
+            sections,
+            {
+                "top_comments": lambda: retrieved,
+                "prioritized_indicator_comments": lambda: prioritized_comments[:5],
+                "mysql_sources": lambda: _mysql_source_summary(retrieved),
+                "field_mysql_sources": lambda: {
+                    field_name: _mysql_source_summary(items)
+                    for field_name, items in field_retrieved.items()
+                },
+                "embedding_cache_path": lambda: str(EMBEDDINGS_CACHE_PATH),
+                "dataset_size": lambda: _resident_dataset_size(_effective_form_type(req)),
+                "model": default_model_name,
+                "generator": lambda: "mysql-only-retrieval",
+                "overall_band": lambda: sig["overall_level"],
+                "domain_bands": lambda: {domain: _score_band(score, sig.get("max_scale", 5.0)).lower() for domain, score in sig["domains"].items()},
+                # The fallbacks above are the same summaries; reuse them instead of recomputing.
+                "feedback_queries": lambda: {
+                    "strengths": _normalize_whitespace(req.strengths or "") or strengths_fallback,
+                    "areas_for_improvement": _normalize_whitespace(req.improvement_areas or "") or improvement_fallback,
+                    "recommendations": _normalize_whitespace(req.recommendations or "") or recommendations_fallback,
+                },
+                "context_computations": lambda: dict(context.compute_counts),
             },
-        },
+        ),
     )
+
+
+def _debug_payload(sections: Tuple[str, ...], builders: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Build only the requested debug sections; no sections means no debug payload."""
+    if not sections:
+        return None
+    return {name: builders[name]() for name in sections}
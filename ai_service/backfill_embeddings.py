@@ -10,7 +10,8 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 import pymysql
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from embedding_cache import MappedEmbeddingCache
+from encoders import default_model_name, get_encoder
 from feedback_retrieval_system import FeedbackRetrievalSystem
 
 # Parse DB config from PHP
@@ -52,9 +53,9 @@ def main():
     )
 
     # Load SBERT model
-    model_name = os.getenv("SBERT_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    model_name = default_model_name()
     print(f"Loading SBERT model: {model_name}")
-    model = SentenceTransformer(model_name)
+    model = get_encoder(model_name)
 
     # Find rows with empty or null embedding_vector
     with conn.cursor() as cur:
@@ -103,10 +104,9 @@ def main():
     print(f"Done! Updated {updated} rows with SBERT embeddings.")
 
     # Clear the embeddings cache so the service re-loads
-    cache_path = os.path.join(os.path.dirname(__file__), "comment_embeddings_cache.npz")
-    if os.path.exists(cache_path):
-        os.remove(cache_path)
-        print(f"Cleared embeddings cache: {cache_path}")
+    cache_stem = os.path.join(os.path.dirname(os.path.abspath(__file__)), "comment_embeddings_cache")
+    MappedEmbeddingCache(cache_stem).clear()
+    print(f"Cleared embeddings cache: {cache_stem}.*")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,326 @@
+"""Back-fill AI suggestions for completed evaluations that never got any.
+
+Streams completed `evaluations` rows over a server-side cursor in id order,
+rebuilds each `/generate` request from its `evaluation_details` rows (the same
+shape the evaluation form sends), generates across a process pool and writes
+the recommendations text to `ai_recommendations` with one multi-row insert per
+chunk. After every committed chunk the last evaluation id is saved to the
+checkpoint file, so an interrupted run picks up where it stopped; evaluations
+that already have an `ai_recommendations` row are skipped unless
+--include-existing is given, in which case their rows are replaced (deleted
+and re-inserted in the chunk's transaction) for every evaluation that
+generated successfully.
+
+At most workers + 1 chunks are held in memory at a time.
+
+Usage:
+    cd ai_service
+    python backgenerate_recommendations.py [--workers 4] [--chunk-size 200] [--academic-year 2025-2026]
+                                           [--limit N] [--checkpoint FILE] [--restart] [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Each worker generates one evaluation at a time: no encode window to wait out,
+# and no template refresher thread for a one-off job.
+os.environ.setdefault("ENCODE_BATCH_WINDOW_MS", "0")
+os.environ.setdefault("TEMPLATE_REFRESH_SECONDS", "0")
+
+from seed_mysql_feedback_templates import parse_php_db_config
+
+DEFAULT_CHECKPOINT = Path(__file__).with_name("backgenerate_checkpoint.json")
+AVERAGE_COLUMNS = {
+    "communications": "communications_avg",
+    "management": "management_avg",
+    "assessment": "assessment_avg",
+    "overall": "overall_avg",
+}
+EVALUATION_COLUMNS = (
+    "id",
+    "faculty_name",
+    "department",
+    "subject_observed",
+    "observation_type",
+    "evaluation_focus",
+    *AVERAGE_COLUMNS.values(),
+)
+
+
+def connect(config: Dict[str, str], streaming: bool = False) -> Any:
+    import pymysql  # type: ignore
+
+    return pymysql.connect(
+        host=config.get("host", "127.0.0.1"),
+        user=config.get("user", "root"),
+        password=config.get("password", ""),
+        database=config.get("database", "ai_classroom_eval"),
+        charset="utf8mb4",
+        cursorclass=pymysql.cursors.SSDictCursor if streaming else pymysql.cursors.DictCursor,
+    )
+
+
+def has_column(connection: Any, table: str, column: str) -> bool:
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT 1 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+            (table, column),
+        )
+        return cur.fetchone() is not None
+
+
+def stream_evaluations(
+    connection: Any,
+    after_id: int,
+    chunk_size: int,
+    academic_year: str = "",
+    include_existing: bool = False,
+    with_form_type: bool = False,
+    limit: int = 0,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Completed evaluations after `after_id`, in id order, `chunk_size` rows at a time."""
+    columns = [f"e.`{name}`" for name in EVALUATION_COLUMNS]
+    if with_form_type:
+        columns.append("e.`evaluation_form_type`")
+    sql = f"SELECT {', '.join(columns)} FROM evaluations e WHERE e.status = 'completed' AND e.id > %s"
+    params: List[Any] = [after_id]
+    if academic_year:
+        sql += " AND e.academic_year = %s"
+        params.append(academic_year)
+    if not include_existing:
+        sql += " AND NOT EXISTS (SELECT 1 FROM ai_recommendations r WHERE r.evaluation_id = e.id)"
+    sql += " ORDER BY e.id ASC"
+    if limit > 0:
+        sql += f" LIMIT {int(limit)}"
+    with connection.cursor() as cur:
+        # The stream pauses while the pool is busy; keep the server from dropping it.
+        cur.execute("SET SESSION net_write_timeout = 3600")
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield list(rows)
+
+
+def fetch_details(connection: Any, evaluation_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    details: Dict[int, List[Dict[str, Any]]] = {evaluation_id: [] for evaluation_id in evaluation_ids}
+    if not evaluation_ids:
+        return details
+    placeholders = ", ".join(["%s"] * len(evaluation_ids))
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT evaluation_id, category, criterion_index, criterion_text, rating, comments "
+            f"FROM evaluation_details WHERE evaluation_id IN ({placeholders}) "
+            "ORDER BY evaluation_id, category, criterion_index, id",
+            evaluation_ids,
+        )
+        for row in cur.fetchall():
+            details[int(row["evaluation_id"])].append(row)
+    return details
+
+
+def rating_value(value: Any) -> Optional[float]:
+    """A detail row's rating as a float; None when it is NULL or not a number."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_request_payload(evaluation: Dict[str, Any], details: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The `/generate` body the evaluation form would have sent for this evaluation."""
+    ratings: Dict[str, List[Dict[str, Any]]] = {}
+    indicator_comments: List[Dict[str, Any]] = []
+    comments_summary: Dict[str, List[str]] = {}
+    for row in details:
+        category = str(row.get("category") or "").strip()
+        if not category:
+            continue
+        comment = str(row.get("comments") or "").strip()
+        criterion_text = str(row.get("criterion_text") or "")
+        rating = rating_value(row.get("rating"))
+        ratings.setdefault(category, []).append({"rating": rating, "comment": comment, "criterion_text": criterion_text})
+        if comment:
+            indicator_comments.append(
+                {
+                    "category": category,
+                    "criterion_index": int(row.get("criterion_index") or 0),
+                    "criterion_text": criterion_text,
+                    "rating": rating,
+                    "comment": comment,
+                }
+            )
+            comments_summary.setdefault(category, []).append(comment)
+    return {
+        "faculty_name": evaluation.get("faculty_name") or "",
+        "department": evaluation.get("department") or "",
+        "subject_observed": evaluation.get("subject_observed") or "",
+        "observation_type": evaluation.get("observation_type") or "",
+        "averages": {key: float(evaluation.get(column) or 0) for key, column in AVERAGE_COLUMNS.items()},
+        "ratings": ratings,
+        "indicator_comments": indicator_comments,
+        "comments_summary": comments_summary,
+        "evaluation_focus": evaluation.get("evaluation_focus") or "",
+        "evaluation_form_type": evaluation.get("evaluation_form_type") or "",
+        "style": "standard",
+        "detail": "none",
+    }
+
+
+def init_worker(workers: int) -> None:
+    """Per-worker setup, as the forked service workers get it.
+
+    Loads the model and template index (already inherited under fork), then
+    `app.on_worker_start` gives each worker cpu_count // workers torch threads.
+    """
+    import app
+
+    app.get_encoder()
+    app._load_feedback_retrieval_system()
+    app.on_worker_start(workers)
+
+
+def generate_chunk(items: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Optional[str], Optional[str]]]:
+    """(evaluation id, recommendations text, error) for each (evaluation id, payload) item."""
+    import app
+
+    results: List[Tuple[int, Optional[str], Optional[str]]] = []
+    valid: List[Tuple[int, Any]] = []
+    for evaluation_id, payload in items:
+        try:
+            valid.append((evaluation_id, app.GenerateRequest(**payload)))
+        except Exception as exc:
+            results.append((evaluation_id, None, f"invalid request: {exc}"))
+    for position, result in app.generate_items([req for _, req in valid]):
+        evaluation_id = valid[position][0]
+        if isinstance(result, Exception):
+            results.append((evaluation_id, None, str(result)))
+        else:
+            results.append((evaluation_id, result.recommendations, None))
+    return results
+
+
+def load_checkpoint(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(path: Path, state: Dict[str, Any]) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate AI recommendations for completed evaluations that lack them.")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="Generation processes.")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Evaluations per read, generation task and insert.")
+    parser.add_argument("--academic-year", default="", help="Only evaluations from this academic year.")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many evaluations (0 = all).")
+    parser.add_argument("--checkpoint", default=str(DEFAULT_CHECKPOINT), help="Resume state file.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first evaluation.")
+    parser.add_argument("--include-existing", action="store_true", help="Also regenerate evaluations that already have a row, replacing it.")
+    parser.add_argument("--dry-run", action="store_true", help="Generate but do not insert or checkpoint.")
+    args = parser.parse_args()
+
+    checkpoint_path = Path(args.checkpoint)
+    state = {} if args.restart else load_checkpoint(checkpoint_path)
+    last_id = int(state.get("last_evaluation_id") or 0)
+    written = int(state.get("written") or 0)
+    failed = int(state.get("failed") or 0)
+    if last_id:
+        print(f"[BACKGEN] resuming after evaluation id {last_id} ({written} written so far)")
+
+    config = parse_php_db_config()
+    reader = connect(config, streaming=True)
+    writer = connect(config)
+    chunk_size = max(1, args.chunk_size)
+    workers = max(1, args.workers)
+
+    # Where fork is available, load the model and index once here and let the workers inherit them;
+    # preload_for_workers also holds torch to one thread in the parent until the fork.
+    if "fork" in multiprocessing.get_all_start_methods():
+        import app
+
+        context = multiprocessing.get_context("fork")
+        app.preload_for_workers()
+    else:
+        context = multiprocessing.get_context("spawn")
+
+    started = time.perf_counter()
+    processed = 0
+    pending: "deque[Tuple[int, Any]]" = deque()
+
+    def drain_one() -> None:
+        nonlocal written, failed, processed, last_id
+        chunk_last_id, async_result = pending.popleft()
+        results = async_result.get()
+        rows = [(evaluation_id, text) for evaluation_id, text, error in results if error is None and text]
+        for evaluation_id, _, error in results:
+            if error is not None:
+                print(f"[BACKGEN] evaluation {evaluation_id} failed: {error}")
+        failed += len(results) - len(rows)
+        processed += len(results)
+        if not args.dry_run:
+            if rows:
+                with writer.cursor() as cur:
+                    if args.include_existing:
+                        # ai_recommendations has no unique key on evaluation_id: replace, don't add a second row.
+                        placeholders = ", ".join(["%s"] * len(rows))
+                        cur.execute(
+                            f"DELETE FROM ai_recommendations WHERE evaluation_id IN ({placeholders})",
+                            [evaluation_id for evaluation_id, _ in rows],
+                        )
+                    cur.executemany("INSERT INTO ai_recommendations (evaluation_id, recommendation_text) VALUES (%s, %s)", rows)
+                writer.commit()
+            written += len(rows)
+            last_id = chunk_last_id
+            save_checkpoint(checkpoint_path, {"last_evaluation_id": last_id, "written": written, "failed": failed, "updated_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+        elapsed = time.perf_counter() - started
+        print(
+            f"[BACKGEN] processed={processed} written={written} failed={failed} last_id={chunk_last_id} "
+            f"rate={processed / max(elapsed, 1e-9):.1f} rows/s"
+        )
+
+    with context.Pool(processes=workers, initializer=init_worker, initargs=(workers,)) as pool:
+        chunks = stream_evaluations(
+            reader,
+            after_id=last_id,
+            chunk_size=chunk_size,
+            academic_year=args.academic_year,
+            include_existing=args.include_existing,
+            with_form_type=has_column(writer, "evaluations", "evaluation_form_type"),
+            limit=args.limit,
+        )
+        for evaluations in chunks:
+            ids = [int(row["id"]) for row in evaluations]
+            details = fetch_details(writer, ids)
+            items = [(int(row["id"]), build_request_payload(row, details[int(row["id"])])) for row in evaluations]
+            pending.append((ids[-1], pool.apply_async(generate_chunk, (items,))))
+            # Bounded read-ahead: results are written in id order, so the checkpoint never skips a chunk.
+            while len(pending) > workers:
+                drain_one()
+        while pending:
+            drain_one()
+
+    reader.close()
+    writer.close()
+    elapsed = time.perf_counter() - started
+    print(f"[BACKGEN] done: {processed} evaluations in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.1f} rows/s), {written} written, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
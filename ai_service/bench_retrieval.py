@@ -0,0 +1,153 @@
+"""Benchmark for the MMR diversity selection used by retrieve_top_feedback.
+
+Compares `mmr_select` against the original nested-loop implementation on
+shortlists built from the generated seed templates, checks that both pick the
+same rows, and reports the per-call timings. No SBERT model is needed: the
+embeddings are random vectors with near-duplicate clusters so every penalty
+path is exercised.
+
+Run: python bench_retrieval.py [--top-k 10] [--shortlist 40] [--trials 300]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from feedback_retrieval_system import FeedbackRetrievalSystem, generate_seed_templates, mmr_select
+
+
+def legacy_mmr(shortlist: List[Dict[str, Any]], desired: int) -> List[Dict[str, Any]]:
+    """The pre-vectorization selection loop, kept verbatim as the reference."""
+    cosine_similarity = FeedbackRetrievalSystem.cosine_similarity
+    shortlist = list(shortlist)
+    selected: List[Dict[str, Any]] = []
+    while shortlist and len(selected) < desired:
+        best_index = 0
+        best_value = None
+        for idx, candidate in enumerate(shortlist):
+            relevance = float(candidate.get("_score", -1.0))
+            diversity_penalty = 0.0
+            if selected:
+                similarities_to_selected = [
+                    cosine_similarity(candidate.get("_embedding"), picked.get("_embedding"))
+                    for picked in selected
+                    if candidate.get("_embedding") is not None and picked.get("_embedding") is not None
+                ]
+                if similarities_to_selected:
+                    diversity_penalty = max(similarities_to_selected) * 0.55
+
+            indicator_penalty = 0.0
+            candidate_indicator = (candidate.get('evaluation_comment') or '').strip().lower()
+            if selected and candidate_indicator:
+                indicator_count = sum(1 for p in selected if (p.get('evaluation_comment') or '').strip().lower() == candidate_indicator)
+                if indicator_count >= 2:
+                    indicator_penalty = 0.25
+                elif indicator_count >= 1:
+                    indicator_penalty = 0.12
+
+            content_dup_penalty = 0.0
+            candidate_fb = (candidate.get('feedback_text') or '').strip().lower()
+            if selected and candidate_fb:
+                for picked in selected:
+                    picked_fb = (picked.get('feedback_text') or '').strip().lower()
+                    if not picked_fb:
+                        continue
+                    cand_words = set(candidate_fb.split())
+                    pick_words = set(picked_fb.split())
+                    if cand_words and pick_words:
+                        word_overlap = len(cand_words & pick_words) / max(len(cand_words), len(pick_words))
+                        if word_overlap > 0.70:
+                            content_dup_penalty = max(content_dup_penalty, 0.30)
+
+            lexical_penalty = 0.0
+            candidate_text = f"{candidate.get('evaluation_comment') or ''} {candidate.get('feedback_text') or ''}".strip().lower()
+            if selected and candidate_text:
+                selected_texts = {
+                    f"{picked.get('evaluation_comment') or ''} {picked.get('feedback_text') or ''}".strip().lower()
+                    for picked in selected
+                }
+                if candidate_text in selected_texts:
+                    lexical_penalty = 0.2
+
+            mmr_value = relevance - diversity_penalty - lexical_penalty - indicator_penalty - content_dup_penalty
+            if best_value is None or mmr_value > best_value:
+                best_value = mmr_value
+                best_index = idx
+
+        selected.append(shortlist.pop(best_index))
+    return selected
+
+
+def build_shortlists(trials: int, size: int, dim: int = 384, seed: int = 7) -> List[List[Dict[str, Any]]]:
+    rng = np.random.default_rng(seed)
+    templates = generate_seed_templates(per_field=max(size, 60))
+    shortlists: List[List[Dict[str, Any]]] = []
+    for _ in range(trials):
+        picked = rng.choice(len(templates), size=size, replace=True)
+        base = rng.normal(size=(size // 4 + 1, dim)).astype(np.float32)
+        rows: List[Dict[str, Any]] = []
+        for position, template_index in enumerate(picked.tolist()):
+            template = templates[template_index]
+            vector = base[position % len(base)] + rng.normal(scale=0.35, size=dim).astype(np.float32)
+            vector = vector / (np.linalg.norm(vector) + 1e-12)
+            rows.append(
+                {
+                    "id": position,
+                    "evaluation_comment": template["evaluation_comment"],
+                    "feedback_text": template["feedback_text"],
+                    "_embedding": vector.astype(np.float32),
+                }
+            )
+        scores = np.sort(rng.uniform(0.1, 0.9, size=size))[::-1]
+        for row, score in zip(rows, scores.tolist()):
+            row["_score"] = float(score)
+        shortlists.append(rows)
+    return shortlists
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark MMR selection in retrieve_top_feedback.")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--shortlist", type=int, default=40)
+    parser.add_argument("--trials", type=int, default=300)
+    args = parser.parse_args()
+
+    shortlists = build_shortlists(args.trials, args.shortlist)
+
+    legacy_picks = []
+    started = time.perf_counter()
+    for rows in shortlists:
+        legacy_picks.append([row["id"] for row in legacy_mmr(rows, args.top_k)])
+    legacy_seconds = time.perf_counter() - started
+
+    vector_picks = []
+    started = time.perf_counter()
+    for rows in shortlists:
+        picks = mmr_select(
+            np.asarray([row["_score"] for row in rows], dtype=np.float64),
+            np.vstack([row["_embedding"] for row in rows]),
+            [row["evaluation_comment"] for row in rows],
+            [row["feedback_text"] for row in rows],
+            args.top_k,
+        )
+        vector_picks.append([rows[position]["id"] for position in picks])
+    vector_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(legacy_picks, vector_picks) if a != b)
+    legacy_ms = legacy_seconds / args.trials * 1000
+    vector_ms = vector_seconds / args.trials * 1000
+    print(f"top_k={args.top_k} shortlist={args.shortlist} trials={args.trials}")
+    print(f"legacy loop : {legacy_ms:.3f} ms/call")
+    print(f"mmr_select  : {vector_ms:.3f} ms/call")
+    print(f"speedup     : {legacy_ms / max(vector_ms, 1e-9):.1f}x")
+    print(f"mismatched selections: {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Check that back-generation payloads built from stored rows are valid /generate requests.
+
+Builds requests with `backgenerate_recommendations.build_request_payload` from
+sample `evaluations` / `evaluation_details` rows, including a commented
+indicator with a NULL rating, a DECIMAL rating and a non-numeric rating, and
+validates each one as `app.GenerateRequest`. Exits non-zero on any failure.
+
+No SBERT model or database is needed.
+
+Run: python check_backgenerate_payload.py
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import app
+from backgenerate_recommendations import build_request_payload
+
+EVALUATION = {
+    "id": 1,
+    "faculty_name": "Sample Teacher",
+    "department": "CCIS",
+    "subject_observed": "Programming 1",
+    "observation_type": "Formal",
+    "evaluation_focus": "",
+    "communications_avg": Decimal("4.20"),
+    "management_avg": Decimal("3.80"),
+    "assessment_avg": None,
+    "overall_avg": Decimal("4.00"),
+}
+
+# (case name, rating column value, rating expected on the indicator comment)
+RATING_CASES = [
+    ("null rating", None, None),
+    ("decimal rating", Decimal("3"), 3.0),
+    ("integer rating", 4, 4.0),
+    ("empty string rating", "", None),
+    ("non-numeric rating", "n/a", None),
+]
+
+
+def detail_row(rating: Any, comment: str = "Learners needed more time for the group task.") -> Dict[str, Any]:
+    return {
+        "evaluation_id": 1,
+        "category": "management",
+        "criterion_index": 2,
+        "criterion_text": "Manages the classroom environment and time.",
+        "rating": rating,
+        "comments": comment,
+    }
+
+
+def check_case(name: str, rating: Any, expected: Optional[float]) -> List[str]:
+    details = [detail_row(rating), detail_row(Decimal("5"), comment="")]
+    try:
+        req = app.GenerateRequest(**build_request_payload(EVALUATION, details))
+    except Exception as exc:
+        return [f"{name}: GenerateRequest rejected the payload: {exc}"]
+    problems: List[str] = []
+    if len(req.indicator_comments) != 1:
+        problems.append(f"{name}: expected 1 indicator comment, got {len(req.indicator_comments)}")
+    elif req.indicator_comments[0].rating != expected:
+        problems.append(f"{name}: expected rating {expected!r}, got {req.indicator_comments[0].rating!r}")
+    return problems
+
+
+def main() -> None:
+    failures = 0
+    for name, rating, expected in RATING_CASES:
+        problems = check_case(name, rating, expected)
+        failures += len(problems)
+        print(f"{'ok  ' if not problems else 'FAIL'} {name}")
+        for problem in problems:
+            print(f"     {problem}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
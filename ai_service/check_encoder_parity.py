@@ -0,0 +1,93 @@
+"""Parity check between the PyTorch and ONNX Runtime encoder backends.
+
+Encodes the generated seed templates as the corpus and a set of evaluator-style
+queries with both backends, then compares:
+- cosine scores of every query against the corpus (max absolute difference)
+- top-k selections; a differing pick only counts as a mismatch when its
+  PyTorch score is further than the tolerance from the k-th PyTorch score
+  (near-ties may legitimately swap)
+It also reports per-query encode latency for each backend. Exits non-zero when
+either check fails.
+
+Run: python check_encoder_parity.py [--backend onnx|onnx-int8] [--top-k 10] [--tolerance 0.02]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from encoders import default_model_name, load_encoder
+from feedback_retrieval_system import generate_seed_templates
+
+DEFAULT_QUERIES = [
+    "Math examples were clear, but they were not always connected to real-life problem solving tasks.",
+    "The lesson needed more follow-up questions before moving to the next activity.",
+    "Uses checks for understanding.",
+    "The teacher speaks clearly and can be heard at the back of the room.",
+    "Transitions between activities took too long and learners lost focus.",
+    "Learners were engaged during group work and shared their answers confidently.",
+    "Provide more specific feedback on learner outputs.",
+    "The TILO were presented at the start of the lesson.",
+]
+
+
+def encode(encoder, texts: List[str]) -> np.ndarray:
+    return np.asarray(encoder.encode(texts, convert_to_numpy=True, normalize_embeddings=True), dtype=np.float32)
+
+
+def per_query_ms(encoder, queries: List[str], repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for query in queries:
+            encode(encoder, [query])
+    return (time.perf_counter() - started) / (repeats * len(queries)) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare ONNX Runtime encoder output with the PyTorch path.")
+    parser.add_argument("--model", default=default_model_name())
+    parser.add_argument("--backend", default="onnx", choices=("onnx", "onnx-int8"))
+    parser.add_argument("--per-field", type=int, default=60, help="Seed templates per field used as the corpus.")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Allowed absolute cosine difference.")
+    parser.add_argument("--repeats", type=int, default=5, help="Latency passes over the queries.")
+    args = parser.parse_args()
+
+    corpus = [template["evaluation_comment"] for template in generate_seed_templates(per_field=args.per_field)]
+    queries = DEFAULT_QUERIES
+
+    reference = load_encoder(args.model, backend="torch")
+    candidate = load_encoder(args.model, backend=args.backend)
+
+    reference_scores = encode(reference, queries) @ encode(reference, corpus).T
+    candidate_scores = encode(candidate, queries) @ encode(candidate, corpus).T
+    max_diff = float(np.max(np.abs(reference_scores - candidate_scores)))
+
+    top_k = min(args.top_k, len(corpus))
+    mismatches = 0
+    for ref_row, cand_row in zip(reference_scores, candidate_scores):
+        ref_top = np.argsort(-ref_row, kind="stable")[:top_k]
+        cand_top = np.argsort(-cand_row, kind="stable")[:top_k]
+        kth_score = float(ref_row[ref_top[-1]])
+        for position in set(cand_top.tolist()) - set(ref_top.tolist()):
+            if kth_score - float(ref_row[position]) > args.tolerance:
+                mismatches += 1
+
+    torch_ms = per_query_ms(reference, queries, args.repeats)
+    candidate_ms = per_query_ms(candidate, queries, args.repeats)
+
+    print(f"model={args.model} backend={args.backend} corpus={len(corpus)} queries={len(queries)} top_k={top_k}")
+    print(f"max |cosine diff| : {max_diff:.5f} (tolerance {args.tolerance})")
+    print(f"top-k mismatches  : {mismatches}")
+    print(f"torch encode      : {torch_ms:.2f} ms/query")
+    print(f"{args.backend:<18}: {candidate_ms:.2f} ms/query")
+    if max_diff > args.tolerance or mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Import-time budget check for the AI service modules.
+
+Imports each module in a fresh interpreter with `-X importtime` and fails when
+its cumulative import time exceeds the budget, or when importing it pulled in
+a heavy ML package (torch, transformers, sentence_transformers, onnxruntime,
+tokenizers). Those must stay behind `encoders.get_encoder` so `/health`
+answers within ai_autostart.php's 500 ms probe.
+
+The first run after installing packages also pays for writing .pyc files;
+rerun before trusting a failure.
+
+Run: python check_import_budget.py [--budget-ms 1000] [--repeats 3] [module ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+DEFAULT_MODULES = ("app", "feedback_retrieval_system", "encoders")
+HEAVY_MODULES = ("torch", "transformers", "sentence_transformers", "onnxruntime", "tokenizers")
+
+
+def measure(module: str) -> Tuple[float, List[str]]:
+    """Cumulative import time in ms and the heavy modules the import loaded."""
+    code = (
+        f"import json, sys, {module}; "
+        f"print(json.dumps(sorted(name for name in {list(HEAVY_MODULES)!r} if name in sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        # Top-level entries are not indented: "import time: self | cumulative | name".
+        if len(parts) == 3 and parts[2].rstrip() == f" {module}":
+            cumulative_us = int(parts[1])
+    return cumulative_us / 1000.0, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fail when AI service module imports get slow or heavy.")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="Allowed cumulative import time per module.")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per module; the fastest one is compared.")
+    args = parser.parse_args()
+
+    failures = 0
+    for module in args.modules:
+        runs = [measure(module) for _ in range(max(1, args.repeats))]
+        best_ms = min(ms for ms, _ in runs)
+        heavy = sorted({name for _, loaded in runs for name in loaded})
+        ok = best_ms <= args.budget_ms and not heavy
+        failures += not ok
+        note = f" heavy imports: {', '.join(heavy)}" if heavy else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<28} {best_ms:8.1f} ms (budget {args.budget_ms:.0f} ms){note}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
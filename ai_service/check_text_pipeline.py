@@ -0,0 +1,190 @@
+"""Golden check and micro-benchmark for the regex-heavy text helpers in app.py.
+
+Runs `_natural_criterion_reference` over the ISO/PEAC indicator texts (plus
+subject-prefixed and lower-cased variants), and `_looks_meta_clause`,
+`_normalize_clause_shape`, `_is_clean_reconstruction_clause` and
+`_is_clean_candidate_text` over generated seed templates and their clauses,
+along with the per-domain keyword counts and `_detect_text_domain` for all of
+those texts. It then compares every output with `text_pipeline_golden.json`
+and exits non-zero on any difference. It also reports the per-call cost of
+each helper on the first pass and on repeat passes; the repeat figure includes
+any per-text memoization.
+
+No SBERT model or database is needed.
+
+Run: python check_text_pipeline.py [--repeats 5] [--write-golden]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import app
+from feedback_retrieval_system import SUPPORTED_FIELDS, generate_seed_templates
+
+GOLDEN_PATH = Path(__file__).with_name("text_pipeline_golden.json")
+SEED_TEMPLATES_PER_FIELD = 20
+
+ISO_INDICATORS = [
+    "Uses an audible voice that can be heard at the back of the room.",
+    "Speaks fluently in the language of instruction.",
+    "Facilitates a dynamic discussion.",
+    "Uses engaging non-verbal cues (facial expression, gestures).",
+    "Uses words & expressions suited to the level of the students.",
+    "The TILO (Topic Intended Learning Outcomes) are clearly presented.",
+    "Recall and connects previous lessons to the new lessons.",
+    "The topic/lesson is introduced in an interesting & engaging way.",
+    "Uses current issues, real life & local examples to enrich class discussion.",
+    "Focuses class discussion on key concepts of the lesson.",
+    "Encourages active participation among students and ask questions about the topic.",
+    "Uses current instructional strategies and resources.",
+    "Designs teaching aids that facilitate understanding of key concepts.",
+    "Adapts teaching approach in the light of student feedback and reactions.",
+    "Aids students using thought provoking questions (Art of Questioning).",
+    "Integrate the institutional core values to the lessons.",
+    "Conduct the lesson using the principle of SMART",
+    "Monitors students' understanding on key concepts discussed.",
+    "Uses assessment tool that relates specific course competencies stated in the syllabus.",
+    "Design test/quarter/assignments and other assessment tasks that are corrector-based.",
+    "Introduces varied activities that will answer the differentiated needs to the learners with varied learning style.",
+    "Conducts normative assessment before evaluating and grading the learner's performance outcome.",
+    "Monitors the formative assessment results and find ways to ensure learning for the learners.",
+    "Uses checks for understanding.",
+    "Explains concepts clearly.",
+]
+
+PEAC_INDICATORS = [
+    "The teacher communicates clear expectations of student performance in line with the unit standards and competencies.",
+    "The teacher utilizes various learning materials, resources and strategies to enable all students to learn and achieve the unit standards and competencies and learning goals.",
+    "The teacher monitors and checks on students' learning and attainment of the unit standards and competencies by conducting varied forms of assessments during class discussion.",
+    "The teacher provides appropriate feedback or interventions to enable students in attaining the unit standards and competencies.",
+    "The teacher manages the classroom environment and time in a way that supports student learning and the achievement of the unit standards and competencies.",
+    "The teacher processes students' understanding by asking clarifying or critical thinking questions related to the unit standards and competencies.",
+    "The students are active and engaged with the different learning tasks aimed at accomplishing the unit standards and competencies.",
+    "The students with the help of different learning materials and resources including technology achieve the learning goals of the unit standards and competencies.",
+    "The students are able to explain how their ideas, outputs or performances accomplish the unit standards and competencies.",
+    "The students, when encouraged or on their own, ask questions to clarify or deepen their understanding of the unit standards and competencies.",
+    "The students are able to relate or transfer their learning to daily life and real world situations.",
+    "The students are able to integrate 21st century skills in their achievement of the unit standards and competencies.",
+    "The students are able to reflect on and connect their learning with the school's PVMGO.",
+    "Applied knowledge of content within and across curriculum teaching areas.",
+    "Used a range of teaching strategies that enhance learner achievement in literacy and numeracy skills.",
+    "Managed learner behavior constructively by applying positive and non-violent discipline to ensure learning focused environments.",
+    "Worked together with other students towards achieving the TILO(s).",
+    "Shared ideas and responded to questions enthusiastically.",
+    "Designed, selected, organized, and used diagnostic, formative and summative assessment.",
+]
+
+# Leading verbs of the gerund rewrites, each exercised with a neutral tail.
+LEADING_VERBS = [
+    "Uses", "Utilizes", "Demonstrates", "Explains", "Adapts", "Encourages", "Design", "Designs", "Integrate",
+    "Integrates", "Focuses", "Facilitate", "Facilitates", "Recall and connect", "Recalls and connects",
+    "Recall and connects", "Communicates", "Monitors", "Provides", "Manages", "Processes", "Conduct", "Conducts",
+    "Introduces", "Aids", "Speaks", "Applied", "Applies", "Worked", "Shared", "Performed", "Demonstrated",
+    "Prepared", "Used", "Managed", "Designed", "Designed,",
+]
+EXTRA_CLAUSES = [
+    "What stood out during the class was the clear pacing of the lesson",
+    "From the evaluator's notes the teacher uses follow-up questions",
+    "The teacher's practice indicates steady routines during group work",
+    "Needs to strengthen questioning because it helped learners stay on task",
+    "This helped show a clearer link between instruction, participation and learner outputs",
+    "Use check for understanding before moving to the next activity",
+    "Adjust pacing when learners show confusion during the discussion",
+    "The rating pattern shows a consistent profile across the observation period",
+    "Performance is visible in future observations when routines are clear",
+    "Monitor learner responses and provide specific feedback during practice",
+    "The teacher demonstrates use of visual aids to support explanations",
+    "The teacher shows should explain the task before group work starts",
+    "This is a targeted refinements needed to reach an excellent level of practice",
+    "Explains the lesson objectives clearly and connects them to prior knowledge",
+]
+
+
+def criterion_inputs() -> List[str]:
+    texts: List[str] = []
+    for text in ISO_INDICATORS + PEAC_INDICATORS:
+        texts += [text, text.lower(), f"The teacher {text[0].lower()}{text[1:]}", text.upper()]
+    for verb in LEADING_VERBS:
+        texts += [f"{verb} learners during the lesson and find time to review", f"the teacher {verb.lower()} clear routines"]
+    return texts
+
+
+def clause_inputs() -> List[str]:
+    texts: List[str] = list(EXTRA_CLAUSES)
+    for template in generate_seed_templates(per_field=SEED_TEMPLATES_PER_FIELD):
+        texts += [template["feedback_text"], template["evaluation_comment"]]
+    clauses: List[str] = []
+    for text in texts:
+        clauses += app._split_clauses(text)
+    return texts + clauses
+
+
+def domain_keyword_counts(text: str) -> List[int]:
+    return [app._count_domain_keyword_matches(text, domain) for domain in app._DOMAIN_FILTER_KEYWORDS]
+
+
+def cases() -> Dict[str, Tuple[Callable[..., Any], List[Tuple[Any, ...]]]]:
+    criteria = criterion_inputs()
+    clauses = clause_inputs()
+    domain_texts = [(text,) for text in criteria + clauses]
+    per_field = [(text, field_name) for text in clauses for field_name in SUPPORTED_FIELDS]
+    return {
+        "natural_criterion_reference": (app._natural_criterion_reference, [(text,) for text in criteria]),
+        "looks_meta_clause": (app._looks_meta_clause, [(text,) for text in clauses]),
+        "normalize_clause_shape": (app._normalize_clause_shape, per_field),
+        "is_clean_reconstruction_clause": (app._is_clean_reconstruction_clause, per_field),
+        "is_clean_candidate_text": (app._is_clean_candidate_text, per_field),
+        "domain_keyword_counts": (domain_keyword_counts, domain_texts),
+        "detect_text_domain": (app._detect_text_domain, domain_texts),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Golden check and timing for the text post-processing helpers.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing passes over each input set.")
+    parser.add_argument("--write-golden", action="store_true", help="Record the current outputs as the golden file.")
+    args = parser.parse_args()
+
+    outputs: Dict[str, List[Any]] = {}
+    failures = 0
+    golden = {} if args.write_golden else json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))
+    for name, (function, inputs) in cases().items():
+        started = time.perf_counter()
+        outputs[name] = [function(*arguments) for arguments in inputs]
+        first_us = (time.perf_counter() - started) / len(inputs) * 1e6
+        started = time.perf_counter()
+        for _ in range(max(1, args.repeats)):
+            for arguments in inputs:
+                function(*arguments)
+        repeat_us = (time.perf_counter() - started) / (max(1, args.repeats) * len(inputs)) * 1e6
+
+        mismatches = 0
+        if not args.write_golden:
+            expected = golden.get(name, [])
+            if len(expected) != len(outputs[name]):
+                mismatches = max(len(expected), len(outputs[name]))
+                print(f"     {name}: golden has {len(expected)} cases, current input set has {len(outputs[name])}")
+            else:
+                for arguments, want, got in zip(inputs, expected, outputs[name]):
+                    if want != got:
+                        mismatches += 1
+                        if mismatches <= 5:
+                            print(f"     {name}{arguments!r}: expected {want!r}, got {got!r}")
+        failures += mismatches
+        status = "rec " if args.write_golden else ("ok  " if not mismatches else "FAIL")
+        print(f"{status} {name:<32} {len(inputs):5d} cases  first {first_us:7.1f} us/call  repeat {repeat_us:7.1f} us/call  mismatches={mismatches}")
+
+    if args.write_golden:
+        GOLDEN_PATH.write_text(json.dumps(outputs, indent=0, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"wrote {GOLDEN_PATH}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Memory-mapped embedding cache for the /generate dataset corpus.
+
+Each form type gets two files next to the cache stem:
+- `<stem>.<form_type>.<signature prefix>.npy` — uncompressed float32 matrix, opened
+  with `mmap_mode='r'` so every worker shares the same pages through the OS cache
+- `<stem>.<form_type>.json` — sidecar with the dataset signature, row texts,
+  categories, sources and per-row content hashes, plus the name of the matrix
+  file it describes
+
+The content hashes let a rebuild carry vectors forward for unchanged rows and
+encode only new or edited ones.
+
+Matrix files are content-addressed and never rewritten in place; the sidecar is
+replaced atomically last, so a reader never pairs metadata with the wrong
+matrix. Nothing here unpickles.
+
+`SharedMatrixStore` applies the same content-addressed, memory-mapped layout to
+the template index matrices, so every serving worker maps one read-only copy.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+CACHE_FORMAT_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    """Hash of the exact text that gets embedded."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedEmbeddings:
+    signature: str
+    texts: List[str]
+    categories: List[str]
+    sources: List[str]
+    hashes: List[str]
+    embeddings: np.ndarray
+
+
+class MappedEmbeddingCache:
+    """Per-form-type .npy + JSON sidecar cache, opened once per process."""
+
+    def __init__(self, stem: Path) -> None:
+        self.stem = Path(stem)
+        self._opened: Dict[str, Tuple[Tuple[int, int], CachedEmbeddings]] = {}
+        self._lock = Lock()
+
+    def _label(self, form_type: str) -> str:
+        return form_type or "all"
+
+    def sidecar_path(self, form_type: str) -> Path:
+        return self.stem.with_name(f"{self.stem.name}.{self._label(form_type)}.json")
+
+    def load(self, form_type: str) -> Optional[CachedEmbeddings]:
+        """The cached corpus for `form_type`, reopened only when its sidecar changed on disk."""
+        sidecar = self.sidecar_path(form_type)
+        try:
+            stat = sidecar.stat()
+        except OSError:
+            return None
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        opened = self._opened.get(form_type)
+        if opened is not None and opened[0] == stat_key:
+            return opened[1]
+        with self._lock:
+            opened = self._opened.get(form_type)
+            if opened is not None and opened[0] == stat_key:
+                return opened[1]
+            cached = self._open(sidecar)
+            if cached is not None:
+                self._opened[form_type] = (stat_key, cached)
+            return cached
+
+    def _open(self, sidecar: Path) -> Optional[CachedEmbeddings]:
+        try:
+            meta = json.loads(sidecar.read_text(encoding="utf-8"))
+            if int(meta.get("version", 0)) != CACHE_FORMAT_VERSION:
+                return None
+            embeddings = np.load(sidecar.with_name(meta["data_file"]), mmap_mode="r", allow_pickle=False)
+            texts = [str(text) for text in meta["texts"]]
+            if embeddings.dtype != np.float32 or embeddings.ndim != 2 or embeddings.shape[0] != len(texts):
+                return None
+            hashes = [str(value) for value in meta.get("hashes") or []]
+            if len(hashes) != len(texts):
+                hashes = [content_hash(text) for text in texts]
+            return CachedEmbeddings(
+                signature=str(meta["signature"]),
+                texts=texts,
+                categories=[str(value) for value in meta.get("categories", [])],
+                sources=[str(value) for value in meta.get("sources", [])],
+                hashes=hashes,
+                embeddings=embeddings,
+            )
+        except Exception:
+            return None
+
+    def write(
+        self,
+        form_type: str,
+        signature: str,
+        texts: List[str],
+        categories: List[str],
+        sources: List[str],
+        embeddings: np.ndarray,
+        hashes: Optional[List[str]] = None,
+    ) -> Optional[CachedEmbeddings]:
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or not len(matrix):
+            return None
+        label = self._label(form_type)
+        data_path = self.stem.with_name(f"{self.stem.name}.{label}.{signature[:16]}.npy")
+        sidecar = self.sidecar_path(form_type)
+        suffix = f".tmp{os.getpid()}"
+        with self._lock:
+            if not data_path.exists():
+                tmp_data = data_path.with_name(data_path.name + suffix)
+                with open(tmp_data, "wb") as handle:
+                    np.save(handle, matrix, allow_pickle=False)
+                os.replace(tmp_data, data_path)
+            meta = {
+                "version": CACHE_FORMAT_VERSION,
+                "form_type": form_type,
+                "signature": signature,
+                "data_file": data_path.name,
+                "rows": int(matrix.shape[0]),
+                "dim": int(matrix.shape[1]),
+                "texts": list(texts),
+                "categories": list(categories),
+                "sources": list(sources),
+                "hashes": list(hashes) if hashes is not None else [content_hash(text) for text in texts],
+            }
+            tmp_sidecar = sidecar.with_name(sidecar.name + suffix)
+            tmp_sidecar.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_sidecar, sidecar)
+            self._opened.pop(form_type, None)
+            self._remove_stale(label, keep=data_path.name)
+        return self.load(form_type)
+
+    def _remove_stale(self, label: str, keep: str) -> None:
+        for path in self.stem.parent.glob(f"{self.stem.name}.{label}.*.npy"):
+            if path.name == keep:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                # Still mapped by another worker (Windows refuses); a later write retries.
+                pass
+
+    def known_vectors(self) -> Dict[str, np.ndarray]:
+        """Content hash -> vector across every cached form type, for carrying vectors forward."""
+        known: Dict[str, np.ndarray] = {}
+        for sidecar in self.stem.parent.glob(f"{self.stem.name}.*.json"):
+            form_type = sidecar.name[len(self.stem.name) + 1 : -len(".json")]
+            cached = self.load("" if form_type == "all" else form_type)
+            if cached is None:
+                continue
+            for position, row_hash in enumerate(cached.hashes):
+                known.setdefault(row_hash, cached.embeddings[position])
+        return known
+
+    def clear(self) -> None:
+        with self._lock:
+            self._opened.clear()
+            for pattern in (f"{self.stem.name}.*.json", f"{self.stem.name}.*.npy"):
+                for path in self.stem.parent.glob(pattern):
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+
+
+class SharedMatrixStore:
+    """Content-addressed read-only `.npy` matrices shared between worker processes.
+
+    `share` writes a matrix once under its content digest and returns a
+    read-only memory map of it; workers sharing identical rows map the same
+    file and therefore the same page-cache pages. Every forked worker writes
+    into the same directory on its own refresh timer, so `share` never deletes
+    anything: files from older versions stay until `clear`, which the parent
+    runs before it preloads and forks.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self._lock = Lock()
+
+    def share(self, name: str, matrix: np.ndarray) -> np.ndarray:
+        data = np.ascontiguousarray(matrix, dtype=np.float32)
+        if data.ndim != 2 or not data.size:
+            return data
+        digest = hashlib.sha256(repr(data.shape).encode("ascii") + data.tobytes()).hexdigest()[:16]
+        path = self.directory / f"{name}.{digest}.npy"
+        for _ in range(2):
+            try:
+                return np.load(path, mmap_mode="r", allow_pickle=False)
+            except FileNotFoundError:
+                self._write(path, data)
+        try:
+            return np.load(path, mmap_mode="r", allow_pickle=False)
+        except FileNotFoundError:
+            # Removed underneath us twice (e.g. a concurrent clear); serve this copy unshared.
+            return data
+
+    def _write(self, path: Path, data: np.ndarray) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + f".tmp{os.getpid()}")
+            with open(tmp, "wb") as handle:
+                np.save(handle, data, allow_pickle=False)
+            # Same digest means same bytes, so replacing another worker's copy is harmless.
+            os.replace(tmp, path)
+
+    def clear(self) -> None:
+        """Remove every shared matrix file; only call while no worker is running."""
+        with self._lock:
+            for path in self.directory.glob("*.npy*"):
+                try:
+                    # POSIX keeps the pages alive for anything still mapping it.
+                    path.unlink()
+                except OSError:
+                    pass
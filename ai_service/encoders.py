@@ -0,0 +1,321 @@
+"""Shared sentence encoder registry.
+
+`app.py`, `FeedbackRetrievalSystem` and the maintenance scripts all resolve their
+SBERT model through `get_encoder`, so a process holds exactly one model
+instance per model name. Tests and smoke checks can inject a fake encoder with
+`register_encoder` before the first lookup; anything exposing a
+SentenceTransformer-style `encode(texts, convert_to_numpy=..., normalize_embeddings=...)`
+works.
+
+SBERT_BACKEND picks the implementation behind a model name: `torch` (default,
+SentenceTransformer), `onnx` or `onnx-int8` (onnxruntime session over the
+export written by `export_onnx_encoder.py`, see `onnx_encoder.py`).
+
+Query embeddings go through `encode_texts`, which is backed by a bounded LRU
+cache keyed by model name and whitespace-normalized text, so a regenerate
+click that re-sends identical queries skips the transformer entirely. Cache
+misses from concurrent requests are coalesced by `encode_batcher` into one
+forward pass per short window (ENCODE_BATCH_WINDOW_MS, ENCODE_BATCH_MAX_SIZE).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .metrics import Histogram, trace_add, trace_record
+except ImportError:
+    from metrics import Histogram, trace_add, trace_record
+
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_encoders: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def default_model_name() -> str:
+    return os.getenv("SBERT_MODEL", DEFAULT_MODEL_NAME) or DEFAULT_MODEL_NAME
+
+
+def default_backend() -> str:
+    backend = (os.getenv("SBERT_BACKEND") or "torch").strip().lower()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unsupported SBERT_BACKEND '{backend}'. Expected one of: {', '.join(ENCODER_BACKENDS)}")
+    return backend
+
+
+def _load_torch_encoder(model_name: str) -> Any:
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def _load_onnx_encoder(model_name: str, quantized: bool = False) -> Any:
+    try:
+        from .onnx_encoder import OnnxSentenceEncoder, onnx_model_dir
+    except ImportError:
+        from onnx_encoder import OnnxSentenceEncoder, onnx_model_dir
+
+    return OnnxSentenceEncoder(onnx_model_dir(model_name), quantized=quantized)
+
+
+def load_encoder(model_name: str, backend: Optional[str] = None) -> Any:
+    """A new, unregistered encoder for `model_name` on `backend` (SBERT_BACKEND when None)."""
+    backend = backend or default_backend()
+    print(f"[ENCODER] loading {model_name} ({backend})")
+    if backend == "torch":
+        return _load_torch_encoder(model_name)
+    return _load_onnx_encoder(model_name, quantized=backend == "onnx-int8")
+
+
+def get_encoder(model_name: Optional[str] = None) -> Any:
+    """Return the process-wide encoder for `model_name`, loading it on first use."""
+    name = model_name or default_model_name()
+    encoder = _encoders.get(name)
+    if encoder is not None:
+        return encoder
+    with _lock:
+        encoder = _encoders.get(name)
+        if encoder is None:
+            encoder = load_encoder(name)
+            _encoders[name] = encoder
+    return encoder
+
+
+def register_encoder(model_name: Optional[str], encoder: Any) -> None:
+    """Install `encoder` for `model_name` (the default model when None), replacing any loaded one."""
+    name = model_name or default_model_name()
+    with _lock:
+        _encoders[name] = encoder
+    query_embedding_cache.clear(name)
+
+
+def loaded_encoders() -> Dict[str, Any]:
+    return dict(_encoders)
+
+
+def clear_encoders() -> None:
+    with _lock:
+        _encoders.clear()
+    query_embedding_cache.clear()
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query_text(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+class QueryEmbeddingCache:
+    """Bounded, thread-safe LRU of query embeddings keyed by (model name, normalized text)."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.capacity = max(0, int(capacity))
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        key = (model_name, normalize_query_text(text))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_name: str, text: str, vector: np.ndarray) -> None:
+        if not self.capacity:
+            return
+        stored = np.array(vector, dtype=np.float32)
+        stored.setflags(write=False)
+        key = (model_name, normalize_query_text(text))
+        with self._lock:
+            self._entries[key] = stored
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, model_name: Optional[str] = None) -> None:
+        with self._lock:
+            if model_name is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == model_name]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "capacity": self.capacity,
+            }
+
+
+query_embedding_cache = QueryEmbeddingCache(int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024") or 0))
+
+
+def _encode_now(model_name: str, texts: List[str]) -> np.ndarray:
+    encoded = get_encoder(model_name).encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(encoded, dtype=np.float32).reshape(len(texts), -1)
+
+
+class EncodeBatcher:
+    """Coalesces encode calls from concurrent requests into shared forward passes.
+
+    The first queued call opens a window of `window_seconds`; everything queued
+    before it closes (or until `max_batch` texts are waiting) is encoded in one
+    `encode` call per model on a single worker thread, and each caller gets
+    back its own rows. A window of 0 disables batching and encodes inline.
+    """
+
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+    WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+    def __init__(self, window_seconds: float = 0.004, max_batch: int = 64) -> None:
+        self.window_seconds = max(0.0, float(window_seconds))
+        self.max_batch = max(1, int(max_batch))
+        self.batch_sizes = Histogram(self.BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(self.WAIT_MS_BUCKETS)
+        self._pending: "deque[Tuple[str, List[str], Future, float]]" = deque()
+        self._pending_texts = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def encode(self, model_name: str, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if not self.enabled:
+            self.batch_sizes.observe(len(texts))
+            self.wait_ms.observe(0.0)
+            trace_record("encode_batches", {"texts": len(texts), "batch_size": len(texts)})
+            return _encode_now(model_name, texts)
+        future = self.submit(model_name, texts)
+        result = future.result()
+        trace_record("encode_batches", {"texts": len(texts), "batch_size": getattr(future, "batch_size", len(texts))})
+        return result
+
+    def submit(self, model_name: str, texts: List[str]) -> Future:
+        future: Future = Future()
+        with self._cond:
+            self._ensure_worker()
+            self._pending.append((model_name, list(texts), future, time.perf_counter()))
+            self._pending_texts += len(texts)
+            self._cond.notify()
+        return future
+
+    def _ensure_worker(self) -> None:
+        # A forked worker inherits the parent's thread object but not the thread.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = None
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> List[Tuple[str, List[str], Future, float]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = self._pending[0][3] + self.window_seconds
+            while self._pending_texts < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._pending.popleft()]
+            taken = len(batch[0][1])
+            while self._pending and taken + len(self._pending[0][1]) <= self.max_batch:
+                job = self._pending.popleft()
+                batch.append(job)
+                taken += len(job[1])
+            self._pending_texts -= taken
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            by_model: Dict[str, List[Tuple[List[str], Future, float]]] = {}
+            for model_name, texts, future, enqueued in batch:
+                by_model.setdefault(model_name, []).append((texts, future, enqueued))
+            for model_name, jobs in by_model.items():
+                unique = list(dict.fromkeys(text for texts, _, _ in jobs for text in texts))
+                try:
+                    encoded = _encode_now(model_name, unique)
+                except BaseException as exc:
+                    for _, future, _ in jobs:
+                        future.set_exception(exc)
+                    continue
+                self.batch_sizes.observe(len(unique))
+                rows = {text: encoded[position] for position, text in enumerate(unique)}
+                for texts, future, enqueued in jobs:
+                    self.wait_ms.observe((started - enqueued) * 1000.0)
+                    # Size of the shared forward pass, reported in the caller's request trace.
+                    future.batch_size = len(unique)
+                    future.set_result(np.vstack([rows[text] for text in texts]))
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            queued = self._pending_texts
+        return {
+            "window_ms": round(self.window_seconds * 1000.0, 3),
+            "max_batch": self.max_batch,
+            "queued_texts": queued,
+            "batch_size": self.batch_sizes.snapshot(),
+            "wait_ms": self.wait_ms.snapshot(),
+        }
+
+
+encode_batcher = EncodeBatcher(
+    window_seconds=float(os.getenv("ENCODE_BATCH_WINDOW_MS", "4") or 0) / 1000.0,
+    max_batch=int(os.getenv("ENCODE_BATCH_MAX_SIZE", "64") or 64),
+)
+
+
+def encode_texts(texts: Sequence[str], model_name: Optional[str] = None) -> np.ndarray:
+    """Normalized float32 query embeddings, one row per text.
+
+    Cached texts are served from `query_embedding_cache`; the rest go through
+    `encode_batcher`, sharing a forward pass with other in-flight requests.
+    """
+    name = model_name or default_model_name()
+    rows: List[Optional[np.ndarray]] = [query_embedding_cache.get(name, text) for text in texts]
+    missing = list(dict.fromkeys(normalize_query_text(texts[i]) for i, row in enumerate(rows) if row is None))
+    trace_add("query_embedding_cache.hit", sum(row is not None for row in rows))
+    trace_add("query_embedding_cache.miss", len(missing))
+    if missing:
+        encoded = encode_batcher.encode(name, missing)
+        fresh = dict(zip(missing, encoded))
+        for text, vector in fresh.items():
+            query_embedding_cache.put(name, text, vector)
+        rows = [row if row is not None else fresh[normalize_query_text(texts[i])] for i, row in enumerate(rows)]
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(rows).astype(np.float32, copy=False)
@@ -0,0 +1,100 @@
+"""Export the SBERT model to ONNX for the onnxruntime encoder backend.
+
+Loads the SentenceTransformer the service normally uses (from the local
+Hugging Face cache when it is there), exports its transformer to
+`onnx_models/<model>/model.onnx` together with the tokenizer and pooling
+settings, and with --int8 also writes a dynamically quantized
+`model.int8.onnx`. Serve it with SBERT_BACKEND=onnx or SBERT_BACKEND=onnx-int8.
+
+Needs torch, sentence-transformers and onnxruntime (plus onnx for --int8);
+serving the exported model only needs onnxruntime and tokenizers.
+
+Usage:
+    cd ai_service
+    python export_onnx_encoder.py [--model NAME] [--out DIR] [--int8] [--opset 17]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+from encoders import default_model_name
+from onnx_encoder import ENCODER_CONFIG_FILE, ONNX_INT8_MODEL_FILE, ONNX_MODEL_FILE, onnx_model_dir
+
+
+def export(model_name: str, out_dir: Path, int8: bool = False, opset: int = 17) -> Path:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    st_model.eval()
+    transformer = st_model[0]
+    tokenizer = transformer.tokenizer
+    auto_model = transformer.auto_model
+    pooling = "mean"
+    if len(st_model) > 1 and hasattr(st_model[1], "get_pooling_mode_str"):
+        pooling = st_model[1].get_pooling_mode_str()
+    if pooling not in ("mean", "cls"):
+        raise SystemExit(f"Unsupported pooling mode for ONNX export: {pooling}")
+
+    sample = tokenizer(["A sample classroom observation comment."], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, model: torch.nn.Module) -> None:
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs: torch.Tensor) -> torch.Tensor:
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model_path = out_dir / ONNX_MODEL_FILE
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(auto_model),
+            tuple(sample[name] for name in input_names),
+            str(model_path),
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(str(out_dir))
+    config = {
+        "model_name": model_name,
+        "max_seq_length": int(st_model.max_seq_length or 256),
+        "pooling": pooling,
+        "dimension": int(st_model.get_sentence_embedding_dimension()),
+        "pad_token": tokenizer.pad_token or "[PAD]",
+    }
+    (out_dir / ENCODER_CONFIG_FILE).write_text(json.dumps(config, indent=2), encoding="utf-8")
+    print(f"Exported {model_name} -> {model_path} ({pooling} pooling, dim {config['dimension']})")
+
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+        int8_path = out_dir / ONNX_INT8_MODEL_FILE
+        quantize_dynamic(str(model_path), str(int8_path), weight_type=QuantType.QInt8)
+        print(f"Quantized (dynamic int8) -> {int8_path}")
+    return out_dir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the SBERT encoder to ONNX.")
+    parser.add_argument("--model", default=default_model_name(), help="SentenceTransformer model name or path.")
+    parser.add_argument("--out", default=None, help="Export directory (default: onnx_models/<model>).")
+    parser.add_argument("--int8", action="store_true", help="Also write a dynamically quantized int8 model.")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export(args.model, Path(args.out) if args.out else onnx_model_dir(args.model), int8=args.int8, opset=args.opset)
+
+
+if __name__ == "__main__":
+    main()
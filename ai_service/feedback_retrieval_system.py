@@ -14,24 +14,68 @@ portable enough to adapt to MySQL later.
 from __future__ import annotations
 
 import json
+import logging
+import os
+import re
 import sqlite3
+import struct
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import zlib
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
+try:
+    from .embedding_cache import SharedMatrixStore
+    from .encoders import DEFAULT_MODEL_NAME, default_model_name, encode_texts, get_encoder
+    from .metrics import current_trace, stage_timer, trace_add
+    from .mysql_pool import MySQLConnectionPool
+except ImportError:
+    from embedding_cache import SharedMatrixStore
+    from encoders import DEFAULT_MODEL_NAME, default_model_name, encode_texts, get_encoder
+    from metrics import current_trace, stage_timer, trace_add
+    from mysql_pool import MySQLConnectionPool
+
+
+logger = logging.getLogger(__name__)
 
-DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 DEFAULT_DB_PATH = Path(__file__).with_name("feedback_templates.db")
+
 DEFAULT_MYSQL_TABLE = "ai_feedback_templates"
 SUPPORTED_FIELDS = (
     "strengths",
     "areas_for_improvement",
     "recommendations",
 )
+SUPPORTED_FORM_TYPES = ("iso", "peac")
+
+# Raw embedding blob: 8-byte header (magic, version, dtype code, dimension) then
+# little-endian float data, so reads are a single np.frombuffer over the blob.
+EMBEDDING_BLOB_MAGIC = b"AEMB"
+EMBEDDING_BLOB_VERSION = 1
+EMBEDDING_BLOB_HEADER = struct.Struct("<4sBBH")
+EMBEDDING_BLOB_DTYPES = {0: np.dtype("<f4"), 1: np.dtype("<f2")}
+EMBEDDING_BLOB_CODES = {"float32": 0, "float16": 1}
+
+
+def _trace_db_round_trip(rows: Any) -> None:
+    """Count one DB round trip and the payload bytes it returned in the request trace."""
+    if current_trace() is None:
+        return
+    if isinstance(rows, dict):
+        rows = [rows]
+    payload = 0
+    for row in rows or ():
+        for value in row.values():
+            if isinstance(value, (bytes, bytearray, memoryview, str)):
+                payload += len(value)
+            elif value is not None:
+                payload += 8
+    trace_add("db.round_trips")
+    trace_add("db.bytes", payload)
 
 
 @dataclass(frozen=True)
@@ -47,15 +91,28 @@ class FeedbackTemplateBackend:
     def ensure_schema(self) -> None:
         raise NotImplementedError
 
-    def insert_template(self, field_name: str, evaluation_comment: str, feedback_text: str, embedding_vector: bytes) -> int:
+    def insert_template(self, field_name: str, evaluation_comment: str, feedback_text: str, embedding_vector: bytes, auto_commit: bool = True) -> int:
         raise NotImplementedError
 
+    @contextmanager
+    def transaction(self) -> Iterator[Any]:
+        """Group `auto_commit=False` writes; committed when the block exits cleanly."""
+        yield None
+
     def fetch_templates(self, field_name: str, form_type: str = "") -> List[Dict[str, Any]]:
         raise NotImplementedError
 
     def count_templates(self) -> int:
         raise NotImplementedError
 
+    def template_watermark(self) -> Dict[str, Any]:
+        """Cheap change marker: latest updated_at, row count and highest id."""
+        raise NotImplementedError
+
+    def fetch_changed_templates(self, since: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Rows (active or not) touched after the given watermark."""
+        raise NotImplementedError
+
     def clear_templates(self) -> None:
         raise NotImplementedError
 
@@ -86,7 +143,7 @@ class SQLiteFeedbackTemplateBackend(FeedbackTemplateBackend):
         )
         self.connection.commit()
 
-    def insert_template(self, field_name: str, evaluation_comment: str, feedback_text: str, embedding_vector: bytes) -> int:
+    def insert_template(self, field_name: str, evaluation_comment: str, feedback_text: str, embedding_vector: bytes, auto_commit: bool = True) -> int:
         cursor = self.connection.execute(
             """
             INSERT INTO feedback_templates (field_name, evaluation_comment, feedback_text, embedding_vector)
@@ -94,9 +151,19 @@ class SQLiteFeedbackTemplateBackend(FeedbackTemplateBackend):
             """,
             (field_name, evaluation_comment, feedback_text, embedding_vector),
         )
-        self.connection.commit()
+        if auto_commit:
+            self.connection.commit()
         return int(cursor.lastrowid)
 
+    @contextmanager
+    def transaction(self) -> Iterator[Any]:
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+
     def fetch_templates(self, field_name: str, form_type: str = "") -> List[Dict[str, Any]]:
         cursor = self.connection.execute(
             """
@@ -107,12 +174,31 @@ class SQLiteFeedbackTemplateBackend(FeedbackTemplateBackend):
             """,
             (field_name,),
         )
-        return [dict(row) for row in cursor.fetchall()]
+        rows = [dict(row) for row in cursor.fetchall()]
+        _trace_db_round_trip(rows)
+        return rows
 
     def count_templates(self) -> int:
         row = self.connection.execute("SELECT COUNT(*) AS total FROM feedback_templates").fetchone()
         return int(row["total"] if row else 0)
 
+    def template_watermark(self) -> Dict[str, Any]:
+        # The SQLite table has no updated_at column, so only appends are detectable here.
+        row = self.connection.execute("SELECT COUNT(*) AS total, MAX(id) AS max_id FROM feedback_templates").fetchone()
+        return {"updated_at": None, "total": int(row["total"] or 0), "max_id": int(row["max_id"] or 0)}
+
+    def fetch_changed_templates(self, since: Dict[str, Any]) -> List[Dict[str, Any]]:
+        cursor = self.connection.execute(
+            """
+            SELECT id, field_name, evaluation_comment, feedback_text, embedding_vector, 1 AS is_active
+            FROM feedback_templates
+            WHERE id > ?
+            ORDER BY id ASC
+            """,
+            (int(since.get("max_id") or 0),),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
     def clear_templates(self) -> None:
         self.connection.execute("DELETE FROM feedback_templates")
         self.connection.commit()
@@ -121,145 +207,631 @@ class SQLiteFeedbackTemplateBackend(FeedbackTemplateBackend):
         self.connection.close()
 
 
+_MYSQL_TABLE_NAME_RE = re.compile(r"^[A-Za-z0-9_$]{1,64}$")
+
+
 class MySQLFeedbackTemplateBackend(FeedbackTemplateBackend):
-    def __init__(self, connection: Any, table_name: str = DEFAULT_MYSQL_TABLE) -> None:
-        self.connection = connection
-        self.table_name = table_name
-        self._connect_kwargs: Optional[Dict[str, Any]] = None
+    """Template storage in MySQL, one pooled connection per thread.
 
-    def _ensure_connected(self) -> None:
-        """Ping MySQL and reconnect if connection is stale."""
-        try:
-            self.connection.ping(reconnect=True)
-        except Exception:
-            if self._connect_kwargs:
-                import pymysql  # type: ignore
-                self.connection = pymysql.connect(**self._connect_kwargs)
+    Statements are built once per backend with `%s` placeholders; values are
+    always passed as parameters and only the validated table name is
+    interpolated.
+    """
+
+    def __init__(self, pool: MySQLConnectionPool, table_name: str = DEFAULT_MYSQL_TABLE) -> None:
+        if not _MYSQL_TABLE_NAME_RE.match(table_name or ""):
+            raise ValueError(f"Invalid MySQL table name: {table_name!r}")
+        self.pool = pool
+        self.table_name = table_name
+        self._form_type_exists: Optional[bool] = None
+        table = f"`{table_name}`"
+        columns = "id, field_name, evaluation_comment, feedback_text, embedding_vector"
+        self._sql = {
+            "insert": f"INSERT INTO {table} (field_name, evaluation_comment, feedback_text, embedding_vector) VALUES (%s, %s, %s, %s)",
+            "fetch": f"SELECT {columns} FROM {table} WHERE field_name = %s AND is_active = 1 ORDER BY id ASC",
+            "fetch_form_type": (
+                f"SELECT {columns} FROM {table} WHERE field_name = %s AND is_active = 1"
+                " AND (form_type = %s OR form_type IS NULL OR form_type = '') ORDER BY id ASC"
+            ),
+            "form_type_column": f"SHOW COLUMNS FROM {table} LIKE 'form_type'",
+            "count": f"SELECT COUNT(*) AS total FROM {table} WHERE is_active = 1",
+            "watermark": f"SELECT MAX(updated_at) AS updated_at, COUNT(*) AS total, MAX(id) AS max_id FROM {table}",
+            "clear": f"DELETE FROM {table}",
+        }
+
+    def _query(self, sql: str, params: Sequence[Any] = (), fetch: str = "all") -> Any:
+        """Run one read, retrying once on a fresh connection if the pooled one went away."""
+        for attempt in (0, 1):
+            try:
+                with self.pool.connection(fresh=bool(attempt)) as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(sql, tuple(params))
+                        result = cur.fetchone() if fetch == "one" else list(cur.fetchall())
+                _trace_db_round_trip(result)
+                return result
+            except Exception as exc:
+                # Only a lost connection is worth a retry; SQL, lock and permission errors
+                # would fail again. Inside a caller's transaction the connection cannot be swapped.
+                if attempt or self.pool.in_checkout() or not self.pool.is_connection_lost(exc):
+                    raise
+
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> Tuple[int, int]:
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, tuple(params))
+                trace_add("db.round_trips")
+                return int(cur.rowcount), int(cur.lastrowid or 0)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Any]:
+        with self.pool.transaction() as conn:
+            yield conn
 
     def ensure_schema(self) -> None:
-        self._ensure_connected()
-        with self.connection.cursor() as cur:
-            cur.execute(
-                f"""
-                CREATE TABLE IF NOT EXISTS `{self.table_name}` (
-                    `id` INT PRIMARY KEY AUTO_INCREMENT,
-                    `field_name` VARCHAR(64) NOT NULL,
-                    `evaluation_comment` TEXT NOT NULL,
-                    `feedback_text` TEXT NOT NULL,
-                    `embedding_vector` LONGBLOB NOT NULL,
-                    `source` VARCHAR(64) DEFAULT 'seed',
-                    `is_active` TINYINT(1) NOT NULL DEFAULT 1,
-                    `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    KEY `idx_field_name` (`field_name`),
-                    KEY `idx_is_active` (`is_active`)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-                """
-            )
-        self.connection.commit()
+        self._execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS `{self.table_name}` (
+                `id` INT PRIMARY KEY AUTO_INCREMENT,
+                `field_name` VARCHAR(64) NOT NULL,
+                `evaluation_comment` TEXT NOT NULL,
+                `feedback_text` TEXT NOT NULL,
+                `embedding_vector` LONGBLOB NOT NULL,
+                `source` VARCHAR(64) DEFAULT 'seed',
+                `is_active` TINYINT(1) NOT NULL DEFAULT 1,
+                `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                KEY `idx_field_name` (`field_name`),
+                KEY `idx_is_active` (`is_active`)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """
+        )
 
     def insert_template(self, field_name: str, evaluation_comment: str, feedback_text: str, embedding_vector: bytes, auto_commit: bool = True) -> int:
-        self._ensure_connected()
-        with self.connection.cursor() as cur:
-            cur.execute(
-                f"""
-                INSERT INTO `{self.table_name}` (field_name, evaluation_comment, feedback_text, embedding_vector)
-                VALUES (%s, %s, %s, %s)
-                """,
-                (field_name, evaluation_comment, feedback_text, embedding_vector),
-            )
-            inserted_id = int(cur.lastrowid)
-        if auto_commit:
-            self.connection.commit()
+        # Pooled connections autocommit; auto_commit=False rows join the
+        # caller's open `transaction()` on this thread.
+        _, inserted_id = self._execute(self._sql["insert"], (field_name, evaluation_comment, feedback_text, embedding_vector))
         return inserted_id
 
     def fetch_templates(self, field_name: str, form_type: str = "") -> List[Dict[str, Any]]:
-        self._ensure_connected()
-        with self.connection.cursor() as cur:
-            if form_type and form_type in ("iso", "peac") and self._has_form_type_column():
-                cur.execute(
-                    f"""
-                    SELECT id, field_name, evaluation_comment, feedback_text, embedding_vector
-                    FROM `{self.table_name}`
-                    WHERE field_name = %s AND is_active = 1
-                      AND (form_type = %s OR form_type IS NULL OR form_type = '')
-                    ORDER BY id ASC
-                    """,
-                    (field_name, form_type),
-                )
-            else:
-                cur.execute(
-                    f"""
-                    SELECT id, field_name, evaluation_comment, feedback_text, embedding_vector
-                    FROM `{self.table_name}`
-                    WHERE field_name = %s AND is_active = 1
-                    ORDER BY id ASC
-                    """,
-                    (field_name,),
-                )
-            rows = cur.fetchall()
-        return list(rows)
+        if form_type and form_type in ("iso", "peac") and self._has_form_type_column():
+            return self._query(self._sql["fetch_form_type"], (field_name, form_type))
+        return self._query(self._sql["fetch"], (field_name,))
 
     def _has_form_type_column(self) -> bool:
-        if not hasattr(self, '_form_type_exists'):
+        if self._form_type_exists is None:
             try:
-                with self.connection.cursor() as cur:
-                    cur.execute(f"SHOW COLUMNS FROM `{self.table_name}` LIKE 'form_type'")
-                    self._form_type_exists = cur.fetchone() is not None
+                self._form_type_exists = self._query(self._sql["form_type_column"], fetch="one") is not None
             except Exception:
                 self._form_type_exists = False
         return self._form_type_exists
 
     def count_templates(self) -> int:
-        self._ensure_connected()
-        with self.connection.cursor() as cur:
-            cur.execute(f"SELECT COUNT(*) AS total FROM `{self.table_name}` WHERE is_active = 1")
-            row = cur.fetchone()
+        row = self._query(self._sql["count"], fetch="one")
         return int((row or {}).get("total", 0))
 
+    def template_watermark(self) -> Dict[str, Any]:
+        row = self._query(self._sql["watermark"], fetch="one") or {}
+        return {
+            "updated_at": row.get("updated_at"),
+            "total": int(row.get("total") or 0),
+            "max_id": int(row.get("max_id") or 0),
+        }
+
+    def fetch_changed_templates(self, since: Dict[str, Any]) -> List[Dict[str, Any]]:
+        form_type_column = ", form_type" if self._has_form_type_column() else ""
+        # updated_at has one-second resolution, so the comparison is inclusive;
+        # re-applying an unchanged row is harmless.
+        conditions = ["id > %s"]
+        params: List[Any] = [int(since.get("max_id") or 0)]
+        if since.get("updated_at") is not None:
+            conditions.append("updated_at >= %s")
+            params.append(since["updated_at"])
+        return self._query(
+            f"""
+            SELECT id, field_name, evaluation_comment, feedback_text, embedding_vector, is_active{form_type_column}
+            FROM `{self.table_name}`
+            WHERE {" OR ".join(conditions)}
+            ORDER BY id ASC
+            """,
+            params,
+        )
+
     def clear_templates(self) -> None:
-        self._ensure_connected()
-        with self.connection.cursor() as cur:
-            cur.execute(f"DELETE FROM `{self.table_name}`")
-        self.connection.commit()
+        self._execute(self._sql["clear"])
 
     def close(self) -> None:
+        self.pool.close()
+
+
+def _index_form_type(form_type: str) -> str:
+    """Backends only filter on known form types; anything else reads the full field."""
+    form_type = (form_type or "").strip().lower()
+    return form_type if form_type in SUPPORTED_FORM_TYPES else ""
+
+
+def _usable_vector(decode: Callable[[Any], np.ndarray], raw_value: Any, dim: int) -> Optional[np.ndarray]:
+    """Decoded embedding, or None when the blob is empty, undecodable or not `dim` long (0 = any)."""
+    try:
+        vector = decode(raw_value)
+    except Exception:
+        return None
+    if vector.ndim != 1 or vector.size == 0 or (dim and vector.size != dim):
+        return None
+    return vector
+
+
+class TemplateIndexPartition:
+    """Contiguous embedding matrix plus parallel metadata for one (field_name, form_type).
+
+    The metadata lists every active template. Templates whose embedding is
+    unusable have no matrix row and are never scored; `matrix_rows` holds the
+    metadata position of each matrix row.
+    """
+
+    def __init__(
+        self,
+        field_name: str,
+        form_type: str,
+        ids: Sequence[int],
+        evaluation_comments: Sequence[str],
+        feedback_texts: Sequence[str],
+        matrix: np.ndarray,
+        matrix_rows: Optional[Sequence[int]] = None,
+    ) -> None:
+        self.field_name = field_name
+        self.form_type = form_type
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.evaluation_comments = list(evaluation_comments)
+        self.feedback_texts = list(feedback_texts)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.matrix_rows = np.asarray(range(len(self.matrix)) if matrix_rows is None else matrix_rows, dtype=np.int64)
+        self.norms = np.linalg.norm(self.matrix, axis=1) if len(self.matrix) else np.zeros((0,), dtype=np.float32)
+
+    @classmethod
+    def _build(
+        cls,
+        field_name: str,
+        form_type: str,
+        entries: Sequence[Tuple[int, str, str, Optional[np.ndarray]]],
+    ) -> "TemplateIndexPartition":
+        """Partition from (id, evaluation comment, feedback text, vector or None) entries in id order."""
+        vectors = [(position, entry[3]) for position, entry in enumerate(entries) if entry[3] is not None]
+        matrix = np.vstack([vector for _, vector in vectors]) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return cls(
+            field_name,
+            form_type,
+            [entry[0] for entry in entries],
+            [entry[1] for entry in entries],
+            [entry[2] for entry in entries],
+            matrix,
+            [position for position, _ in vectors],
+        )
+
+    @classmethod
+    def from_rows(
+        cls,
+        field_name: str,
+        form_type: str,
+        rows: Iterable[Dict[str, Any]],
+        decode: Callable[[Any], np.ndarray],
+    ) -> "TemplateIndexPartition":
+        entries: List[Tuple[int, str, str, Optional[np.ndarray]]] = []
+        dim = 0
+        for row in rows:
+            vector = _usable_vector(decode, row.get("embedding_vector"), dim)
+            dim = dim or (int(vector.size) if vector is not None else 0)
+            entries.append((int(row["id"]), str(row.get("evaluation_comment") or ""), str(row.get("feedback_text") or ""), vector))
+        partition = cls._build(field_name, form_type, entries)
+        unscored = len(partition) - len(partition.matrix_rows)
+        if unscored:
+            logger.warning(
+                "template index %s/%s: %d of %d templates have a missing or mismatched embedding and are not scored",
+                field_name,
+                form_type or "all",
+                unscored,
+                len(partition),
+            )
+        return partition
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    def score_matrix(self, query_embeddings: np.ndarray) -> np.ndarray:
+        """Cosine similarities for several queries at once: one row per matrix row, one column per query."""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if not len(self.matrix) or queries.ndim != 2 or queries.shape[1] != self.matrix.shape[1]:
+            return np.zeros((len(self.matrix), len(queries)), dtype=np.float64)
+        dots = (self.matrix @ queries.T).astype(np.float64)
+        denominators = np.outer(self.norms, np.linalg.norm(queries, axis=1)).astype(np.float64) + 1e-12
+        return dots / denominators
+
+    def row(self, position: int) -> Dict[str, Any]:
+        return {
+            "id": int(self.ids[position]),
+            "field_name": self.field_name,
+            "evaluation_comment": self.evaluation_comments[position],
+            "feedback_text": self.feedback_texts[position],
+        }
+
+    def accepts(self, row: Dict[str, Any]) -> bool:
+        if str(row.get("field_name") or "") != self.field_name or not int(row.get("is_active", 1) or 0):
+            return False
+        if not self.form_type:
+            return True
+        row_form_type = (row.get("form_type") or "").strip().lower()
+        return row_form_type in ("", self.form_type)
+
+    def patched(
+        self,
+        changed_rows: Sequence[Dict[str, Any]],
+        decode: Callable[[Any], np.ndarray],
+    ) -> Optional["TemplateIndexPartition"]:
+        """Copy of this partition with changed rows upserted or dropped, or None if untouched.
+
+        Rows stay ordered by id so the result matches a full reload.
+        """
+        positions = {int(template_id): pos for pos, template_id in enumerate(self.ids.tolist())}
+        upserts: Dict[int, Tuple[str, str, Optional[np.ndarray]]] = {}
+        removals = set()
+        dim = int(self.matrix.shape[1]) if len(self.matrix) else 0
+        for row in changed_rows:
+            template_id = int(row["id"])
+            if not self.accepts(row):
+                if template_id in positions:
+                    removals.add(template_id)
+                upserts.pop(template_id, None)
+                continue
+            vector = _usable_vector(decode, row.get("embedding_vector"), dim)
+            dim = dim or (int(vector.size) if vector is not None else 0)
+            removals.discard(template_id)
+            upserts[template_id] = (
+                str(row.get("evaluation_comment") or ""),
+                str(row.get("feedback_text") or ""),
+                vector,
+            )
+        if not upserts and not removals:
+            return None
+
+        vectors = {int(self.matrix_rows[row]): self.matrix[row] for row in range(len(self.matrix_rows))}
+        merged: Dict[int, Tuple[str, str, Optional[np.ndarray]]] = {
+            template_id: (self.evaluation_comments[pos], self.feedback_texts[pos], vectors.get(pos))
+            for template_id, pos in positions.items()
+            if template_id not in removals
+        }
+        merged.update(upserts)
+        return TemplateIndexPartition._build(
+            self.field_name,
+            self.form_type,
+            [(template_id, *merged[template_id]) for template_id in sorted(merged)],
+        )
+
+
+class TemplateIndex:
+    """Resident template index, loaded once per (field_name, form_type) partition.
+
+    With a `matrix_store`, partition matrices live in shared read-only memory
+    maps instead of private process memory (multi-worker serving).
+    """
+
+    def __init__(
+        self,
+        backend: FeedbackTemplateBackend,
+        decode: Callable[[Any], np.ndarray],
+        matrix_store: Optional[Any] = None,
+    ) -> None:
+        self.backend = backend
+        self.decode = decode
+        self.matrix_store = matrix_store
+        self._partitions: Dict[Tuple[str, str], TemplateIndexPartition] = {}
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[List[Tuple[str, str]]], None]] = []
+        self._pinned = threading.local()
+        self.version = 0
+
+    def add_listener(self, callback: Callable[[List[Tuple[str, str]]], None]) -> None:
+        """Register a callback receiving the (field_name, form_type) keys that changed."""
+        self._listeners.append(callback)
+
+    def _notify(self, keys: List[Tuple[str, str]]) -> None:
+        for callback in list(self._listeners):
+            try:
+                callback(keys)
+            except Exception as exc:
+                logger.warning("template index listener failed: %s", exc)
+
+    def partition(self, field_name: str, form_type: str = "") -> TemplateIndexPartition:
+        key = (field_name, _index_form_type(form_type))
+        pinned: Optional[Dict[Tuple[str, str], TemplateIndexPartition]] = getattr(self._pinned, "partitions", None)
+        if pinned is not None and key in pinned:
+            trace_add("template_index.hit")
+            return pinned[key]
+        partition = self._partitions.get(key)
+        if partition is not None:
+            trace_add("template_index.hit")
+        else:
+            with self._lock:
+                partition = self._partitions.get(key)
+                if partition is None:
+                    trace_add("template_index.miss")
+                    with stage_timer("db_fetch"):
+                        rows = self.backend.fetch_templates(field_name, form_type=key[1])
+                    partition = self._shared(TemplateIndexPartition.from_rows(field_name, key[1], rows, self.decode))
+                    self._partitions[key] = partition
+        if pinned is not None:
+            pinned[key] = partition
+        return partition
+
+    @contextmanager
+    def snapshot(self) -> Iterator[None]:
+        """Within the block, this thread keeps getting the partitions it first looked up,
+        even if a refresh or invalidation swaps them meanwhile."""
+        if getattr(self._pinned, "partitions", None) is not None:
+            yield
+            return
+        self._pinned.partitions = {}
         try:
-            self.connection.close()
-        except Exception:
-            pass
+            yield
+        finally:
+            self._pinned.partitions = None
+
+    def _shared(self, partition: TemplateIndexPartition) -> TemplateIndexPartition:
+        if self.matrix_store is not None and len(partition.matrix):
+            name = f"{partition.field_name}.{partition.form_type or 'all'}"
+            partition.matrix = self.matrix_store.share(name, partition.matrix)
+        return partition
+
+    def invalidate(self, field_name: Optional[str] = None) -> None:
+        with self._lock:
+            keys = [key for key in self._partitions if field_name is None or key[0] == field_name]
+            for key in keys:
+                del self._partitions[key]
+            self.version += 1
+        self._notify(keys)
+
+    def apply_changes(self, changed_rows: Sequence[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """Patch loaded partitions in place from a change feed; returns the keys that changed."""
+        if not changed_rows:
+            return []
+        changed: List[Tuple[str, str]] = []
+        with self._lock:
+            for key, partition in list(self._partitions.items()):
+                replacement = partition.patched(changed_rows, self.decode)
+                if replacement is not None:
+                    self._partitions[key] = self._shared(replacement)
+                    changed.append(key)
+            if changed:
+                self.version += 1
+        if changed:
+            self._notify(changed)
+        return changed
+
+    def sizes(self) -> Dict[str, int]:
+        return {f"{field}:{form_type or 'all'}": len(part) for (field, form_type), part in self._partitions.items()}
+
+
+MMR_DIVERSITY_WEIGHT = 0.55
+MMR_LEXICAL_PENALTY = 0.2
+MMR_INDICATOR_PENALTY = 0.12
+MMR_INDICATOR_REPEAT_PENALTY = 0.25
+MMR_CONTENT_DUP_PENALTY = 0.30
+MMR_CONTENT_DUP_OVERLAP = 0.70
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    embeddings: np.ndarray,
+    evaluation_comments: Sequence[str],
+    feedback_texts: Sequence[str],
+    desired: int,
+) -> List[int]:
+    """Pick shortlist positions by maximal marginal relevance.
+
+    Each candidate's score is its relevance minus four penalties against the
+    rows already picked:
+    - diversity: highest cosine similarity to a picked embedding, times 0.55
+    - lexical: 0.2 when the combined comment + feedback text was already picked
+    - indicator: 0.12 (one earlier pick) or 0.25 (two or more) for a repeated evaluation comment
+    - content duplication: 0.30 when feedback word sets overlap by more than 70%
+
+    The pairwise similarity matrix, token sets and keys are computed once and the
+    penalties are kept as arrays updated after each pick. Ties go to the earlier
+    shortlist position.
+    """
+    count = len(relevance)
+    if not count:
+        return []
+    relevance = np.asarray(relevance, dtype=np.float64)
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    similarity = (matrix @ matrix.T).astype(np.float64) / (np.outer(norms, norms).astype(np.float64) + 1e-12)
+
+    def key_ids(values: Iterable[str]) -> np.ndarray:
+        lookup: Dict[str, int] = {}
+        return np.asarray([lookup.setdefault(value, len(lookup)) for value in values], dtype=np.int64)
+
+    indicator_keys = [(comment or "").strip().lower() for comment in evaluation_comments]
+    indicator_ids = key_ids(indicator_keys)
+    indicator_present = np.asarray([bool(key) for key in indicator_keys])
+    lexical_keys = [
+        f"{comment or ''} {feedback or ''}".strip().lower()
+        for comment, feedback in zip(evaluation_comments, feedback_texts)
+    ]
+    lexical_ids = key_ids(lexical_keys)
+    lexical_present = np.asarray([bool(key) for key in lexical_keys])
+    token_sets = [set((feedback or "").strip().lower().split()) for feedback in feedback_texts]
+
+    max_similarity = np.full(count, -np.inf, dtype=np.float64)
+    indicator_counts = np.zeros(int(indicator_ids.max()) + 1, dtype=np.int64)
+    lexical_seen = np.zeros(int(lexical_ids.max()) + 1, dtype=bool)
+    content_dup = np.zeros(count, dtype=bool)
+    available = np.ones(count, dtype=bool)
+    picks: List[int] = []
+
+    while len(picks) < min(desired, count):
+        if picks:
+            diversity_penalty = max_similarity * MMR_DIVERSITY_WEIGHT
+            lexical_penalty = np.where(lexical_present & lexical_seen[lexical_ids], MMR_LEXICAL_PENALTY, 0.0)
+            repeats = np.where(indicator_present, indicator_counts[indicator_ids], 0)
+            indicator_penalty = np.where(
+                repeats >= 2, MMR_INDICATOR_REPEAT_PENALTY, np.where(repeats >= 1, MMR_INDICATOR_PENALTY, 0.0)
+            )
+            content_dup_penalty = np.where(content_dup, MMR_CONTENT_DUP_PENALTY, 0.0)
+            values = relevance - diversity_penalty - lexical_penalty - indicator_penalty - content_dup_penalty
+        else:
+            values = relevance.copy()
+        values[~available] = -np.inf
+        best = int(np.argmax(values))
+        picks.append(best)
+        available[best] = False
+
+        max_similarity = np.maximum(max_similarity, similarity[:, best])
+        indicator_counts[indicator_ids[best]] += 1
+        lexical_seen[lexical_ids[best]] = True
+        picked_tokens = token_sets[best]
+        if picked_tokens:
+            for position in np.flatnonzero(available & ~content_dup).tolist():
+                tokens = token_sets[position]
+                if tokens and len(tokens & picked_tokens) / max(len(tokens), len(picked_tokens)) > MMR_CONTENT_DUP_OVERLAP:
+                    content_dup[position] = True
+    return picks
+
+
+class TemplateIndexRefresher:
+    """Background poller that keeps a TemplateIndex in step with the template table.
+
+    Each tick reads a cheap watermark; only when it moves are the changed or
+    deactivated rows fetched and patched into the index. Hard deletes cannot be
+    seen in the change feed, so a row-count mismatch falls back to a full reload.
+    """
+
+    def __init__(self, index: TemplateIndex, interval_seconds: float = 30.0) -> None:
+        self.index = index
+        self.interval_seconds = max(1.0, float(interval_seconds))
+        self._watermark: Optional[Dict[str, Any]] = None
+        # Serializes polls; the index lock is only taken to swap partitions in,
+        # so a slow database never blocks request threads.
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._poll_lock:
+            self._watermark = self.index.backend.template_watermark()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="template-index-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.poll_once()
+            except Exception as exc:
+                logger.warning("template index refresh failed: %s", exc)
+
+    def poll_once(self) -> int:
+        """Apply any pending changes; returns the number of changed rows read.
+
+        The database reads run without the index lock. A partition loaded
+        meanwhile either already holds the changed rows or is in the index when
+        `apply_changes` patches it (re-applying a row is harmless).
+        """
+        backend = self.index.backend
+        with self._poll_lock:
+            previous = self._watermark
+            current = backend.template_watermark()
+            if previous is None:
+                self._watermark = current
+                return 0
+            if current == previous:
+                return 0
+            rows = backend.fetch_changed_templates(previous)
+            appended = sum(1 for row in rows if previous["max_id"] < int(row["id"]) <= current["max_id"])
+            if current["total"] != previous["total"] + appended:
+                print(f"[TEMPLATE_INDEX] row count moved {previous['total']} -> {current['total']}; reloading index")
+                self.index.invalidate()
+            else:
+                changed = self.index.apply_changes(rows)
+                if changed:
+                    print(f"[TEMPLATE_INDEX] patched {len(rows)} rows into {len(changed)} partitions")
+            self._watermark = current
+            return len(rows)
 
 
 class FeedbackRetrievalSystem:
     def __init__(
         self,
         db_path: str | Path = DEFAULT_DB_PATH,
-        model_name: str = DEFAULT_MODEL_NAME,
+        model_name: Optional[str] = None,
         backend: Optional[FeedbackTemplateBackend] = None,
+        shared_index_dir: Optional[str | Path] = None,
     ) -> None:
-        self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name or default_model_name()
         self.db_path = Path(db_path)
         self.backend = backend or SQLiteFeedbackTemplateBackend(db_path)
         self.ensure_schema()
+        matrix_store = SharedMatrixStore(Path(shared_index_dir)) if shared_index_dir else None
+        self.index = TemplateIndex(self.backend, self.deserialize_embedding, matrix_store=matrix_store)
+        self.refresher: Optional[TemplateIndexRefresher] = None
+
+    @property
+    def model(self) -> Any:
+        """Shared encoder from the registry; the app uses the same instance."""
+        return get_encoder(self.model_name)
 
     def ensure_schema(self) -> None:
         self.backend.ensure_schema()
 
     def encode_text(self, text: str) -> np.ndarray:
-        vector = self.model.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0]
-        return np.asarray(vector, dtype=np.float32)
+        return self.encode_texts([text])[0]
 
     @staticmethod
-    def serialize_embedding(vector: np.ndarray) -> bytes:
-        packed = np.asarray(vector, dtype=np.float32).tobytes(order="C")
-        return zlib.compress(packed, level=9)
+    def serialize_embedding(vector: np.ndarray, dtype: str = "float32") -> bytes:
+        """Raw versioned blob: header plus float32 (default) or float16 data."""
+        if dtype not in EMBEDDING_BLOB_CODES:
+            raise ValueError(f"Unsupported embedding dtype '{dtype}'. Expected one of: {', '.join(EMBEDDING_BLOB_CODES)}")
+        code = EMBEDDING_BLOB_CODES[dtype]
+        data = np.asarray(vector, dtype=EMBEDDING_BLOB_DTYPES[code]).reshape(-1)
+        header = EMBEDDING_BLOB_HEADER.pack(EMBEDDING_BLOB_MAGIC, EMBEDDING_BLOB_VERSION, code, data.shape[0])
+        return header + data.tobytes(order="C")
+
+    @staticmethod
+    def embedding_blob_format(raw_value: Any) -> str:
+        """'float32' / 'float16' for raw blobs, 'zlib' or 'json' for legacy ones, '' if unreadable."""
+        if isinstance(raw_value, memoryview):
+            raw_value = raw_value.tobytes()
+        if isinstance(raw_value, str):
+            return "json"
+        if not isinstance(raw_value, (bytes, bytearray)) or not raw_value:
+            return ""
+        if len(raw_value) >= EMBEDDING_BLOB_HEADER.size and bytes(raw_value[:4]) == EMBEDDING_BLOB_MAGIC:
+            code = raw_value[5]
+            return {value: key for key, value in EMBEDDING_BLOB_CODES.items()}.get(code, "")
+        try:
+            zlib.decompress(bytes(raw_value))
+            return "zlib"
+        except Exception:
+            return "json"
 
     @staticmethod
     def deserialize_embedding(raw_value: Any) -> np.ndarray:
         if raw_value is None:
             return np.asarray([], dtype=np.float32)
 
+        if isinstance(raw_value, (bytes, bytearray, memoryview)) and len(raw_value) >= EMBEDDING_BLOB_HEADER.size:
+            magic, version, code, dim = EMBEDDING_BLOB_HEADER.unpack_from(raw_value)
+            if magic == EMBEDDING_BLOB_MAGIC and version == EMBEDDING_BLOB_VERSION and code in EMBEDDING_BLOB_DTYPES:
+                # float32 blobs are viewed in place; float16 ones are widened once.
+                vector = np.frombuffer(raw_value, dtype=EMBEDDING_BLOB_DTYPES[code], count=dim, offset=EMBEDDING_BLOB_HEADER.size)
+                return vector if code == 0 else vector.astype(np.float32)
+
         if isinstance(raw_value, memoryview):
             raw_value = raw_value.tobytes()
 
@@ -289,13 +861,15 @@ class FeedbackRetrievalSystem:
             raise ValueError(f"Unsupported field_name '{field_name}'. Expected one of: {', '.join(SUPPORTED_FIELDS)}")
 
         embedding = self.encode_text(evaluation_comment)
-        return self.backend.insert_template(
+        inserted_id = self.backend.insert_template(
             field_name,
             evaluation_comment.strip(),
             feedback_text.strip(),
             self.serialize_embedding(embedding),
             auto_commit=auto_commit,
         )
+        self.index.invalidate(field_name)
+        return inserted_id
 
     @staticmethod
     def cosine_similarity(vector_a: np.ndarray, vector_b: np.ndarray) -> float:
@@ -304,7 +878,9 @@ class FeedbackRetrievalSystem:
         return numerator / denominator
 
     def fetch_templates(self, field_name: str, form_type: str = "") -> List[Dict[str, Any]]:
-        return self.backend.fetch_templates(field_name, form_type=form_type)
+        """Template metadata served from the resident index (no embedding blobs)."""
+        partition = self.index.partition(field_name, form_type)
+        return [partition.row(position) for position in range(len(partition))]
 
     def retrieve_best_feedback(
         self,
@@ -314,6 +890,10 @@ class FeedbackRetrievalSystem:
         matches = self.retrieve_top_feedback(field_name, evaluation_comment, top_k=1)
         return matches[0] if matches else None
 
+    def encode_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """Encode several texts in one forward pass (cached ones skip it); rows are normalized float32."""
+        return encode_texts(list(texts), self.model_name)
+
     def retrieve_top_feedback(
         self,
         field_name: str,
@@ -321,96 +901,72 @@ class FeedbackRetrievalSystem:
         top_k: int = 3,
         form_type: str = "",
     ) -> List[FeedbackTemplate]:
-        if field_name not in SUPPORTED_FIELDS:
-            raise ValueError(f"Unsupported field_name '{field_name}'. Expected one of: {', '.join(SUPPORTED_FIELDS)}")
-
-        templates = self.fetch_templates(field_name, form_type=form_type)
-        if not templates:
-            return []
+        return self.retrieve_top_feedback_batch([(field_name, evaluation_comment, top_k)], form_type=form_type)[0]
 
-        query_embedding = self.encode_text(evaluation_comment)
-        scored_rows: List[Dict[str, Any]] = []
-
-        for row in templates:
-            stored_embedding = self.deserialize_embedding(row["embedding_vector"])
-            score = self.cosine_similarity(query_embedding, stored_embedding)
-            copy = dict(row)
-            copy["_score"] = score
-            copy["_embedding"] = stored_embedding
-            scored_rows.append(copy)
+    def retrieve_top_feedback_batch(
+        self,
+        queries: Sequence[Tuple[str, str, int]],
+        form_type: str = "",
+        query_embeddings: Optional[np.ndarray] = None,
+    ) -> List[List[FeedbackTemplate]]:
+        """Answer several (field_name, query, top_k) lookups together.
+
+        All queries are encoded in one forward pass (unless `query_embeddings`
+        is given, one row per query) and each field's partition is scored
+        against its queries with one matrix-matrix product. Results line up
+        with `queries`.
+        """
+        for field_name, _, _ in queries:
+            if field_name not in SUPPORTED_FIELDS:
+                raise ValueError(f"Unsupported field_name '{field_name}'. Expected one of: {', '.join(SUPPORTED_FIELDS)}")
+
+        results: List[List[FeedbackTemplate]] = [[] for _ in queries]
+        partitions = {field_name: self.index.partition(field_name, form_type) for field_name, _, _ in queries}
+        pending = [position for position, (field_name, _, _) in enumerate(queries) if len(partitions[field_name].matrix)]
+        if not pending:
+            return results
+
+        if query_embeddings is None:
+            encoded = self.encode_texts([queries[position][1] for position in pending])
+            vectors = {position: encoded[row] for row, position in enumerate(pending)}
+        else:
+            vectors = {position: np.asarray(query_embeddings[position], dtype=np.float32) for position in pending}
+
+        by_field: Dict[str, List[int]] = {}
+        for position in pending:
+            by_field.setdefault(queries[position][0], []).append(position)
+
+        for field_name, positions in by_field.items():
+            partition = partitions[field_name]
+            score_matrix = partition.score_matrix(np.vstack([vectors[position] for position in positions]))
+            for column, position in enumerate(positions):
+                results[position] = self._select_diverse(partition, score_matrix[:, column], queries[position][2])
+        return results
 
-        scored_rows.sort(key=lambda item: item.get("_score", -1.0), reverse=True)
+    @staticmethod
+    def _select_diverse(partition: TemplateIndexPartition, scores: np.ndarray, top_k: int) -> List[FeedbackTemplate]:
+        # `scores` has one entry per matrix row. Stable descending order, matching a stable sort on -score.
+        order = np.argsort(-scores, kind="stable")
         desired = max(1, int(top_k or 1))
-        shortlist = scored_rows[: max(desired * 4, desired)]
-
-        selected: List[Dict[str, Any]] = []
-        while shortlist and len(selected) < desired:
-            best_index = 0
-            best_value = None
-            for idx, candidate in enumerate(shortlist):
-                relevance = float(candidate.get("_score", -1.0))
-                diversity_penalty = 0.0
-                if selected:
-                    similarities_to_selected = [
-                        self.cosine_similarity(candidate.get("_embedding"), picked.get("_embedding"))
-                        for picked in selected
-                        if candidate.get("_embedding") is not None and picked.get("_embedding") is not None
-                    ]
-                    if similarities_to_selected:
-                        diversity_penalty = max(similarities_to_selected) * 0.55
-
-                # Penalize same indicator appearing too often
-                indicator_penalty = 0.0
-                candidate_indicator = (candidate.get('evaluation_comment') or '').strip().lower()
-                if selected and candidate_indicator:
-                    indicator_count = sum(1 for p in selected if (p.get('evaluation_comment') or '').strip().lower() == candidate_indicator)
-                    if indicator_count >= 2:
-                        indicator_penalty = 0.25
-                    elif indicator_count >= 1:
-                        indicator_penalty = 0.12
-
-                # Penalize feedback_text that is near-identical to already-selected (different opener, same body)
-                content_dup_penalty = 0.0
-                candidate_fb = (candidate.get('feedback_text') or '').strip().lower()
-                if selected and candidate_fb:
-                    for picked in selected:
-                        picked_fb = (picked.get('feedback_text') or '').strip().lower()
-                        if not picked_fb:
-                            continue
-                        # Compare the second half of each text (past the opener) for near-duplication
-                        cand_words = set(candidate_fb.split())
-                        pick_words = set(picked_fb.split())
-                        if cand_words and pick_words:
-                            word_overlap = len(cand_words & pick_words) / max(len(cand_words), len(pick_words))
-                            if word_overlap > 0.70:
-                                content_dup_penalty = max(content_dup_penalty, 0.30)
-
-                lexical_penalty = 0.0
-                candidate_text = f"{candidate.get('evaluation_comment') or ''} {candidate.get('feedback_text') or ''}".strip().lower()
-                if selected and candidate_text:
-                    selected_texts = {
-                        f"{picked.get('evaluation_comment') or ''} {picked.get('feedback_text') or ''}".strip().lower()
-                        for picked in selected
-                    }
-                    if candidate_text in selected_texts:
-                        lexical_penalty = 0.2
-
-                mmr_value = relevance - diversity_penalty - lexical_penalty - indicator_penalty - content_dup_penalty
-                if best_value is None or mmr_value > best_value:
-                    best_value = mmr_value
-                    best_index = idx
-
-            selected.append(shortlist.pop(best_index))
+        shortlist = order[: max(desired * 4, desired)]
+        positions = partition.matrix_rows[shortlist].tolist()
+        picks = mmr_select(
+            scores[shortlist],
+            partition.matrix[shortlist],
+            [partition.evaluation_comments[position] for position in positions],
+            [partition.feedback_texts[position] for position in positions],
+            desired,
+        )
 
         return [
             FeedbackTemplate(
-                id=int(row["id"]),
-                field_name=str(row["field_name"]),
-                evaluation_comment=str(row["evaluation_comment"]),
-                feedback_text=str(row["feedback_text"]),
-                similarity=float(row.get("_score", 0.0)),
+                id=int(partition.ids[positions[pick]]),
+                field_name=partition.field_name,
+                evaluation_comment=partition.evaluation_comments[positions[pick]],
+                feedback_text=partition.feedback_texts[positions[pick]],
+                similarity=float(scores[shortlist[pick]]),
             )
-            for row in selected
+            for pick in picks
         ]
 
     def retrieve_feedback_for_form(self, evaluation_inputs: Dict[str, str], top_k: int = 1, form_type: str = "") -> Dict[str, Optional[FeedbackTemplate]]:
@@ -425,42 +981,56 @@ class FeedbackRetrievalSystem:
         return results
 
     def retrieve_top_feedback_for_form(self, evaluation_inputs: Dict[str, str], top_k: int = 5, form_type: str = "") -> Dict[str, List[FeedbackTemplate]]:
-        results: Dict[str, List[FeedbackTemplate]] = {}
-        for field_name in SUPPORTED_FIELDS:
-            query = (evaluation_inputs.get(field_name) or "").strip()
-            if not query:
-                results[field_name] = []
-                continue
-            results[field_name] = self.retrieve_top_feedback(field_name, query, top_k=max(1, int(top_k or 1)), form_type=form_type)
+        results: Dict[str, List[FeedbackTemplate]] = {field_name: [] for field_name in SUPPORTED_FIELDS}
+        queries = [
+            (field_name, (evaluation_inputs.get(field_name) or "").strip(), max(1, int(top_k or 1)))
+            for field_name in SUPPORTED_FIELDS
+            if (evaluation_inputs.get(field_name) or "").strip()
+        ]
+        for (field_name, _, _), matches in zip(queries, self.retrieve_top_feedback_batch(queries, form_type=form_type)):
+            results[field_name] = matches
         return results
 
     def seed_feedback_templates(self, templates: Iterable[Dict[str, str]]) -> None:
-        count = 0
-        for template in templates:
-            self.add_feedback_template(
-                field_name=template["field_name"],
-                evaluation_comment=template["evaluation_comment"],
-                feedback_text=template["feedback_text"],
-                auto_commit=False,
-            )
-            count += 1
-            # Batch commit every 50 rows
-            if count % 50 == 0:
-                self.backend.connection.commit()
-        # Final commit
-        self.backend.connection.commit()
+        pending = list(templates)
+        # One transaction per 50 rows
+        for start in range(0, len(pending), 50):
+            with self.backend.transaction():
+                for template in pending[start : start + 50]:
+                    self.add_feedback_template(
+                        field_name=template["field_name"],
+                        evaluation_comment=template["evaluation_comment"],
+                        feedback_text=template["feedback_text"],
+                        auto_commit=False,
+                    )
+        self.index.invalidate()
 
     def count_templates(self) -> int:
         return self.backend.count_templates()
 
+    def start_refresher(self, interval_seconds: float = 30.0) -> TemplateIndexRefresher:
+        if self.refresher is None:
+            self.refresher = TemplateIndexRefresher(self.index, interval_seconds=interval_seconds)
+        self.refresher.start()
+        return self.refresher
+
     def clear_templates(self) -> None:
         self.backend.clear_templates()
+        self.index.invalidate()
 
     def close(self) -> None:
+        if self.refresher is not None:
+            self.refresher.stop()
         self.backend.close()
 
 
-def mysql_backend_from_config(config: Dict[str, str], table_name: str = DEFAULT_MYSQL_TABLE) -> MySQLFeedbackTemplateBackend:
+def mysql_backend_from_config(
+    config: Dict[str, str],
+    table_name: str = DEFAULT_MYSQL_TABLE,
+    pool_size: Optional[int] = None,
+    health_check_seconds: Optional[float] = None,
+) -> MySQLFeedbackTemplateBackend:
+    """Pooled backend; size and idle health-check interval default to MYSQL_POOL_SIZE / MYSQL_HEALTH_CHECK_SECONDS."""
     import pymysql  # type: ignore
 
     connect_kwargs = dict(
@@ -470,12 +1040,17 @@ def mysql_backend_from_config(config: Dict[str, str], table_name: str = DEFAULT_
         database=config.get("database", "ai_classroom_eval"),
         charset="utf8mb4",
         cursorclass=pymysql.cursors.DictCursor,
-        autocommit=False,
+        autocommit=True,
+    )
+    pool = MySQLConnectionPool(
+        connect_kwargs,
+        size=pool_size or int(os.getenv("MYSQL_POOL_SIZE", "5") or 5),
+        health_check_seconds=health_check_seconds or float(os.getenv("MYSQL_HEALTH_CHECK_SECONDS", "60") or 60),
     )
-    connection = pymysql.connect(**connect_kwargs)
-    backend = MySQLFeedbackTemplateBackend(connection=connection, table_name=table_name)
-    backend._connect_kwargs = connect_kwargs
-    return backend
+    # Open the first connection now so bad credentials fail at startup, as before.
+    with pool.connection():
+        pass
+    return MySQLFeedbackTemplateBackend(pool=pool, table_name=table_name)
 
 
 def default_seed_templates() -> List[Dict[str, str]]:
@@ -838,9 +1413,13 @@ def generate_seed_templates(per_field: int = 100) -> List[Dict[str, str]]:
     return output
 
 
-def build_mysql_seed_system(config: Dict[str, str], table_name: str = DEFAULT_MYSQL_TABLE) -> FeedbackRetrievalSystem:
+def build_mysql_seed_system(
+    config: Dict[str, str],
+    table_name: str = DEFAULT_MYSQL_TABLE,
+    shared_index_dir: Optional[str | Path] = None,
+) -> FeedbackRetrievalSystem:
     backend = mysql_backend_from_config(config=config, table_name=table_name)
-    return FeedbackRetrievalSystem(backend=backend)
+    return FeedbackRetrievalSystem(backend=backend, shared_index_dir=shared_index_dir)
 
 
 def build_demo_system(db_path: str | Path = DEFAULT_DB_PATH) -> FeedbackRetrievalSystem:
@@ -0,0 +1,112 @@
+"""Case-insensitive multi-keyword matcher (Aho-Corasick).
+
+`KeywordMatcher` is built once from named keyword groups and answers, in one
+pass over the lowercased text, how many distinct keywords of every group occur
+in it as substrings. That is the same count as testing `keyword.lower() in
+text.lower()` for each keyword, without rescanning the text per keyword or per
+group. A keyword listed in several groups counts once for each of them.
+
+Results are memoized per text in a bounded LRU: the same template texts are
+checked again on every request.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+
+class KeywordMatcher:
+    """Distinct-keyword hit counts per group, for any number of groups, in one pass."""
+
+    def __init__(self, groups: Mapping[str, Sequence[str]], cache_size: int = 4096) -> None:
+        self.groups = list(groups)
+        keyword_ids: Dict[str, int] = {}
+        # For every keyword, the group positions it counts towards (once per listing).
+        self._keyword_groups: List[List[int]] = []
+        for position, name in enumerate(self.groups):
+            for keyword in groups[name]:
+                lowered = keyword.lower()
+                if not lowered:
+                    continue
+                if lowered not in keyword_ids:
+                    keyword_ids[lowered] = len(keyword_ids)
+                    self._keyword_groups.append([])
+                self._keyword_groups[keyword_ids[lowered]].append(position)
+        self._transitions, self._outputs = self._build(keyword_ids)
+        self.cache_size = max(0, int(cache_size))
+        self._cache: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build(keyword_ids: Dict[str, int]) -> Tuple[List[Dict[str, int]], List[Tuple[int, ...]]]:
+        """Trie plus failure links, flattened into a full transition table per state."""
+        children: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[int, ...]] = [()]
+        for keyword, keyword_id in keyword_ids.items():
+            state = 0
+            for char in keyword:
+                following = children[state].get(char)
+                if following is None:
+                    children.append({})
+                    outputs.append(())
+                    following = len(children) - 1
+                    children[state][char] = following
+                state = following
+            outputs[state] += (keyword_id,)
+
+        # Breadth-first, so a state's failure target is always finished before the state itself.
+        transitions: List[Dict[str, int]] = [dict(children[0])] + [{} for _ in children[1:]]
+        failure = [0] * len(children)
+        queue = deque(children[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = failure[state]
+            transitions[state] = {**transitions[fallback], **children[state]}
+            outputs[state] += outputs[fallback]
+            for char, following in children[state].items():
+                failure[following] = transitions[fallback].get(char, 0)
+                queue.append(following)
+        return transitions, outputs
+
+    def _scan(self, text: str) -> Tuple[int, ...]:
+        transitions, outputs = self._transitions, self._outputs
+        found = set()
+        state = 0
+        for char in text.lower():
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        counts = [0] * len(self.groups)
+        for keyword_id in found:
+            for position in self._keyword_groups[keyword_id]:
+                counts[position] += 1
+        return tuple(counts)
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Distinct keyword hits in `text` for every group, in group order."""
+        text = text or ""
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+        if cached is None:
+            cached = self._scan(text)
+            if self.cache_size:
+                with self._lock:
+                    self._cache[text] = cached
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        return dict(zip(self.groups, cached))
+
+    def count(self, text: str, group: str) -> int:
+        return self.counts(text).get(group, 0)
+
+    def best_group(self, text: str) -> str:
+        """The group with the most hits; the earliest group wins a tie, "" when nothing matches."""
+        best, best_hits = "", 0
+        for name, hits in self.counts(text).items():
+            if hits > best_hits:
+                best, best_hits = name, hits
+        return best
@@ -0,0 +1,251 @@
+"""Small in-process metric primitives for the AI service.
+
+Values live in process memory and reset on restart. Recording is a lock and a
+bisect per observation; formatting only happens when `/metrics` or a debug
+endpoint is read, so an unscraped service pays next to nothing.
+
+`stage_timer(name)` times one step of the /generate pipeline into the
+`adces_generate_stage_seconds` histogram. Inside `request_trace(...)` the same
+timer also records wall and CPU time into that request's `RequestTrace`, and
+`trace_add` / `trace_record` attach counters and values to it.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram with cumulative (`le`) bucket counts."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = sorted(float(bound) for bound in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        position = bisect.bisect_left(self.buckets, float(value))
+        with self._lock:
+            self._counts[position] += 1
+            self._sum += float(value)
+            self._count += 1
+
+    def cumulative(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        """(upper bound, cumulative count) per bucket, plus the sum and total count."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        buckets: List[Tuple[float, int]] = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            buckets.append((bound, running))
+        return buckets, total, count
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative[f"{bound:g}"] = running
+        cumulative["+Inf"] = count
+        return {"buckets": cumulative, "count": count, "sum": round(total, 6)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter."""
+
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+STAGE_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+stage_seconds: Dict[str, Histogram] = {}
+_stage_lock = threading.Lock()
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if getattr(_trace_local, "unrecorded", False):
+        return
+    histogram = stage_seconds.get(stage)
+    if histogram is None:
+        with _stage_lock:
+            histogram = stage_seconds.setdefault(stage, Histogram(STAGE_SECONDS_BUCKETS))
+    histogram.observe(seconds)
+
+
+class RequestTrace:
+    """Per-request breakdown: stage wall/CPU times, counters and recorded values.
+
+    Only the thread that opened the trace writes to it, so it needs no lock.
+    """
+
+    def __init__(self, request_id: str) -> None:
+        self.request_id = request_id
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.values: Dict[str, Any] = {}
+
+    def add_stage(self, stage: str, wall_seconds: float, cpu_seconds: float) -> None:
+        entry = self.stages.setdefault(stage, {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0})
+        entry["calls"] += 1
+        entry["wall_ms"] += wall_seconds * 1000.0
+        entry["cpu_ms"] += cpu_seconds * 1000.0
+
+    def add(self, key: str, amount: int = 1) -> None:
+        self.counters[key] = self.counters.get(key, 0) + int(amount)
+
+    def record(self, key: str, value: Any) -> None:
+        """Append `value` to the list kept under `key`."""
+        self.values.setdefault(key, []).append(value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "stages": {
+                stage: {"calls": int(entry["calls"]), "wall_ms": round(entry["wall_ms"], 3), "cpu_ms": round(entry["cpu_ms"], 3)}
+                for stage, entry in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            **self.values,
+        }
+
+
+_trace_local = threading.local()
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return getattr(_trace_local, "trace", None)
+
+
+@contextmanager
+def request_trace(request_id: str) -> Iterator[RequestTrace]:
+    """Collect a `RequestTrace` for everything the current thread does in the block."""
+    trace = RequestTrace(request_id)
+    previous = current_trace()
+    _trace_local.trace = trace
+    try:
+        yield trace
+    finally:
+        _trace_local.trace = previous
+
+
+@contextmanager
+def unrecorded() -> Iterator[None]:
+    """Keep stage timings of the current thread out of the histograms (service-internal work such as warm-up)."""
+    previous = getattr(_trace_local, "unrecorded", False)
+    _trace_local.unrecorded = True
+    try:
+        yield
+    finally:
+        _trace_local.unrecorded = previous
+
+
+def trace_add(key: str, amount: int = 1) -> None:
+    trace = current_trace()
+    if trace is not None:
+        trace.add(key, amount)
+
+
+def trace_record(key: str, value: Any) -> None:
+    trace = current_trace()
+    if trace is not None:
+        trace.record(key, value)
+
+
+class TraceHistory:
+    """The most recent finished traces by request id, for lookup after the response went out."""
+
+    def __init__(self, size: int = 256) -> None:
+        self.size = max(0, int(size))
+        self._traces: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, trace: Dict[str, Any]) -> None:
+        if not self.size:
+            return
+        with self._lock:
+            self._traces[trace["request_id"]] = trace
+            self._traces.move_to_end(trace["request_id"])
+            while len(self._traces) > self.size:
+                self._traces.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._traces.get(request_id)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    trace = current_trace()
+    started = time.perf_counter()
+    cpu_started = time.thread_time() if trace is not None else 0.0
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe_stage(stage, elapsed)
+        if trace is not None:
+            trace.add_stage(stage, elapsed, time.thread_time() - cpu_started)
+
+
+def _format_labels(labels: Mapping[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels.items()) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_samples(name: str, help_text: str, kind: str, samples: Sequence[Tuple[Mapping[str, str], float]]) -> List[str]:
+    """Prometheus text lines for a counter or gauge family."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+    return lines
+
+
+def render_histograms(
+    name: str,
+    help_text: str,
+    series: Sequence[Tuple[Mapping[str, str], Histogram]],
+    scale: float = 1.0,
+) -> List[str]:
+    """Prometheus text lines for a histogram family; `scale` converts recorded units (e.g. ms -> s)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series:
+        buckets, total, count = histogram.cumulative()
+        for bound, cumulative in buckets:
+            lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound * scale:g}'))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total * scale)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return lines
@@ -0,0 +1,74 @@
+"""Rewrite ai_feedback_templates.embedding_vector into the raw versioned blob format.
+
+Legacy rows hold zlib-compressed (or JSON) float32 vectors; the reader still
+accepts them, but every request pays the decompression. This rewrites them in
+bulk, in id order and in batches, skipping rows that are already in the target
+format.
+
+Usage:
+    cd ai_service
+    python migrate_embedding_blobs.py [--dtype float32|float16] [--batch-size 500] [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import Dict
+
+from feedback_retrieval_system import DEFAULT_MYSQL_TABLE, EMBEDDING_BLOB_CODES, FeedbackRetrievalSystem, mysql_backend_from_config
+from seed_mysql_feedback_templates import parse_php_db_config
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rewrite template embeddings into the raw blob format.")
+    parser.add_argument("--table", default=DEFAULT_MYSQL_TABLE, help="MySQL table name for feedback templates.")
+    parser.add_argument("--dtype", default="float32", choices=sorted(EMBEDDING_BLOB_CODES), help="Stored float precision.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows read and updated per transaction.")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing.")
+    args = parser.parse_args()
+
+    backend = mysql_backend_from_config(parse_php_db_config(), table_name=args.table)
+    counts: Dict[str, int] = {}
+    rewritten = 0
+    last_id = 0
+    try:
+        with backend.pool.connection() as connection:
+            while True:
+                with connection.cursor() as cur:
+                    cur.execute(
+                        f"SELECT id, embedding_vector FROM `{args.table}` WHERE id > %s ORDER BY id ASC LIMIT %s",
+                        (last_id, max(1, args.batch_size)),
+                    )
+                    rows = cur.fetchall()
+                if not rows:
+                    break
+                last_id = int(rows[-1]["id"])
+
+                updates = []
+                for row in rows:
+                    raw = row["embedding_vector"]
+                    current = FeedbackRetrievalSystem.embedding_blob_format(raw) or "empty"
+                    counts[current] = counts.get(current, 0) + 1
+                    if current in ("empty", args.dtype):
+                        continue
+                    vector = FeedbackRetrievalSystem.deserialize_embedding(raw)
+                    if vector.size == 0:
+                        continue
+                    updates.append((FeedbackRetrievalSystem.serialize_embedding(vector, dtype=args.dtype), int(row["id"])))
+
+                if updates and not args.dry_run:
+                    with backend.transaction():
+                        with connection.cursor() as cur:
+                            cur.executemany(f"UPDATE `{args.table}` SET embedding_vector = %s WHERE id = %s", updates)
+                rewritten += len(updates)
+                print(f"  through id {last_id}: {rewritten} rows {'to rewrite' if args.dry_run else 'rewritten'}")
+    finally:
+        backend.close()
+
+    summary = ", ".join(f"{name}={total}" for name, total in sorted(counts.items()))
+    print(f"Formats before migration: {summary or 'no rows'}")
+    print(f"{'Would rewrite' if args.dry_run else 'Rewrote'} {rewritten} rows to {args.dtype} in {args.table}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Thread-safe pymysql connection pool for the template backend.
+
+pymysql connections must not be shared between threads, so every caller checks
+a connection out for the duration of its work. Checkout is per thread and
+re-entrant: nested `connection()` blocks on the same thread reuse the
+connection the outer block holds, which is what lets a transaction span
+several backend calls.
+
+Pooled connections run in autocommit mode, so plain reads always see the
+latest committed rows without an extra COMMIT; write batches open an explicit
+transaction. Instead of pinging before every query, a background timer pings
+connections that have sat idle longer than `health_check_seconds` and drops the
+ones that no longer answer.
+
+A forked child forgets the connections it inherited (their sockets belong to
+the parent) and opens its own on first use.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+
+class PoolTimeout(RuntimeError):
+    """No pooled connection became free within the checkout timeout."""
+
+
+# MySQL client error codes meaning the connection itself is gone: can't connect,
+# server has gone away, lost connection during query, lost connection at handshake.
+CONNECTION_LOST_CODES = frozenset({2003, 2006, 2013, 2055})
+
+
+class MySQLConnectionPool:
+    def __init__(
+        self,
+        connect_kwargs: Dict[str, Any],
+        size: int = 5,
+        health_check_seconds: float = 60.0,
+        checkout_timeout: float = 30.0,
+        connect: Optional[Callable[..., Any]] = None,
+    ) -> None:
+        self.connect_kwargs = dict(connect_kwargs)
+        self.size = max(1, int(size))
+        self.health_check_seconds = max(1.0, float(health_check_seconds))
+        self.checkout_timeout = float(checkout_timeout)
+        self._connect = connect
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._closed = False
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+        self._lost_errors, self._operational_error = self._load_error_types()
+        _pools.add(self)
+
+    @staticmethod
+    def _load_error_types() -> Tuple[Tuple[type, ...], Optional[type]]:
+        try:
+            import pymysql  # type: ignore
+        except ImportError:
+            return (ConnectionError,), None
+        return (pymysql.err.InterfaceError, ConnectionError), pymysql.err.OperationalError
+
+    def is_connection_lost(self, exc: BaseException) -> bool:
+        """True when `exc` means the connection is unusable (not an SQL, lock or permission error)."""
+        if isinstance(exc, self._lost_errors):
+            return True
+        if self._operational_error is not None and isinstance(exc, self._operational_error):
+            return bool(exc.args) and exc.args[0] in CONNECTION_LOST_CODES
+        return False
+
+    def _new_connection(self) -> Any:
+        if self._connect is not None:
+            return self._connect(**self.connect_kwargs)
+        import pymysql  # type: ignore
+
+        return pymysql.connect(**self.connect_kwargs)
+
+    def in_checkout(self) -> bool:
+        """True while the current thread holds a pooled connection."""
+        return getattr(self._local, "connection", None) is not None
+
+    @contextmanager
+    def connection(self, fresh: bool = False) -> Iterator[Any]:
+        """Check out a connection for this thread (re-entrant).
+
+        `fresh=True` skips the idle connections and opens a new one, for a retry
+        after the server dropped a pooled connection.
+        """
+        local = self._local
+        held = getattr(local, "connection", None)
+        if held is not None:
+            local.depth += 1
+            try:
+                yield held
+            finally:
+                local.depth -= 1
+            return
+
+        conn = self._checkout(fresh)
+        local.connection, local.depth = conn, 1
+        broken = False
+        try:
+            yield conn
+        except BaseException as exc:
+            if self.is_connection_lost(exc):
+                broken = True
+                raise
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            local.connection, local.depth = None, 0
+            self._checkin(conn, broken)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Any]:
+        """Run the block in one explicit transaction, committed on success."""
+        with self.connection() as conn:
+            if getattr(self._local, "in_transaction", False):
+                # Joins the transaction an outer block on this thread opened.
+                yield conn
+                return
+            conn.begin()
+            self._local.in_transaction = True
+            try:
+                yield conn
+            except BaseException:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                self._local.in_transaction = False
+            conn.commit()
+
+    def _checkout(self, fresh: bool = False) -> Any:
+        deadline = time.monotonic() + self.checkout_timeout
+        replaced = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle and not fresh:
+                    return self._idle.pop()[0]
+                if self._idle:
+                    # Reuse the oldest idle connection's slot for the new one.
+                    replaced = self._idle.popleft()[0]
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"no MySQL connection free after {self.checkout_timeout:g}s (pool size {self.size})")
+                self._cond.wait(remaining)
+        if replaced is not None:
+            self._close_quietly(replaced)
+        try:
+            conn = self._new_connection()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        self._ensure_health_thread()
+        return conn
+
+    def _checkin(self, conn: Any, broken: bool = False) -> None:
+        with self._cond:
+            if broken or self._closed:
+                self._open -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _ensure_health_thread(self) -> None:
+        with self._cond:
+            if self._health_thread is not None and self._health_thread.is_alive():
+                return
+            self._health_thread = threading.Thread(target=self._health_loop, name="mysql-pool-health", daemon=True)
+            self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while not self._stop.wait(self.health_check_seconds):
+            self.check_idle()
+
+    def check_idle(self) -> int:
+        """Ping connections idle past the health-check interval; returns how many were dropped."""
+        cutoff = time.monotonic() - self.health_check_seconds
+        with self._cond:
+            stale = [entry for entry in self._idle if entry[1] <= cutoff]
+            for entry in stale:
+                self._idle.remove(entry)
+        dropped = 0
+        for conn, _ in stale:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(conn)
+                dropped += 1
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                continue
+            self._checkin(conn)
+        return dropped
+
+    def _after_fork_in_child(self) -> None:
+        # Drop, never close: closing would send COM_QUIT on the parent's sockets.
+        self._idle = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._health_thread = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"size": self.size, "open": self._open, "idle": len(self._idle)}
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+
+_pools: "weakref.WeakSet[MySQLConnectionPool]" = weakref.WeakSet()
+
+
+def _reset_pools_after_fork() -> None:
+    for pool in list(_pools):
+        pool._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
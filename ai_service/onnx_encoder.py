@@ -0,0 +1,108 @@
+"""ONNX Runtime sentence encoder (no torch at serving time).
+
+Runs a transformer exported by `export_onnx_encoder.py` with onnxruntime and
+the `tokenizers` library, then applies the same pooling and normalization as
+the SentenceTransformer pipeline it was exported from. It exposes the
+SentenceTransformer-style `encode` used everywhere else, so `encoders.py` can
+swap it in when SBERT_BACKEND is `onnx` or `onnx-int8`.
+
+Export directory layout:
+- `model.onnx` (and optionally `model.int8.onnx`, dynamically quantized)
+- `tokenizer.json`
+- `encoder_config.json` — source model name, max sequence length, pooling mode, dimension
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+ENCODER_CONFIG_FILE = "encoder_config.json"
+DEFAULT_ONNX_ROOT = Path(__file__).with_name("onnx_models")
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    """Export directory for `model_name` (ONNX_MODEL_DIR overrides the root)."""
+    root = Path(os.getenv("ONNX_MODEL_DIR") or DEFAULT_ONNX_ROOT)
+    return root / re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+class OnnxSentenceEncoder:
+    def __init__(self, model_dir: Path, quantized: bool = False, intra_op_threads: Optional[int] = None) -> None:
+        import onnxruntime as ort  # type: ignore
+        from tokenizers import Tokenizer  # type: ignore
+
+        self.model_dir = Path(model_dir)
+        config = json.loads((self.model_dir / ENCODER_CONFIG_FILE).read_text(encoding="utf-8"))
+        self.model_name = str(config.get("model_name") or "")
+        self.max_seq_length = int(config.get("max_seq_length") or 256)
+        self.pooling = str(config.get("pooling") or "mean")
+        self.dimension = int(config.get("dimension") or 0)
+
+        model_file = self.model_dir / (ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        if not model_file.exists():
+            raise FileNotFoundError(f"{model_file} not found; run export_onnx_encoder.py{' --int8' if quantized else ''} first")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = int(intra_op_threads)
+        self.session = ort.InferenceSession(str(model_file), sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {item.name for item in self.session.get_inputs()}
+        self.quantized = quantized
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        pad_token = str(config.get("pad_token") or "[PAD]")
+        pad_id = self.tokenizer.token_to_id(pad_token)
+        self.tokenizer.enable_padding(pad_id=0 if pad_id is None else pad_id, pad_token=pad_token)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([item.ids for item in encodings], dtype=np.int64)
+        attention_mask = np.asarray([item.attention_mask for item in encodings], dtype=np.int64)
+        feeds: Dict[str, np.ndarray] = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.asarray([item.type_ids for item in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+        if self.pooling == "cls":
+            return token_embeddings[:, 0].astype(np.float32)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return (summed / np.clip(mask.sum(axis=1), 1e-9, None)).astype(np.float32)
+
+    def encode(
+        self,
+        sentences: Sequence[str] | str,
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **_: Any,
+    ) -> Any:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else [str(text or "") for text in sentences]
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        # Group similar lengths so each batch pads as little as possible.
+        order = sorted(range(len(texts)), key=lambda position: len(texts[position]))
+        step = max(1, batch_size)
+        chunks = [order[start : start + step] for start in range(0, len(order), step)]
+        pooled = [self._forward([texts[position] for position in chunk]) for chunk in chunks]
+        output = np.zeros((len(texts), pooled[0].shape[1]), dtype=np.float32)
+        for chunk, vectors in zip(chunks, pooled):
+            output[chunk] = vectors
+        if normalize_embeddings:
+            output /= np.clip(np.linalg.norm(output, axis=1, keepdims=True), 1e-12, None)
+        if single:
+            output = output[0]
+        return output if convert_to_numpy else output.tolist()
@@ -67,17 +67,16 @@ def main() -> None:
     try:
         if args.truncate_peac:
             # Remove only PEAC-originated templates by keyword match
-            conn = system.backend.connection
-            cursor = conn.cursor()
-            cursor.execute(
-                f"DELETE FROM `{args.table}` WHERE "
-                "evaluation_comment LIKE '%PEAC%' OR "
-                "evaluation_comment LIKE '%unit standards and competencies%' OR "
-                "evaluation_comment LIKE '%PVMGO%'"
-            )
-            deleted = cursor.rowcount
-            conn.commit()
-            cursor.close()
+            with system.backend.transaction() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        f"DELETE FROM `{args.table}` WHERE "
+                        "evaluation_comment LIKE '%PEAC%' OR "
+                        "evaluation_comment LIKE '%unit standards and competencies%' OR "
+                        "evaluation_comment LIKE '%PVMGO%'"
+                    )
+                    deleted = cursor.rowcount
+            system.index.invalidate()
             print(f"Removed {deleted} existing PEAC templates.")
 
         system.seed_feedback_templates(templates)
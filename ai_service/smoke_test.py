@@ -1,7 +1,7 @@
 """In-process smoke checks for the FastAPI app.
 
 This avoids starting uvicorn and avoids downloading/loading the real SBERT model by
-monkeypatching `_load_sbert` with a deterministic fake encoder.
+registering a deterministic fake encoder in the shared encoder registry.
 
 Run: python smoke_test.py
 """
@@ -13,6 +13,7 @@ import tempfile
 import numpy as np
 
 import app as ai_app
+from encoders import register_encoder
 
 class _FakeSbert:
     def encode(self, texts, convert_to_numpy=True, normalize_embeddings=False):
@@ -37,7 +38,7 @@ class _FakeSbert:
 
 
 def main() -> None:
-    ai_app._load_sbert = lambda: _FakeSbert()  # type: ignore[attr-defined]
+    register_encoder(None, _FakeSbert())
 
     class _FakeRetrievalMatch:
         def __init__(self, feedback_text: str, evaluation_comment: str = "", similarity: float = 0.9):
@@ -102,7 +103,7 @@ def main() -> None:
 
     tmp = tempfile.TemporaryDirectory()
     ai_app.FEEDBACK_PATH = pathlib.Path(tmp.name) / "ai_feedback.jsonl"  # type: ignore[attr-defined]
-    ai_app.EMBEDDINGS_CACHE_PATH = pathlib.Path(tmp.name) / "comment_embeddings_cache.npz"  # type: ignore[attr-defined]
+    ai_app.EMBEDDINGS_CACHE_PATH = pathlib.Path(tmp.name) / "comment_embeddings_cache"  # type: ignore[attr-defined]
 
     client = TestClient(ai_app.app)
 
@@ -141,6 +142,10 @@ def main() -> None:
     assert r.status_code == 200, r.text
     data = r.json()
 
+    # Derived request state is computed once per request through GenerationContext.
+    computations = (data.get("debug") or {}).get("context_computations") or {}
+    assert computations and all(count == 1 for count in computations.values()), computations
+
     for k in ("strengths", "improvement_areas", "recommendations"):
         assert isinstance(data.get(k), str) and data[k].strip(), (k, data)
         assert len({part.strip().lower() for part in data[k].split('.') if part.strip()}) >= 1, (k, data[k])
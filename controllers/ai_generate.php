@@ -32,7 +32,7 @@ if (!$aiBase) {
 // Debug helper:
 // - GET /controllers/ai_generate.php?mode=health -> calls Python /health
 // - GET /controllers/ai_generate.php?mode=echo   -> calls Python /debug/echo (with empty JSON body)
-// Normal generation remains POST-only.
+// Normal generation remains POST-only; POST ?mode=batch with a JSON list streams /generate/batch NDJSON.
 $mode = $_GET['mode'] ?? '';
 $isDebugGet = ($_SERVER['REQUEST_METHOD'] === 'GET') && in_array($mode, ['health', 'echo'], true);
 
@@ -62,6 +62,24 @@ if ($_SERVER['REQUEST_METHOD'] === 'POST') {
         echo json_encode(['success' => false, 'message' => 'Invalid JSON']);
         exit();
     }
+
+    if ($mode === 'batch' && ($payload === [] || array_keys($payload) !== range(0, count($payload) - 1))) {
+        http_response_code(400);
+        header('Content-Type: application/json');
+        echo json_encode(['success' => false, 'message' => 'Batch mode expects a non-empty JSON list of requests']);
+        exit();
+    }
+
+    // The UI only reads the suggestions, so skip the service's debug payload unless asked for.
+    if ($mode === 'batch') {
+        foreach ($payload as $i => $item) {
+            if (is_array($item) && !isset($item['detail'])) {
+                $payload[$i]['detail'] = 'none';
+            }
+        }
+    } elseif (!isset($payload['detail'])) {
+        $payload['detail'] = 'none';
+    }
 } else {
     // Debug GET modes don't need request body
     $payload = [];
@@ -72,13 +90,76 @@ if ($mode === 'health') {
     $path = '/health';
 } elseif ($mode === 'echo') {
     $path = '/debug/echo';
+} elseif ($mode === 'batch') {
+    $path = '/generate/batch';
 }
 $aiUrl = rtrim($aiBase, '/') . $path;
 
+// Correlate this call with the AI service trace (GET /debug/trace/{id} on the service).
+// Reuse the caller's X-Request-ID when it looks sane, otherwise mint one.
+$requestId = $_SERVER['HTTP_X_REQUEST_ID'] ?? '';
+if (!preg_match('/^[A-Za-z0-9._:-]{1,64}$/', $requestId)) {
+    $requestId = bin2hex(random_bytes(8));
+}
+header('X-Request-ID: ' . $requestId);
+$aiHeaders = ['Content-Type: application/json', 'X-Request-ID: ' . $requestId];
+if (!empty($_SERVER['HTTP_X_TRACE'])) {
+    $aiHeaders[] = 'X-Trace: ' . $_SERVER['HTTP_X_TRACE'];
+}
+
+if ($mode === 'batch' && $_SERVER['REQUEST_METHOD'] === 'POST') {
+    // Relay each NDJSON line as the AI service writes it instead of buffering the whole batch.
+    header('Content-Type: application/x-ndjson');
+    header('X-Accel-Buffering: no');
+    set_time_limit(0);
+    while (ob_get_level() > 0) {
+        ob_end_flush();
+    }
+    $ch = curl_init($aiUrl);
+    curl_setopt_array($ch, [
+        CURLOPT_HEADERFUNCTION => function ($curl, $headerLine) {
+            if (preg_match('#^HTTP/\S+\s+(\d{3})#', $headerLine, $m)) {
+                http_response_code((int)$m[1]);
+            } elseif (stripos($headerLine, 'Retry-After:') === 0) {
+                header(trim($headerLine));
+            }
+            return strlen($headerLine);
+        },
+        CURLOPT_WRITEFUNCTION => function ($curl, $chunk) {
+            echo $chunk;
+            flush();
+            return strlen($chunk);
+        },
+        CURLOPT_HTTPHEADER => $aiHeaders,
+        CURLOPT_POST => true,
+        CURLOPT_POSTFIELDS => json_encode($payload),
+        CURLOPT_CONNECTTIMEOUT => 10,
+        // Whole batches can run for a while; the stream itself keeps the connection busy.
+        CURLOPT_TIMEOUT => 0,
+        CURLOPT_IPRESOLVE => CURL_IPRESOLVE_V4,
+    ]);
+    if (curl_exec($ch) === false) {
+        if (!headers_sent()) {
+            http_response_code(502);
+        }
+        echo json_encode(['error' => 'AI service connection failed: ' . curl_error($ch), 'request_id' => $requestId]) . "\n";
+    }
+    curl_close($ch);
+    exit();
+}
+
+$retryAfter = null;
 $ch = curl_init($aiUrl);
 curl_setopt_array($ch, [
     CURLOPT_RETURNTRANSFER => true,
-    CURLOPT_HTTPHEADER => ['Content-Type: application/json'],
+    // Capture Retry-After so a busy AI service can be passed through to the UI
+    CURLOPT_HEADERFUNCTION => function ($curl, $headerLine) use (&$retryAfter) {
+        if (stripos($headerLine, 'Retry-After:') === 0) {
+            $retryAfter = trim(substr($headerLine, strlen('Retry-After:')));
+        }
+        return strlen($headerLine);
+    },
+    CURLOPT_HTTPHEADER => $aiHeaders,
     CURLOPT_CUSTOMREQUEST => ($_SERVER['REQUEST_METHOD'] === 'GET') ? 'GET' : 'POST',
     CURLOPT_POSTFIELDS => ($_SERVER['REQUEST_METHOD'] === 'GET') ? null : json_encode($payload),
     // First run can be slow (model download/load + CPU generation)
@@ -103,6 +184,7 @@ if ($responseBody === false) {
         'message' => 'AI service connection failed. Is the Python server running?',
         'ai_url' => $aiUrl,
         'error' => $curlErr,
+        'request_id' => $requestId,
     ]);
     exit();
 }
@@ -120,6 +202,22 @@ if (!is_array($data)) {
     exit();
 }
 
+if ($status === 503 || $status === 429) {
+    // AI service is at its in-flight limit: tell the client when to retry instead of a generic 502
+    http_response_code($status);
+    if ($retryAfter !== null && $retryAfter !== '') {
+        header('Retry-After: ' . $retryAfter);
+    }
+    echo json_encode([
+        'success' => false,
+        'message' => 'AI service is busy. Please try again in a few seconds.',
+        'retry_after' => $retryAfter !== null ? (int)$retryAfter : null,
+        'status' => $status,
+        'request_id' => $requestId,
+    ]);
+    exit();
+}
+
 if ($status < 200 || $status >= 300) {
     http_response_code(502);
     echo json_encode([
@@ -127,9 +225,10 @@ if ($status < 200 || $status >= 300) {
         'message' => 'AI service error',
         'ai_url' => $aiUrl,
         'status' => $status,
+        'request_id' => $requestId,
         'data' => $data,
     ]);
     exit();
 }
 
-echo json_encode(['success' => true, 'data' => $data]);
+echo json_encode(['success' => true, 'request_id' => $requestId, 'data' => $data]);
@@ -4,6 +4,9 @@
  * Include this file early in any entry-point page (index.php, login.php)
  * and in the AI proxy controller for on-demand startup.
  * Uses a lock file to prevent duplicate start attempts within 30 seconds.
+ *
+ * Set AI_SERVICE_WORKERS to run several forked workers on Linux/macOS
+ * (see ai_service/_start.py); Windows has no fork() and runs one worker.
  */
 (function () {
     $healthUrl = 'http://127.0.0.1:8001/health';
@@ -32,9 +35,13 @@
     }
     @file_put_contents($lockFile, date('c'));
 
+    $isWindows = strtoupper(substr(PHP_OS, 0, 3)) === 'WIN';
     $root      = dirname(__DIR__);
-    $pythonExe = $root . DIRECTORY_SEPARATOR . '.venv' . DIRECTORY_SEPARATOR . 'Scripts' . DIRECTORY_SEPARATOR . 'python.exe';
+    $pythonExe = $isWindows
+        ? $root . DIRECTORY_SEPARATOR . '.venv' . DIRECTORY_SEPARATOR . 'Scripts' . DIRECTORY_SEPARATOR . 'python.exe'
+        : $root . DIRECTORY_SEPARATOR . '.venv' . DIRECTORY_SEPARATOR . 'bin' . DIRECTORY_SEPARATOR . 'python';
     $aiDir     = $root . DIRECTORY_SEPARATOR . 'ai_service';
+    $workers   = max(1, (int) (getenv('AI_SERVICE_WORKERS') ?: 1));
 
     if (!file_exists($pythonExe)) {
         @unlink($lockFile);
@@ -42,12 +49,13 @@
     }
 
     // Start the AI service in the background (fire-and-forget)
-    if (strtoupper(substr(PHP_OS, 0, 3)) === 'WIN') {
+    if ($isWindows) {
         // Use wmic to launch the process with correct working directory
         $cmd = 'wmic process call create "cmd /c cd /d \"' . $aiDir . '\" && \"' . $pythonExe . '\" -m uvicorn app:app --host 127.0.0.1 --port 8001"';
         pclose(popen($cmd, 'r'));
     } else {
-        $cmd = '"' . $pythonExe . '" -m uvicorn app:app --host 127.0.0.1 --port 8001';
+        // _start.py preloads the model and index once, then forks the workers.
+        $cmd = '"' . $pythonExe . '" _start.py --host 127.0.0.1 --port 8001 --workers ' . $workers;
         exec('cd ' . escapeshellarg($aiDir) . ' && ' . $cmd . ' > /dev/null 2>&1 &');
     }
 })();